@@ -1,9 +1,12 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from datetime import date, time
 import os
+import json
+import functools
 import traceback
 import logging
 from dotenv import load_dotenv
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from .config import supabase
 
@@ -17,7 +20,26 @@ from .helpers import (
     DockingHelper,
     CyclusHelper,
     VluchtCyclusHelper,
-    DockingCyclusHelper
+    DockingCyclusHelper,
+    TimelineHelper,
+    PlanningHelper,
+    ChargingHelper,
+    CycleIndex,
+    AvailabilityHelper,
+    ForecastHelper,
+    CoverageHelper,
+    ReservationHelper,
+    IdempotencyHelper,
+    AdmissionHelper,
+    SingleFlight,
+    ChangeHelper,
+    SearchHelper,
+    VerslagContentHelper,
+    ExportHelper,
+    ImportHelper,
+    AnalyticsHelper,
+    KpiHelper,
+    ArchiveHelper
 )
 # Import Supabase client directly ONLY IF needed for complex queries not in helpers
 # from .config import supabase
@@ -35,6 +57,132 @@ app.logger.setLevel(logging.INFO)
 if os.environ.get('FLASK_DEBUG', 'False').lower() == 'true':
     app.logger.setLevel(logging.DEBUG)
 
+# Optional periodic charging scheduler (long-running servers only, not serverless)
+if os.environ.get('CHARGING_TICK_SECONDS'):
+    ChargingHelper.start_background_tick(float(os.environ['CHARGING_TICK_SECONDS']))
+
+# Verslag search backend: "database" (tsvector/GIN RPC, default) or "memory" (in-process index)
+SearchHelper.BACKEND = os.environ.get('SEARCH_BACKEND', SearchHelper.BACKEND).lower()
+
+# Optional periodic change journal compaction and retention (long-running servers only)
+if os.environ.get('CHANGES_MAINTENANCE_SECONDS'):
+    ChangeHelper.start_background_maintenance(float(os.environ['CHANGES_MAINTENANCE_SECONDS']))
+
+# Optional periodic archival of finished events (long-running servers only)
+if os.environ.get('ARCHIVE_INTERVAL_SECONDS'):
+    ArchiveHelper.start_background_archival(
+        float(os.environ['ARCHIVE_INTERVAL_SECONDS']),
+        int(os.environ.get('ARCHIVE_GRACE_DAYS', ArchiveHelper.DEFAULT_GRACE_DAYS)),
+    )
+
+# Open /api/stream/drones connections; each holds a server thread unless served by api/asgi.py
+if os.environ.get('STREAM_MAX_SUBSCRIBERS'):
+    DroneHelper.events.max_subscribers = int(os.environ['STREAM_MAX_SUBSCRIBERS'])
+
+# Rate limiting and admission control, RATE_LIMIT_ENABLED=false turns it off
+# TRUSTED_PROXY_COUNT: reverse proxies in front of the app; only their X-Forwarded-For hops are believed
+AdmissionHelper.configure(
+    enabled=os.environ.get('RATE_LIMIT_ENABLED', 'True').lower() == 'true',
+    max_in_flight=int(os.environ.get('MAX_IN_FLIGHT_REQUESTS', AdmissionHelper.MAX_IN_FLIGHT)),
+    trusted_proxies=int(os.environ.get('TRUSTED_PROXY_COUNT', AdmissionHelper.TRUSTED_PROXIES)),
+)
+if AdmissionHelper.TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=AdmissionHelper.TRUSTED_PROXIES)
+
+# Idempotency-Key dedupe for POST routes; IDEMPOTENCY_BACKEND=supabase shares keys across instances
+IdempotencyHelper.configure(
+    max_entries=int(os.environ.get('IDEMPOTENCY_MAX_KEYS', IdempotencyHelper.DEFAULT_MAX_ENTRIES)),
+    ttl_seconds=float(os.environ.get('IDEMPOTENCY_TTL_SECONDS', IdempotencyHelper.DEFAULT_TTL_SECONDS)),
+    shared=os.environ.get('IDEMPOTENCY_BACKEND', '').lower() == 'supabase',
+)
+
+
+# --- Admission Control (registered first so refused requests do no other work) ---
+def client_id():
+    """Client address for rate limiting; ProxyFix has already resolved trusted X-Forwarded-For hops."""
+    return request.remote_addr or 'unknown'
+
+@app.before_request
+def admit_request():
+    rule = request.url_rule.rule if request.url_rule else None
+    sub_key = request.headers.get('X-Client-Id')
+    admitted, retry_after, slot = AdmissionHelper.admit(client_id(), request.method, rule, sub_key)
+    if not admitted:
+        app.logger.warning(f"Rate limited {request.method} {request.path} for client {client_id()} ({sub_key})")
+        response = jsonify({"error": "Too many requests, retry later."})
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 429
+    g.admission_slot = slot
+
+@app.teardown_request
+def release_admission(exc):
+    AdmissionHelper.release(g.pop('admission_slot', None))
+
+
+# --- Idempotency-Key Handling for POST Routes ---
+@app.before_request
+def begin_idempotent_request():
+    """Replays the stored response for a retried POST, or waits while the original is still running."""
+    key = request.headers.get(IdempotencyHelper.HEADER)
+    if request.method != 'POST' or key is None:
+        return None
+    try:
+        fingerprint = IdempotencyHelper.fingerprint(request.method, request.path, request.get_data())
+        outcome, record = IdempotencyHelper.begin(key, fingerprint)
+    except ValueError as ve:
+        return handle_error(ve, str(ve), 400)
+
+    if outcome == IdempotencyHelper.NEW:
+        g.idempotency_key = key
+        return None
+    if outcome == IdempotencyHelper.REPLAY:
+        app.logger.info(f"Replaying stored response for {IdempotencyHelper.HEADER} {key}")
+        response = Response(record["body"], status=record["status"], content_type=record["content_type"])
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+    if outcome == IdempotencyHelper.MISMATCH:
+        return jsonify({"error": f"{IdempotencyHelper.HEADER} was already used for a different request."}), 422
+    response = jsonify({"error": "The original request with this Idempotency-Key is still in progress."})
+    response.headers['Retry-After'] = '1'
+    return response, 409
+
+@app.after_request
+def finish_idempotent_request(response):
+    key = g.pop('idempotency_key', None)
+    if key is None:
+        return response
+    # Server errors are not stored so the client can retry them
+    if response.status_code < 500 and not response.is_streamed:
+        IdempotencyHelper.complete(key, response.status_code, response.get_data(as_text=True), response.content_type)
+    else:
+        IdempotencyHelper.abort(key)
+    return response
+
+@app.teardown_request
+def abort_idempotent_request(exc):
+    key = g.pop('idempotency_key', None)
+    if key is not None:
+        IdempotencyHelper.abort(key)
+
+
+# --- Single-Flight Coalescing of Identical GETs ---
+# READ_CACHE_SECONDS > 0 also serves a finished result for that long (default: coalesce only)
+read_coalescer = SingleFlight(cache_seconds=float(os.environ.get('READ_CACHE_SECONDS', 0)))
+
+def coalesced(view):
+    """Concurrent requests for the same path and query share one execution of the view."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        query = "&".join(sorted(f"{k}={v}" for k, v in request.args.items(multi=True)))
+        def run():
+            response = app.make_response(view(*args, **kwargs))
+            return response.status_code, response.get_data(), response.content_type
+        status, body, content_type = read_coalescer.do(
+            f"{request.path}?{query}", run, label=request.url_rule.rule, cacheable=lambda result: result[0] < 400
+        )
+        return Response(body, status=status, content_type=content_type)
+    return wrapper
+
 
 # --- Helper Function for Parsing Boolean Query Params ---
 def str_to_bool(s):
@@ -65,6 +213,7 @@ def handle_error(e, message, status_code=500):
 
 # --- Evenement Routes ---
 @app.route('/api/events', methods=['GET'])
+@coalesced
 def get_events():
     try:
         events = EvenementHelper.get_all_events()
@@ -184,6 +333,13 @@ def update_event(event_id):
 def delete_event(event_id):
     app.logger.info(f"DELETE /api/events/{event_id}")
     try:
+        if str_to_bool(request.args.get('cascade')):
+            # Zones, flight cycles, cycles and docking cycles go in the same transaction
+            counts = EvenementHelper.delete_event_cascade(event_id)
+            if counts is None:
+                return jsonify({"error": "Event not found"}), 404
+            app.logger.info(f"Event {event_id} deleted with cascade: {counts}")
+            return jsonify({"deleted": counts})
         success = EvenementHelper.delete_event(event_id)
         if success:
             app.logger.info(f"Event {event_id} deleted successfully")
@@ -195,8 +351,63 @@ def delete_event(event_id):
         # ON DELETE CASCADE should handle Zone deletion. If other FKs block it, handle error.
          return handle_error(e, f"Error deleting event {event_id}")
 
+@app.route('/api/events/<int:event_id>/archive', methods=['POST'])
+def archive_event(event_id):
+    """Moves the cycles of an ended event to the archive tables; they stay readable with include_archived=1."""
+    app.logger.info(f"POST /api/events/{event_id}/archive")
+    try:
+        result = ArchiveHelper.archive_event(event_id)
+        if result is None:
+            return jsonify({"error": "Event not found"}), 404
+        return jsonify(result)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 409
+    except Exception as e:
+        return handle_error(e, f"Error archiving event {event_id}")
+
+@app.route('/api/events/archived', methods=['GET'])
+def get_archived_events():
+    try:
+        return jsonify(ArchiveHelper.get_archived_events())
+    except Exception as e:
+        return handle_error(e, "Failed to retrieve archived events")
+
+@app.route('/api/events/<int:event_id>/overview', methods=['GET'])
+def get_event_overview(event_id):
+    """Event, zones with their flight cycles, and fleet/pad/dock availability in one response."""
+    try:
+        overview = EvenementHelper.get_event_overview(event_id)
+        if overview:
+            return jsonify(overview)
+        return jsonify({"error": "Event not found"}), 404
+    except Exception as e:
+        return handle_error(e, f"Failed to retrieve overview for event {event_id}")
+
+@app.route('/api/events/<int:event_id>/plan', methods=['POST'])
+def plan_event(event_id):
+    """Assigns flight-ready drones to the event's zones and available startplaatsen."""
+    data = request.get_json(silent=True) or {}
+    app.logger.info(f"POST /api/events/{event_id}/plan data: {data}")
+    try:
+        dry_run = data.get('dry_run', False)
+        if not isinstance(dry_run, bool): raise ValueError("dry_run must be a boolean (true/false).")
+
+        if not EvenementHelper.get_event_by_id(event_id):
+            return jsonify({"error": "Event not found"}), 404
+
+        planned = PlanningHelper.plan_event(event_id, dry_run=dry_run)
+        app.logger.info(f"Planned {len(planned)} VluchtCyclus rows for event {event_id} (dry_run={dry_run})")
+        return jsonify({"event_id": event_id, "dry_run": dry_run, "assignments": planned}), 200 if dry_run else 201
+    except ValueError as ve:
+        if "already planned" in str(ve) or "taken while planning" in str(ve):
+            return jsonify({"error": str(ve)}), 409
+        return handle_error(ve, str(ve), 400)
+    except Exception as e:
+        return handle_error(e, f"Error planning event {event_id}")
+
 # --- Zone Routes ---
 @app.route('/api/zones', methods=['GET'])
+@coalesced
 def get_zones():
     try:
         event_id_str = request.args.get('event_id')
@@ -328,8 +539,53 @@ def delete_zone(zone_id):
         return handle_error(e, f"Error deleting zone {zone_id}")
 
 
+# --- Coverage Planning Routes ---
+def coverage_params():
+    """Reads the optional coverage planner parameters from the query string."""
+    return {
+        "swath": float(request.args.get('swath', CoverageHelper.DEFAULT_SWATH)),
+        "overlap": float(request.args.get('overlap', CoverageHelper.DEFAULT_OVERLAP)),
+        "speed": float(request.args.get('speed', CoverageHelper.DEFAULT_SPEED)),
+        "turn_seconds": float(request.args.get('turn_seconds', CoverageHelper.DEFAULT_TURN_SECONDS)),
+        "endurance_minutes": float(request.args.get('endurance_minutes', CoverageHelper.DEFAULT_ENDURANCE_MINUTES)),
+        "include_waypoints": bool(str_to_bool(request.args.get('waypoints'))),
+    }
+
+@app.route('/api/zones/<int:zone_id>/coverage', methods=['GET'])
+def get_zone_coverage(zone_id):
+    try:
+        params = coverage_params()
+        zone = ZoneHelper.get_zone_by_id(zone_id)
+        if not zone:
+            return jsonify({"error": "Zone not found"}), 404
+        return jsonify(CoverageHelper.plan_zones([zone], **params)[0])
+    except ValueError as ve:
+        return handle_error(ve, "Invalid coverage parameters", 400)
+    except Exception as e:
+        return handle_error(e, f"Failed to plan coverage for zone {zone_id}")
+
+@app.route('/api/events/<int:event_id>/coverage', methods=['GET'])
+def get_event_coverage(event_id):
+    try:
+        params = coverage_params()
+        if not EvenementHelper.get_event_by_id(event_id):
+            return jsonify({"error": "Event not found"}), 404
+        plans = CoverageHelper.plan_event(event_id, **params)
+        return jsonify({
+            "event_id": event_id,
+            "total_flight_minutes": round(sum(p["flight_minutes"] for p in plans), 1),
+            "total_battery_cycles": sum(p["battery_cycles"] for p in plans),
+            "zones": plans,
+        })
+    except ValueError as ve:
+        return handle_error(ve, "Invalid coverage parameters", 400)
+    except Exception as e:
+        return handle_error(e, f"Failed to plan coverage for event {event_id}")
+
+
 # --- Startplaats Routes ---
 @app.route('/api/startplaatsen', methods=['GET'])
+@coalesced
 def get_startplaatsen():
     try:
         is_beschikbaar_str = request.args.get('isbeschikbaar')
@@ -343,7 +599,8 @@ def get_startplaatsen():
              # startplaatsen = StartplaatsHelper.get_unavailable_startplaatsen()
              # Direct filter example:
              try:
-                  response = supabase.table("Startplaats").select("*").eq("isbeschikbaar", False).execute()
+                  response = (supabase.table("Startplaats").select("*").eq("isbeschikbaar", False)
+                              .or_(ReservationHelper.taken_filter()).execute())
                   startplaatsen = response.data
              except Exception as db_e:
                   raise Exception(f"Database error filtering startplaatsen: {db_e}") from db_e
@@ -459,6 +716,7 @@ def get_verslagen():
         is_verzonden_str = request.args.get('isverzonden')
         is_geaccepteerd_str = request.args.get('isgeaccepteerd')
         vlucht_cyclus_id_str = request.args.get('vlucht_cyclus_id') # Allow filtering by FK
+        full = str_to_bool(request.args.get('full')) # Include the whole inhoud per verslag
 
         is_verzonden = str_to_bool(is_verzonden_str)
         is_geaccepteerd = str_to_bool(is_geaccepteerd_str)
@@ -472,7 +730,7 @@ def get_verslagen():
         # Build query dynamically or use specific helper
         # Example direct query:
         try:
-            query = supabase.table("Verslag").select("*")
+            query = supabase.table("Verslag").select("*" if full else VerslagHelper.LIST_COLUMNS)
             if is_verzonden is not None:
                  query = query.eq("isverzonden", is_verzonden)
             if is_geaccepteerd is not None:
@@ -491,6 +749,19 @@ def get_verslagen():
     except Exception as e:
         return handle_error(e, "Failed to retrieve verslagen")
 
+@app.route('/api/verslagen/search', methods=['GET'])
+def search_verslagen():
+    """Ranked full-text search on onderwerp and inhoud: ?q=&limit=&cursor= (cursor from next_cursor)."""
+    try:
+        limit_str = request.args.get('limit', str(SearchHelper.DEFAULT_LIMIT))
+        if not limit_str.isdigit(): raise ValueError("limit must be a positive integer.")
+        result = SearchHelper.search(request.args.get('q', ''), limit=int(limit_str), cursor=request.args.get('cursor'))
+        return jsonify(result)
+    except ValueError as ve:
+        return handle_error(ve, str(ve), 400)
+    except Exception as e:
+        return handle_error(e, "Error searching verslagen")
+
 @app.route('/api/verslagen/<int:verslag_id>', methods=['GET'])
 def get_verslag(verslag_id):
     try:
@@ -610,6 +881,58 @@ def update_verslag(verslag_id):
          # Specific FK error check might be needed if helper doesn't raise ValueError
          return handle_error(e, f"Error updating verslag {verslag_id}")
 
+@app.route('/api/verslagen/<int:verslag_id>/content', methods=['PUT'])
+def put_verslag_content(verslag_id):
+    """Streams the request body into chunked storage; ?compress=true stores chunks zlib-compressed."""
+    app.logger.info(f"PUT /api/verslagen/{verslag_id}/content ({request.content_length} bytes)")
+    try:
+        compress = str_to_bool(request.args.get('compress')) or False
+        meta = VerslagContentHelper.write_content(verslag_id, request.stream, compress=compress)
+        if meta is None:
+            return jsonify({"error": "Verslag not found"}), 404
+        response = jsonify(meta)
+        response.headers['ETag'] = f'"{meta["inhoudDigest"]}"'
+        return response
+    except ValueError as ve:
+        if "concurrently" in str(ve):
+            return jsonify({"error": str(ve)}), 409
+        return handle_error(ve, str(ve), 400)
+    except Exception as e:
+        return handle_error(e, f"Error storing content for verslag {verslag_id}")
+
+@app.route('/api/verslagen/<int:verslag_id>/content', methods=['GET'])
+def get_verslag_content(verslag_id):
+    """Streams the full report body, or one byte range of it (Range: bytes=start-end)."""
+    try:
+        meta = VerslagContentHelper.get_meta(verslag_id)
+        if not meta:
+            return jsonify({"error": "Verslag not found"}), 404
+        length = meta["inhoudLengte"]
+        etag = f'"{meta["inhoudDigest"]}"'
+        headers = {'Accept-Ranges': 'bytes', 'ETag': etag}
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=304, headers=headers)
+
+        try:
+            # If-Range with a stale ETag means: send the whole (new) body
+            if_range = request.headers.get('If-Range')
+            byte_range = None if if_range and if_range != etag else \
+                VerslagContentHelper.parse_range(request.headers.get('Range'), length)
+        except LookupError:
+            return Response(status=416, headers={**headers, 'Content-Range': f'bytes */{length}'})
+
+        start, end = byte_range or (0, length - 1)
+        headers['Content-Length'] = str(end - start + 1)
+        status = 200
+        if byte_range:
+            status = 206
+            headers['Content-Range'] = f'bytes {start}-{end}/{length}'
+        body = VerslagContentHelper.iter_content(meta, start, end) if length else iter(())
+        return Response(stream_with_context(body), status=status, headers=headers,
+                        content_type='text/plain; charset=utf-8')
+    except Exception as e:
+        return handle_error(e, f"Error reading content for verslag {verslag_id}")
+
 @app.route('/api/verslagen/<int:verslag_id>', methods=['DELETE'])
 def delete_verslag(verslag_id):
     app.logger.info(f"DELETE /api/verslagen/{verslag_id}")
@@ -628,6 +951,7 @@ def delete_verslag(verslag_id):
 
 # --- Drone Routes (Verified OK - minor validation tweaks) ---
 @app.route('/api/drones', methods=['GET'])
+@coalesced
 def get_drones():
     try:
         # Optional filtering by status
@@ -761,24 +1085,123 @@ def delete_drone(drone_id):
         return handle_error(e, f"Error deleting drone {drone_id}")
 
 
+@app.route('/api/stream/drones', methods=['GET'])
+def stream_drones():
+    """Server-Sent Events: a snapshot of all drones, then created/updated/deleted events as they happen.
+
+    A client that falls too far behind gets a "resync" event and the stream ends;
+    EventSource reconnects and starts again from a fresh snapshot.
+    """
+    app.logger.info("GET /api/stream/drones")
+    try:
+        subscription = DroneHelper.events.subscribe()
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 503
+    try:
+        drones = DroneHelper.get_all_drones()
+    except Exception as e:
+        DroneHelper.events.unsubscribe(subscription)
+        return handle_error(e, "Failed to start drone stream")
+
+    heartbeat_seconds = float(os.environ.get('STREAM_HEARTBEAT_SECONDS', 15))
+
+    def sse(event_type, data, event_id=None):
+        head = f"id: {event_id}\n" if event_id is not None else ""
+        return f"{head}event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            yield sse("snapshot", [{k: d.get(k) for k in DroneHelper.STREAMED_FIELDS} for d in drones])
+            while True:
+                event = subscription.get(timeout=heartbeat_seconds)
+                if event is None:
+                    if subscription.closed:
+                        return
+                    yield ": keepalive\n\n" # Keeps proxies from closing an idle connection
+                    continue
+                yield sse(event["type"], event["data"], event["id"])
+        finally:
+            DroneHelper.events.unsubscribe(subscription)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/drones/<int:drone_id>/timeline', methods=['GET'])
+def get_drone_timeline(drone_id):
+    """Streams a drone's flight and docking cycles in startuur order, one page per request.
+    ?include_archived=1 adds the cycles of archived events."""
+    try:
+        cursor = request.args.get('cursor')
+        include_archived = str_to_bool(request.args.get('include_archived')) or False
+        try:
+            limit = int(request.args.get('limit', TimelineHelper.DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"error": "Invalid limit parameter"}), 400
+        if not (1 <= limit <= TimelineHelper.MAX_PAGE_SIZE):
+            return jsonify({"error": f"limit must be between 1 and {TimelineHelper.MAX_PAGE_SIZE}"}), 400
+        if cursor:
+            TimelineHelper.decode_cursor(cursor) # Validate before the response starts streaming
+
+        if not DroneHelper.get_drone_by_id(drone_id):
+            return jsonify({"error": "Drone not found"}), 404
+
+        entries = TimelineHelper.iter_drone_timeline(drone_id, cursor=cursor, page_size=limit,
+                                                     include_archived=include_archived)
+
+        def generate():
+            yield '{"items":['
+            count = 0
+            last_key = None
+            next_cursor = None
+            for key, entry in entries:
+                # Never split entries sharing a sort key across pages, the cursor could not resume between them
+                if count >= limit and key != last_key:
+                    next_cursor = TimelineHelper.encode_cursor(last_key)
+                    break
+                yield (',' if count else '') + json.dumps(entry)
+                count += 1
+                last_key = key
+            yield '],"next_cursor":' + json.dumps(next_cursor) + '}'
+
+        return Response(stream_with_context(generate()), mimetype='application/json')
+    except ValueError as ve:
+        return handle_error(ve, str(ve), 400)
+    except Exception as e:
+        return handle_error(e, f"Failed to retrieve timeline for drone {drone_id}")
+
+
 # --- Cyclus Routes ---
 @app.route('/api/cycli', methods=['GET'])
+@coalesced
 def get_cycli():
     try:
-        # Allow filtering by VluchtCyclusId
+        # Allow filtering by VluchtCyclusId; include_archived=1 adds the cycles of archived events
+        include_archived = str_to_bool(request.args.get('include_archived'))
         vlucht_cyclus_id_str = request.args.get('VluchtCyclusId')
         if vlucht_cyclus_id_str:
              try:
                  vlucht_cyclus_id = int(vlucht_cyclus_id_str)
-                 cycli = CyclusHelper.get_cycli_by_vlucht_cyclus(vlucht_cyclus_id) # Use helper
              except ValueError:
                  return jsonify({"error": "Invalid VluchtCyclusId parameter"}), 400
+             cycli = CyclusHelper.get_cycli_by_vlucht_cyclus(vlucht_cyclus_id, include_archived) # Use helper
         else:
-             cycli = CyclusHelper.get_all_cycli()
+             cycli = CyclusHelper.get_all_cycli(include_archived)
         return jsonify(cycli)
     except Exception as e:
         return handle_error(e, "Failed to retrieve cycli")
 
+@app.route('/api/cycli/conflicts', methods=['GET'])
+def get_cyclus_conflicts():
+    """Lists overlapping cycles per drone and per docking station."""
+    try:
+        if str_to_bool(request.args.get('rebuild')):
+            CycleIndex.rebuild()
+        conflicts = CyclusHelper.get_conflicts()
+        return jsonify({"count": len(conflicts), "conflicts": conflicts})
+    except Exception as e:
+        return handle_error(e, "Failed to build cyclus conflict report")
+
 @app.route('/api/cycli/<int:cyclus_id>', methods=['GET'])
 def get_cyclus(cyclus_id):
     try:
@@ -909,11 +1332,13 @@ def get_vlucht_cycli():
                     filters[db_col] = int(param_val_str)
                 except ValueError:
                     return jsonify({"error": f"Invalid {param_key} parameter"}), 400
+        include_archived = str_to_bool(request.args.get('include_archived'))
 
         if filters:
              # Add helper VluchtCyclusHelper.get_vlucht_cycli_filtered(**filters) or query directly
             try:
-                query = supabase.table("VluchtCyclus").select("*")
+                table = VluchtCyclusHelper.HISTORY_VIEW if include_archived else VluchtCyclusHelper.TABLE_NAME
+                query = supabase.table(table).select("*")
                 for col, val in filters.items():
                      query = query.eq(col, val)
                 response = query.execute()
@@ -921,7 +1346,7 @@ def get_vlucht_cycli():
             except Exception as db_e:
                  raise Exception(f"Database error filtering vlucht cycli: {db_e}") from db_e
         else:
-            vlucht_cycli = VluchtCyclusHelper.get_all_vlucht_cycli()
+            vlucht_cycli = VluchtCyclusHelper.get_all_vlucht_cycli(include_archived)
         return jsonify(vlucht_cycli)
     except Exception as e:
         return handle_error(e, "Failed to retrieve vlucht cycli")
@@ -1094,11 +1519,13 @@ def get_docking_cycli():
                     filters[db_col] = int(param_val_str)
                 except ValueError:
                     return jsonify({"error": f"Invalid {param_key} parameter"}), 400
+        include_archived = str_to_bool(request.args.get('include_archived'))
 
         if filters:
              # Use specific helpers or direct query
              try:
-                query = supabase.table("DockingCyclus").select("*")
+                table = DockingCyclusHelper.HISTORY_VIEW if include_archived else DockingCyclusHelper.TABLE_NAME
+                query = supabase.table(table).select("*")
                 for col, val in filters.items():
                      query = query.eq(col, val)
                 response = query.execute()
@@ -1110,7 +1537,7 @@ def get_docking_cycli():
              #     docking_cycli = DockingCyclusHelper.get_docking_cycli_by_cyclus(filters['CyclusId'])
              # # Add similar logic for other filters or combine if needed
         else:
-            docking_cycli = DockingCyclusHelper.get_all_docking_cycli()
+            docking_cycli = DockingCyclusHelper.get_all_docking_cycli(include_archived)
         return jsonify(docking_cycli)
     except Exception as e:
         return handle_error(e, "Failed to retrieve docking cycli")
@@ -1225,6 +1652,7 @@ def delete_docking_cyclus(docking_cyclus_id):
 
 # --- Docking Routes (Add basic CRUD similar to Startplaats if needed) ---
 @app.route('/api/docking', methods=['GET'])
+@coalesced
 def get_docking_stations():
     try:
         is_beschikbaar_str = request.args.get('isbeschikbaar')
@@ -1235,7 +1663,8 @@ def get_docking_stations():
         elif is_beschikbaar is False:
              # Add helper or filter directly
              try:
-                  response = supabase.table("Docking").select("*").eq("isbeschikbaar", False).execute()
+                  response = (supabase.table("Docking").select("*").eq("isbeschikbaar", False)
+                              .or_(ReservationHelper.taken_filter()).execute())
                   stations = response.data
              except Exception as db_e:
                   raise Exception(f"Database error filtering docking stations: {db_e}") from db_e
@@ -1343,7 +1772,166 @@ def delete_docking_station(docking_id):
     except Exception as e:
         return handle_error(e, f"Error deleting docking station {docking_id}")
 
+# --- Availability Routes ---
+@app.route('/api/availability', methods=['GET'])
+def get_availability():
+    """Drones and docking stations with no cycle between 'from' and 'to' (HH:MM[:SS])."""
+    van_str = request.args.get('from')
+    tot_str = request.args.get('to')
+    if not van_str or not tot_str:
+        return jsonify({"error": "Missing required parameters: from, to"}), 400
+    try:
+        van = time.fromisoformat(van_str)
+        tot = time.fromisoformat(tot_str)
+        if van == tot: raise ValueError("'from' and 'to' must differ.")
+        return jsonify(AvailabilityHelper.get_availability(van, tot))
+    except ValueError as ve:
+        return handle_error(ve, "Invalid from/to parameters", 400)
+    except Exception as e:
+        return handle_error(e, "Failed to compute availability")
+
+# --- Forecast Routes ---
+@app.route('/api/forecast/battery', methods=['GET'])
+def get_battery_forecast():
+    """Projected battery per drone over an event's flight and docking cycles."""
+    event_id_str = request.args.get('event_id')
+    if not event_id_str:
+        return jsonify({"error": "Missing required parameter: event_id"}), 400
+    try:
+        try:
+            event_id = int(event_id_str)
+        except ValueError:
+            return jsonify({"error": "Invalid event_id parameter"}), 400
+        drain_rate = float(request.args.get('drain_rate', ForecastHelper.DEFAULT_DRAIN_RATE))
+        charge_rate = float(request.args.get('charge_rate', ForecastHelper.DEFAULT_CHARGE_RATE))
+        safe_level = float(request.args.get('safe_level', ForecastHelper.DEFAULT_SAFE_LEVEL))
+        if drain_rate < 0 or charge_rate < 0: raise ValueError("drain_rate and charge_rate cannot be negative.")
+        if not (0 <= safe_level <= 100): raise ValueError("safe_level must be between 0 and 100.")
+
+        if not EvenementHelper.get_event_by_id(event_id):
+            return jsonify({"error": "Event not found"}), 404
+
+        forecast = ForecastHelper.forecast_event(event_id, drain_rate=drain_rate,
+                                                 charge_rate=charge_rate, safe_level=safe_level)
+        return jsonify({
+            "event_id": event_id,
+            "safe_level": safe_level,
+            "at_risk": sum(1 for f in forecast if f["drops_below_safe"]),
+            "drones": forecast,
+        })
+    except ValueError as ve:
+        return handle_error(ve, "Invalid forecast parameters", 400)
+    except Exception as e:
+        return handle_error(e, f"Failed to forecast battery for event {event_id_str}")
+
+# --- Charging Routes ---
+@app.route('/api/charging/schedule', methods=['POST'])
+def schedule_charging():
+    """Runs one charging pass: lowest-battery drones get the free docking stations."""
+    data = request.get_json(silent=True) or {}
+    app.logger.info(f"POST /api/charging/schedule data: {data}")
+    try:
+        threshold = data.get('threshold', ChargingHelper.DEFAULT_THRESHOLD)
+        if not isinstance(threshold, int) or isinstance(threshold, bool):
+            raise ValueError("threshold must be an integer.")
+        dry_run = data.get('dry_run', False)
+        if not isinstance(dry_run, bool): raise ValueError("dry_run must be a boolean (true/false).")
+
+        scheduled = ChargingHelper.schedule_charging(threshold=threshold, dry_run=dry_run)
+        app.logger.info(f"Charging pass scheduled {len(scheduled)} drones (dry_run={dry_run})")
+        return jsonify({"dry_run": dry_run, "scheduled": scheduled}), 200 if dry_run else 201
+    except ValueError as ve:
+        # Raised for bad input and for a lost race on a docking station (handle_error would force 400)
+        if "concurrently" in str(ve):
+            app.logger.warning(f"Charging pass conflict: {ve}")
+            return jsonify({"error": str(ve)}), 409
+        return handle_error(ve, str(ve), 400)
+    except Exception as e:
+        return handle_error(e, "Error scheduling charging")
+
+# --- Reservation Routes ---
+def reserve_resources(table, path):
+    """Shared body of the reserve routes: claims `aantal` free rows for `ttl_seconds`."""
+    data = request.get_json(silent=True) or {}
+    app.logger.info(f"POST {path} data: {data}")
+    try:
+        aantal = data.get('aantal', 1)
+        ttl_seconds = data.get('ttl_seconds', ReservationHelper.DEFAULT_TTL_SECONDS)
+        for name, value in (('aantal', aantal), ('ttl_seconds', ttl_seconds)):
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise ValueError(f"{name} must be an integer.")
+
+        rows = ReservationHelper.reserve(table, aantal=aantal, ttl_seconds=ttl_seconds)
+        app.logger.info(f"Reserved {table} {[row['Id'] for row in rows]}")
+        return jsonify({
+            "token": rows[0]["reserveringToken"],
+            "gereserveerdTot": rows[0]["gereserveerdTot"],
+            "reserved": rows,
+        }), 201
+    except ValueError as ve:
+        if "Not enough free" in str(ve):
+            return jsonify({"error": str(ve)}), 409
+        return handle_error(ve, str(ve), 400)
+    except Exception as e:
+        return handle_error(e, f"Error reserving {table}")
+
+def end_reservation(table, path, confirm):
+    """Shared body of the release/confirm routes."""
+    data = request.get_json(silent=True) or {}
+    app.logger.info(f"POST {path} data: {data}")
+    try:
+        token = data.get('token')
+        if not token or not isinstance(token, str):
+            raise ValueError("Missing required field: token")
+        affected = ReservationHelper.end(table, token, confirm=confirm)
+        if not affected:
+            # Unknown token, already released, or (when confirming) expired
+            return jsonify({"error": "Reservation not found or expired"}), 404
+        return jsonify({"token": token, "confirmed": confirm, "count": affected})
+    except ValueError as ve:
+        return handle_error(ve, str(ve), 400)
+    except Exception as e:
+        return handle_error(e, f"Error ending {table} reservation")
+
+@app.route('/api/startplaatsen/reserve', methods=['POST'])
+def reserve_startplaatsen():
+    return reserve_resources("Startplaats", "/api/startplaatsen/reserve")
+
+@app.route('/api/startplaatsen/release', methods=['POST'])
+def release_startplaatsen():
+    return end_reservation("Startplaats", "/api/startplaatsen/release", confirm=False)
+
+@app.route('/api/startplaatsen/confirm', methods=['POST'])
+def confirm_startplaatsen():
+    return end_reservation("Startplaats", "/api/startplaatsen/confirm", confirm=True)
+
+@app.route('/api/docking/reserve', methods=['POST'])
+def reserve_dockings():
+    return reserve_resources("Docking", "/api/docking/reserve")
+
+@app.route('/api/docking/release', methods=['POST'])
+def release_dockings():
+    return end_reservation("Docking", "/api/docking/release", confirm=False)
+
+@app.route('/api/docking/confirm', methods=['POST'])
+def confirm_dockings():
+    return end_reservation("Docking", "/api/docking/confirm", confirm=True)
+
+@app.route('/api/dashboard/events/<int:event_id>', methods=['GET'])
+@coalesced
+def get_event_dashboard(event_id):
+    # Event-scoped counterpart of drone-status: drones are linked to the event through their flight cycles
+    app.logger.info(f"GET /api/dashboard/events/{event_id}")
+    try:
+        kpis = KpiHelper.get_event_kpis(event_id)
+        if kpis is None:
+            return jsonify({"error": "Event not found"}), 404
+        return jsonify(kpis)
+    except Exception as e:
+        return handle_error(e, f"Error getting dashboard for event {event_id}")
+
 @app.route('/api/dashboard/drone-status', methods=['GET'])
+@coalesced
 def get_drone_status():
     # This dashboard provides overall drone status, not specific to an event
     # (as Drone table doesn't link directly to Evenement)
@@ -1389,6 +1977,138 @@ def get_drone_status():
     except Exception as e:
         return handle_error(e, "Error getting drone status dashboard")
 
+@app.route('/api/changes', methods=['GET'])
+def get_changes():
+    """Delta sync: journal entries after ?since=<cursor>, optionally only for ?tables=Drone,Zone.
+
+    Start with since=0; clients store next_since and pass it on the next call. 410 means
+    the journal no longer reaches back that far: the client reloads its tables and starts
+    over with the next_since of the 410 body (since=0, the oldest retained entry). Entries
+    it replays that way are already in the reloaded data.
+    """
+    try:
+        since = request.args.get('since', '0')
+        limit = request.args.get('limit', str(ChangeHelper.DEFAULT_LIMIT))
+        if not limit.isdigit():
+            raise ValueError("limit must be a non-negative integer.")
+        tables = [t.strip() for t in request.args.get('tables', '').split(',') if t.strip()] or None
+        return jsonify(ChangeHelper.get_changes(since, tables=tables, limit=int(limit)))
+    except LookupError as le:
+        return jsonify({"error": str(le), "resync": True, "next_since": "0"}), 410
+    except ValueError as ve:
+        return handle_error(ve, str(ve), 400)
+    except Exception as e:
+        return handle_error(e, "Error fetching changes")
+
+@app.route('/api/export/<table>', methods=['GET'])
+def export_table(table):
+    """Streams a whole table as ?format=csv (default) or parquet.
+
+    ?columns=a,b selects columns (Id is always included); ?event_id= and ?from=/?to=
+    (ISO dates, matched against the event period) restrict the rows. ?include_archived=1
+    adds the cycles of archived events. Parquet needs pyarrow.
+    """
+    app.logger.info(f"GET /api/export/{table} with args: {request.args}")
+    try:
+        export_format = request.args.get('format', 'csv').lower()
+        if export_format not in ExportHelper.FORMATS:
+            raise ValueError(f"Invalid format '{export_format}'. Must be one of: {', '.join(ExportHelper.FORMATS)}")
+        requested = [c.strip() for c in request.args.get('columns', '').split(',') if c.strip()]
+        columns = ExportHelper.resolve_columns(table, requested)
+        event_id_str = request.args.get('event_id')
+        if event_id_str is not None and not event_id_str.isdigit():
+            raise ValueError("event_id must be an integer.")
+        event_id = int(event_id_str) if event_id_str else None
+        date_from = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+        date_to = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+        include_archived = str_to_bool(request.args.get('include_archived')) or False
+        if date_from and date_to and date_from > date_to:
+            raise ValueError("'from' must not be after 'to'.")
+        if export_format == 'parquet' and not ExportHelper.parquet_available():
+            return jsonify({"error": "Parquet export requires pyarrow, which is not installed."}), 501
+
+        scope = ExportHelper.resolve_scope(event_id, date_from, date_to)
+        if export_format == 'parquet':
+            body = ExportHelper.stream_parquet(table, columns, scope, include_archived)
+            mimetype = 'application/vnd.apache.parquet'
+        else:
+            body = ExportHelper.stream_csv(table, columns, scope, include_archived)
+            mimetype = 'text/csv'
+        headers = {'Content-Disposition': f'attachment; filename="{table}.{export_format}"'}
+        return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
+    except ValueError as ve:
+        return handle_error(ve, str(ve), 400)
+    except Exception as e:
+        return handle_error(e, f"Error exporting {table}")
+
+@app.route('/api/import/<table>', methods=['POST'])
+def import_table(table):
+    """Bulk import of Evenement, Zone, Drone or Docking rows from CSV.
+
+    The CSV is the request body or a multipart "file" field. By default nothing is
+    inserted when any row is invalid; ?skip_invalid=true inserts the valid rows and
+    ?dry_run=true only validates. The response lists the errors per row.
+    """
+    upload = request.files.get('file')
+    raw = upload.read() if upload else request.get_data()
+    app.logger.info(f"POST /api/import/{table} ({len(raw)} bytes)")
+    try:
+        try:
+            text = raw.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ValueError("CSV must be UTF-8 encoded")
+        report = ImportHelper.import_csv(
+            table, text,
+            skip_invalid=str_to_bool(request.args.get('skip_invalid')) or False,
+            dry_run=str_to_bool(request.args.get('dry_run')) or False,
+        )
+        if report.get("failed"):
+            return jsonify(report), 500
+        if report["error_count"] and not report["inserted"]:
+            return jsonify(report), 422
+        return jsonify(report), 200 if report["dry_run"] else 201
+    except ValueError as ve:
+        return handle_error(ve, str(ve), 400)
+    except Exception as e:
+        return handle_error(e, f"Error importing {table}")
+
+@app.route('/api/analytics/utilization', methods=['GET'])
+@coalesced
+def get_utilization():
+    """Flight/docking hours, cycle counts, idle gaps and utilization per drone, zone, event and dock.
+
+    ?event_id= limits the result to one event; ?group_by=drone,zone limits the groups returned;
+    ?include_archived=1 counts the cycles of archived events too.
+    Recomputed only when one of the source tables changed.
+    """
+    app.logger.info(f"GET /api/analytics/utilization with args: {request.args}")
+    try:
+        event_id_str = request.args.get('event_id')
+        if event_id_str is not None and not event_id_str.isdigit():
+            raise ValueError("event_id must be an integer.")
+        groups = [group.strip() for group in request.args.get('group_by', '').split(',') if group.strip()] or None
+        include_archived = str_to_bool(request.args.get('include_archived')) or False
+        result = AnalyticsHelper.get_utilization(int(event_id_str) if event_id_str else None, groups,
+                                                 include_archived)
+        return jsonify(result)
+    except LookupError as le:
+        return jsonify({"error": str(le)}), 404
+    except ValueError as ve:
+        return handle_error(ve, str(ve), 400)
+    except Exception as e:
+        return handle_error(e, "Error computing utilization analytics")
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Per-process request coalescing and rate limiting counters."""
+    return jsonify({
+        "coalescing": read_coalescer.metrics(),
+        "rate_limited": dict(AdmissionHelper.rejected),
+        "event_kpi_cache": {"hits": KpiHelper.hits, "misses": KpiHelper.misses},
+        "drone_stream": {"subscribers": DroneHelper.events.subscriber_count,
+                         "evictions": DroneHelper.events.evictions},
+    })
+
 # Run the application
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5328))
@@ -0,0 +1,178 @@
+"""ASGI entry point.
+
+Serves the composite routes natively on the event loop with AsyncHelper, so
+their independent queries run concurrently and a waiting request holds no
+thread. Every other request goes to the unchanged Flask app (api/app.py),
+which runs in asgiref's thread pool:
+
+    uvicorn api.asgi:app --port 5328
+
+GET /api/stream/drones is served natively as well: each subscriber waits on the
+event loop instead of holding one of the thread pool's few threads, which a
+handful of open dashboards would otherwise exhaust.
+
+Natively served requests pass the same admission control as Flask. A POST that
+carries an Idempotency-Key is handed to Flask, which owns the idempotency store.
+Raise MAX_IN_FLIGHT_REQUESTS when running this way; its default is sized for
+thread-per-request Flask.
+"""
+from typing import Optional, Tuple
+import asyncio
+import json
+import os
+import re
+import logging
+
+from asgiref.wsgi import WsgiToAsgi
+
+from .app import app as flask_app
+from .helpers import AdmissionHelper, AsyncHelper, DroneHelper, IdempotencyHelper
+
+logger = logging.getLogger(__name__)
+
+wsgi = WsgiToAsgi(flask_app)
+
+
+async def _read_json(receive):
+    """Decoded request body, None when empty. Raises ValueError on malformed JSON."""
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    try:
+        return json.loads(body) if body else None
+    except ValueError: # JSONDecodeError, or a body that is not UTF-8
+        raise ValueError("Request body is not valid JSON")
+
+
+async def _send_json(send, status: int, payload, headers=()) -> None:
+    body = json.dumps(payload, default=str).encode()
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                            *headers]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def event_overview(scope, receive, send, event_id: str) -> None:
+    overview = await AsyncHelper.get_event_overview(int(event_id))
+    if overview is None:
+        return await _send_json(send, 404, {"error": "Event not found"})
+    await _send_json(send, 200, overview)
+
+
+async def create_vlucht_cyclus(scope, receive, send) -> None:
+    try:
+        data = await _read_json(receive)
+    except ValueError as ve:
+        return await _send_json(send, 400, {"error": str(ve)})
+    if not data:
+        return await _send_json(send, 400, {"error": "No input data provided"})
+    if not isinstance(data, dict):
+        return await _send_json(send, 400, {"error": "Request body must be a JSON object"})
+    try:
+        ids = {key: int(data[key]) if data.get(key) is not None else None
+               for key in ("VerslagId", "PlaatsId", "DroneId", "ZoneId")}
+    except (ValueError, TypeError):
+        return await _send_json(send, 400, {"error": "Invalid format for IDs, must be integers"})
+    try:
+        vlucht_cyclus = await AsyncHelper.create_vlucht_cyclus(
+            verslag_id=ids["VerslagId"], plaats_id=ids["PlaatsId"], drone_id=ids["DroneId"], zone_id=ids["ZoneId"]
+        )
+    except ValueError as ve:
+        return await _send_json(send, 400, {"error": str(ve)})
+    await _send_json(send, 201, vlucht_cyclus)
+
+
+def _sse(event_type: str, data, event_id=None) -> bytes:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+
+
+async def _until_disconnect(receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def stream_drones(scope, receive, send) -> None:
+    """Native version of app.stream_drones: snapshot, then created/updated/deleted events."""
+    try:
+        subscription = DroneHelper.events.subscribe()
+    except ValueError as ve:
+        return await _send_json(send, 503, {"error": str(ve)})
+    disconnected = None
+    try:
+        drones = await AsyncHelper.select(DroneHelper.TABLE_NAME, ", ".join(DroneHelper.STREAMED_FIELDS))
+        heartbeat_seconds = float(os.environ.get('STREAM_HEARTBEAT_SECONDS', 15))
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"),
+                                (b"x-accel-buffering", b"no")]})
+        await send({"type": "http.response.body", "body": b"retry: 3000\n\n" + _sse("snapshot", drones),
+                    "more_body": True})
+        disconnected = asyncio.ensure_future(_until_disconnect(receive))
+        while not disconnected.done():
+            event = await subscription.next_event(heartbeat_seconds)
+            if event is None:
+                if subscription.closed:
+                    break
+                body = b": keepalive\n\n" # Keeps proxies from closing an idle connection
+            else:
+                body = _sse(event["type"], event["data"], event["id"])
+            try:
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+            except OSError: # Client went away between two events
+                return
+        if not disconnected.done():
+            await send({"type": "http.response.body", "body": b""})
+    finally:
+        if disconnected is not None:
+            disconnected.cancel()
+        DroneHelper.events.unsubscribe(subscription)
+
+
+# (method, path pattern, Flask rule for admission control, handler)
+ROUTES = [
+    ("GET", re.compile(r"/api/events/(\d+)/overview"), "/api/events/<int:event_id>/overview", event_overview),
+    ("POST", re.compile(r"/api/vlucht-cycli"), "/api/vlucht-cycli", create_vlucht_cyclus),
+    ("GET", re.compile(r"/api/stream/drones"), "/api/stream/drones", stream_drones),
+]
+
+
+def _client(scope) -> Tuple[str, Optional[str]]:
+    """Same identity as app.client_id(): the peer address, or the trusted X-Forwarded-For hop,
+    plus X-Client-Id as sub-key."""
+    headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+    peer = scope["client"][0] if scope.get("client") else None
+    return AdmissionHelper.client_address(peer, headers.get("x-forwarded-for")), headers.get("x-client-id")
+
+
+async def app(scope, receive, send) -> None:
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                return await send({"type": "lifespan.shutdown.complete"})
+
+    if scope["type"] == "http":
+        idempotent = any(k.lower() == IdempotencyHelper.HEADER.lower().encode() for k, _ in scope.get("headers", []))
+        for method, pattern, rule, handler in ROUTES:
+            match = pattern.fullmatch(scope["path"])
+            if not match or scope["method"] != method or (method == "POST" and idempotent):
+                continue
+            client, sub_key = _client(scope)
+            admitted, retry_after, slot = AdmissionHelper.admit(client, method, rule, sub_key)
+            if not admitted:
+                return await _send_json(send, 429, {"error": "Too many requests, retry later."},
+                                        [(b"retry-after", str(retry_after).encode())])
+            try:
+                return await handler(scope, receive, send, *match.groups())
+            except Exception as e:
+                logger.error(f"{method} {scope['path']} failed: {e}")
+                return await _send_json(send, 500, {"error": "Internal server error"})
+            finally:
+                AdmissionHelper.release(slot)
+
+    await wsgi(scope, receive, send)
@@ -10,4 +10,14 @@ supabase_url = os.getenv("SUPABASE_URL")
 supabase_key = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
 supabase: Client = create_client(supabase_url, supabase_key)
 
+# Async client for the ASGI entry point (api/asgi.py), created on first use inside the running event loop
+_async_supabase = None
+
+async def get_async_supabase():
+    global _async_supabase
+    if _async_supabase is None:
+        from supabase import acreate_client
+        _async_supabase = await acreate_client(supabase_url, supabase_key)
+    return _async_supabase
+
 # Export the supabase client instance
\ No newline at end of file
@@ -7,6 +7,28 @@ from .docking_helper import DockingHelper
 from .cyclus_helper import CyclusHelper
 from .vluchtcyclus_helper import VluchtCyclusHelper
 from .dockingcyclus_helper import DockingCyclusHelper
+from .timeline_helper import TimelineHelper
+from .planning_helper import PlanningHelper
+from .charging_helper import ChargingHelper
+from .cycle_index import CycleIndex
+from .availability_helper import AvailabilityHelper
+from .forecast_helper import ForecastHelper
+from .coverage_helper import CoverageHelper
+from .reservation_helper import ReservationHelper
+from .idempotency_helper import IdempotencyHelper
+from .admission_helper import AdmissionHelper
+from .single_flight import SingleFlight
+from .async_helper import AsyncHelper
+from .broadcaster import Broadcaster
+from .change_helper import ChangeHelper
+from .search_helper import SearchHelper
+from .verslag_content_helper import VerslagContentHelper
+from .export_helper import ExportHelper
+from .import_helper import ImportHelper
+from .snapshot_helper import SnapshotHelper
+from .analytics_helper import AnalyticsHelper
+from .kpi_helper import KpiHelper
+from .archive_helper import ArchiveHelper
 
 # This makes all helper classes available when importing from the helpers package
 # Example: from .helpers import EvenementHelper (if importing from api/app.py)
\ No newline at end of file
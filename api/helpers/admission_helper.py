@@ -0,0 +1,208 @@
+from typing import Dict, Optional, Tuple
+import math
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Request classes, highest priority first
+TELEMETRY = "telemetry"
+WRITE = "write"
+READ = "read"
+BULK_READ = "bulk_read"
+
+
+class TokenBucket:
+    """Classic token bucket. Not thread-safe on its own; AdmissionHelper guards it with a lock stripe."""
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take one token. Returns 0 when admitted, otherwise the seconds until a token is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+class AdmissionHelper:
+    """Admission control in front of the Flask routes.
+
+    Three checks, cheapest first:
+      1. a token bucket per (client, request class),
+      2. a token bucket per DB-heavy route, shared by all clients,
+      3. a concurrency cap: DB-heavy routes each get MAX_IN_FLIGHT_PER_ROUTE slots,
+         and lower-priority classes are refused earlier as the global in-flight count
+         approaches MAX_IN_FLIGHT, which keeps headroom for telemetry and writes.
+
+    Buckets live in dicts guarded by LOCK_STRIPES striped locks, so unrelated clients
+    never contend and a check costs a few microseconds.
+
+    A client is its network address (client_address): the peer, or the X-Forwarded-For
+    hop added by a configured number of trusted proxies. Headers the client writes itself
+    never pick the bucket; X-Client-Id only adds a sub-bucket under the address, so apps
+    sharing one NAT address get a fair share without being able to raise the address limit.
+    """
+    LOCK_STRIPES = 64
+    MAX_BUCKETS = 50000                 # idle client buckets are pruned beyond this
+
+    # (tokens per second, burst) per client and class
+    CLIENT_LIMITS = {
+        TELEMETRY: (50.0, 100.0),
+        WRITE: (20.0, 40.0),
+        READ: (10.0, 30.0),
+        BULK_READ: (2.0, 5.0),
+    }
+    SUB_KEY_SHARE = 0.5                 # an X-Client-Id may use this share of its address's limits
+    TRUSTED_PROXIES = 0                 # reverse proxies in front of the app that append X-Forwarded-For
+    ROUTE_LIMIT = (50.0, 100.0)         # per DB-heavy route, all clients together
+    MAX_IN_FLIGHT = 64
+    MAX_IN_FLIGHT_PER_ROUTE = 16
+    # A class is admitted while the global in-flight count is below this share of MAX_IN_FLIGHT
+    CLASS_SHARE = {TELEMETRY: 1.0, WRITE: 1.0, READ: 0.75, BULK_READ: 0.5}
+
+    TELEMETRY_ROUTES = {
+        ("PUT", "/api/drones/<int:drone_id>"),
+    }
+    # List/scan endpoints that issue full-table or multi-query reads
+    DB_HEAVY_ROUTES = {
+        "/api/cycli", "/api/cycli/conflicts", "/api/vlucht-cycli", "/api/docking-cycli",
+        "/api/drones", "/api/zones", "/api/verslagen", "/api/events", "/api/docking", "/api/startplaatsen",
+        "/api/availability", "/api/forecast/battery", "/api/events/<int:event_id>/coverage",
+        "/api/drones/<int:drone_id>/timeline", "/api/dashboard/drone-status", "/api/events/<int:event_id>/overview",
+        "/api/changes", "/api/export/<table>", "/api/analytics/utilization",
+        "/api/dashboard/events/<int:event_id>",
+    }
+
+    # Long-lived streams hold no in-flight slot; they would otherwise starve everything else
+    STREAMING_ROUTES = {"/api/stream/drones"}
+
+    enabled = True
+    _locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+    _client_buckets: Dict[Tuple[str, str], TokenBucket] = {}
+    _route_buckets: Dict[str, TokenBucket] = {}
+    _in_flight_lock = threading.Lock()
+    _in_flight = 0
+    _in_flight_per_route: Dict[str, int] = {}
+    rejected: Dict[str, int] = {TELEMETRY: 0, WRITE: 0, READ: 0, BULK_READ: 0}
+
+    @staticmethod
+    def configure(enabled: bool = True, max_in_flight: Optional[int] = None,
+                  limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                  trusted_proxies: Optional[int] = None) -> None:
+        AdmissionHelper.enabled = enabled
+        if trusted_proxies is not None:
+            if trusted_proxies < 0:
+                raise ValueError("trusted_proxies must be non-negative")
+            AdmissionHelper.TRUSTED_PROXIES = trusted_proxies
+        if max_in_flight is not None:
+            AdmissionHelper.MAX_IN_FLIGHT = max_in_flight
+        if limits:
+            AdmissionHelper.CLIENT_LIMITS = {**AdmissionHelper.CLIENT_LIMITS, **limits}
+
+    @staticmethod
+    def client_address(peer: Optional[str], forwarded_for: Optional[str] = None) -> str:
+        """The address to rate limit on, as werkzeug's ProxyFix(x_for=TRUSTED_PROXIES) resolves it.
+
+        Each trusted proxy appends the address it received the request from, so the entry
+        TRUSTED_PROXIES from the right was written by our outermost proxy; everything left of
+        it came from the client. With no trusted proxies, or fewer hops than expected, the
+        header is ignored.
+        """
+        trusted = AdmissionHelper.TRUSTED_PROXIES
+        if trusted and forwarded_for:
+            hops = [hop.strip() for hop in forwarded_for.split(",")]
+            if len(hops) >= trusted and hops[-trusted]:
+                return hops[-trusted]
+        return peer or "unknown"
+
+    @staticmethod
+    def classify(method: str, rule: Optional[str]) -> str:
+        if (method, rule) in AdmissionHelper.TELEMETRY_ROUTES:
+            return TELEMETRY
+        if method not in ("GET", "HEAD", "OPTIONS"):
+            return WRITE
+        return BULK_READ if rule in AdmissionHelper.DB_HEAVY_ROUTES else READ
+
+    @staticmethod
+    def _take(buckets: Dict, key, limit: Tuple[float, float], now: float) -> float:
+        with AdmissionHelper._locks[hash(key) % AdmissionHelper.LOCK_STRIPES]:
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = TokenBucket(limit[0], limit[1], now)
+            return bucket.take(now)
+
+    @staticmethod
+    def admit(client: str, method: str, rule: Optional[str],
+              sub_key: Optional[str] = None) -> Tuple[bool, int, Optional[str]]:
+        """Returns (admitted, retry_after_seconds, slot). An admitted request must call release(slot).
+
+        client is the client_address; sub_key (X-Client-Id) narrows it, it never replaces it.
+        """
+        if not AdmissionHelper.enabled:
+            return True, 0, None
+        request_class = AdmissionHelper.classify(method, rule)
+        now = time.monotonic()
+
+        limit = AdmissionHelper.CLIENT_LIMITS[request_class]
+        wait = 0.0
+        if sub_key:
+            share = AdmissionHelper.SUB_KEY_SHARE
+            wait = AdmissionHelper._take(AdmissionHelper._client_buckets, (client, sub_key, request_class),
+                                         (limit[0] * share, max(1.0, limit[1] * share)), now)
+        if not wait:
+            wait = AdmissionHelper._take(AdmissionHelper._client_buckets, (client, request_class), limit, now)
+        heavy = method == "GET" and rule in AdmissionHelper.DB_HEAVY_ROUTES
+        if not wait and heavy:
+            wait = AdmissionHelper._take(AdmissionHelper._route_buckets, rule, AdmissionHelper.ROUTE_LIMIT, now)
+        if wait:
+            return AdmissionHelper._reject(request_class, wait)
+        if rule in AdmissionHelper.STREAMING_ROUTES:
+            return True, 0, None
+
+        limit = AdmissionHelper.MAX_IN_FLIGHT * AdmissionHelper.CLASS_SHARE[request_class]
+        with AdmissionHelper._in_flight_lock:
+            route_count = AdmissionHelper._in_flight_per_route.get(rule, 0) if heavy else 0
+            if AdmissionHelper._in_flight >= limit or route_count >= AdmissionHelper.MAX_IN_FLIGHT_PER_ROUTE:
+                return AdmissionHelper._reject(request_class, 1.0)
+            AdmissionHelper._in_flight += 1
+            if heavy:
+                AdmissionHelper._in_flight_per_route[rule] = route_count + 1
+
+        if len(AdmissionHelper._client_buckets) > AdmissionHelper.MAX_BUCKETS:
+            AdmissionHelper._prune(now)
+        # slot "" stands for "global count only"
+        return True, 0, rule if heavy else ""
+
+    @staticmethod
+    def _reject(request_class: str, wait: float) -> Tuple[bool, int, None]:
+        AdmissionHelper.rejected[request_class] += 1
+        return False, max(1, math.ceil(wait)), None
+
+    @staticmethod
+    def release(slot: Optional[str]) -> None:
+        if slot is None:
+            return
+        with AdmissionHelper._in_flight_lock:
+            AdmissionHelper._in_flight -= 1
+            if slot:
+                AdmissionHelper._in_flight_per_route[slot] -= 1
+
+    @staticmethod
+    def _prune(now: float) -> None:
+        """Drop buckets that have refilled completely; they hold no state worth keeping."""
+        buckets = AdmissionHelper._client_buckets
+        idle = [key for key, b in list(buckets.items())
+                if b.tokens + (now - b.updated) * b.rate >= b.burst]
+        for key in idle:
+            with AdmissionHelper._locks[hash(key) % AdmissionHelper.LOCK_STRIPES]:
+                buckets.pop(key, None)
+        logger.info(f"Pruned {len(idle)} idle rate limit buckets")
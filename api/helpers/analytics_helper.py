@@ -0,0 +1,295 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+import threading
+import numpy as np
+from ..config import supabase
+from .change_helper import ChangeHelper
+from .cycle_index import SECONDS_PER_DAY, time_to_seconds
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def lookup(keys: np.ndarray, ids: np.ndarray, values: np.ndarray, missing: int = -1) -> np.ndarray:
+    """Vectorized join: values of the row whose (unique) Id equals each key, missing where there is none."""
+    result = np.full(len(keys), missing, dtype=values.dtype if len(values) else np.int64)
+    if not len(ids) or not len(keys):
+        return result
+    order = np.argsort(ids, kind="stable")
+    positions = np.minimum(np.searchsorted(ids[order], keys), len(ids) - 1)
+    found = ids[order][positions] == keys
+    result[found] = values[order[positions[found]]]
+    return result
+
+
+def group_index(keys: np.ndarray, groups: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Position of each key in the sorted groups array, and which keys are in it at all."""
+    positions = np.minimum(np.searchsorted(groups, keys), max(len(groups) - 1, 0))
+    valid = groups[positions] == keys if len(groups) else np.zeros(len(keys), dtype=bool)
+    return positions, valid
+
+
+def group_sum(keys: np.ndarray, weights: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """Sum of weights per group, in the order of groups (0 for groups without rows)."""
+    positions, valid = group_index(keys, groups)
+    return np.bincount(positions[valid], weights=weights[valid], minlength=len(groups))
+
+
+def group_distinct(keys: np.ndarray, values: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """Number of distinct values per group, in the order of groups."""
+    if not len(keys):
+        return np.zeros(len(groups), dtype=np.int64)
+    pairs = np.unique(np.stack([keys, values], axis=1), axis=0)
+    positions, valid = group_index(pairs[:, 0], groups)
+    return np.bincount(positions[valid], minlength=len(groups))
+
+
+def busy_and_idle(owner: np.ndarray, start: np.ndarray, end: np.ndarray, groups: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per group: seconds covered by the union of its intervals, idle seconds between them and the longest gap.
+
+    Intervals are sorted by (owner, start) and swept with a running maximum end.
+    Each owner is shifted by 2 days so that one maximum.accumulate serves all owners.
+    """
+    busy = np.zeros(len(groups))
+    idle = np.zeros(len(groups))
+    longest = np.zeros(len(groups))
+    positions, valid = group_index(owner, groups)
+    order = np.lexsort((start[valid], positions[valid]))
+    index = positions[valid][order]
+    if not len(index):
+        return {"busy": busy, "idle": idle, "longest_idle": longest}
+    shift = index * (2 * SECONDS_PER_DAY)
+    s, e = start[valid][order] + shift, end[valid][order] + shift
+    covered_until = np.maximum.accumulate(e)
+    previous = np.r_[s[0], covered_until[:-1]]
+    first = np.r_[True, index[1:] != index[:-1]]
+    previous[first] = s[first]
+    gaps = np.maximum(s - previous, 0)
+    busy = np.bincount(index, weights=np.maximum(e - np.maximum(s, previous), 0), minlength=len(groups))
+    idle = np.bincount(index, weights=gaps, minlength=len(groups))
+    longest[index[first]] = np.maximum.reduceat(gaps, np.flatnonzero(first))
+    return {"busy": busy, "idle": idle, "longest_idle": longest}
+
+
+class AnalyticsHelper:
+    """Fleet utilization per drone, zone, event and docking station.
+
+    The cycle tables are loaded into numpy columns once per data version and
+    joined with searchsorted lookups; all metrics are bincount group-bys. The
+    data version is the newest change journal seq of the source tables, so the
+    result is reused until one of them changes.
+
+    Cycles are daily schedules (TIME columns), so hours are per day and a
+    utilization of 1.0 means busy around the clock. Docking cycles have no
+    zone; an event counts the docking cycles of the drones flying in it, as in
+    ForecastHelper.
+
+    include_archived reads the cycle tables through their *Historie views, so
+    archived events keep their hours. archive_event deletes from the journaled
+    live tables, so archiving moves the data version too.
+    """
+    PAGE_SIZE = 1000
+    SOURCE_TABLES = ["Evenement", "Zone", "Drone", "Docking", "Cyclus", "VluchtCyclus", "DockingCyclus"]
+    GROUPS = ["drone", "zone", "event", "dock"]
+    HISTORY_VIEW = {"Cyclus": "CyclusHistorie", "VluchtCyclus": "VluchtCyclusHistorie",
+                    "DockingCyclus": "DockingCyclusHistorie"}
+
+    _cache: Dict[bool, Tuple[int, Dict]] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _load(table: str, columns: List[str]) -> Dict[str, List]:
+        """Whole table as lists per column, read in Id-keyset pages."""
+        data = {c: [] for c in columns}
+        last_id = None
+        while True:
+            query = supabase.table(table).select(", ".join(columns))
+            if last_id is not None:
+                query = query.gt("Id", last_id)
+            rows = query.order("Id").limit(AnalyticsHelper.PAGE_SIZE).execute().data
+            for column in columns:
+                data[column].extend(row[column] for row in rows)
+            if len(rows) < AnalyticsHelper.PAGE_SIZE:
+                return data
+            last_id = rows[-1]["Id"]
+
+    @staticmethod
+    def _ints(values: List) -> np.ndarray:
+        return np.array([-1 if v is None else v for v in values], dtype=np.int64)
+
+    @staticmethod
+    def _seconds(values: List) -> np.ndarray:
+        # Schedules reuse few distinct times, so parse each one once
+        unique, inverse = np.unique(np.array(values, dtype=str), return_inverse=True)
+        return np.array([time_to_seconds(v) for v in unique], dtype=np.int64)[inverse] if len(unique) else \
+            np.zeros(0, dtype=np.int64)
+
+    @staticmethod
+    def compute(include_archived: bool = False) -> Dict:
+        """Utilization of every drone, zone, event and dock from the current database,
+        with the cycles of archived events when include_archived is set."""
+        source = lambda table: AnalyticsHelper.HISTORY_VIEW[table] if include_archived else table
+        cyclus = AnalyticsHelper._load(source("Cyclus"), ["Id", "startuur", "tijdstip", "VluchtCyclusId"])
+        vlucht = AnalyticsHelper._load(source("VluchtCyclus"), ["Id", "DroneId", "ZoneId"])
+        docking = AnalyticsHelper._load(source("DockingCyclus"), ["Id", "DroneId", "DockingId", "CyclusId"])
+        zones = AnalyticsHelper._load("Zone", ["Id", "naam", "EvenementId"])
+        events = AnalyticsHelper._load("Evenement", ["Id", "Naam"])
+        drone_ids = np.array(AnalyticsHelper._load("Drone", ["Id"])["Id"], dtype=np.int64)
+        dock_ids = np.array(AnalyticsHelper._load("Docking", ["Id"])["Id"], dtype=np.int64)
+
+        cyclus_id = AnalyticsHelper._ints(cyclus["Id"])
+        start = AnalyticsHelper._seconds(cyclus["startuur"])
+        end = AnalyticsHelper._seconds(cyclus["tijdstip"])
+        end = np.where(end < start, end + SECONDS_PER_DAY, end) # past midnight, like cyclus_interval
+        duration = (end - start).astype(np.float64)
+
+        zone_id = AnalyticsHelper._ints(zones["Id"])
+        zone_event = AnalyticsHelper._ints(zones["EvenementId"])
+        event_id = AnalyticsHelper._ints(events["Id"])
+
+        # Flight cycles: Cyclus -> VluchtCyclus -> (DroneId, ZoneId) -> Zone.EvenementId
+        flight = np.flatnonzero(AnalyticsHelper._ints(cyclus["VluchtCyclusId"]) >= 0)
+        flight_vc = AnalyticsHelper._ints(cyclus["VluchtCyclusId"])[flight]
+        vc_id = AnalyticsHelper._ints(vlucht["Id"])
+        f_drone = lookup(flight_vc, vc_id, AnalyticsHelper._ints(vlucht["DroneId"]))
+        f_zone = lookup(flight_vc, vc_id, AnalyticsHelper._ints(vlucht["ZoneId"]))
+        f_event = lookup(f_zone, zone_id, zone_event)
+        f_start, f_end, f_duration = start[flight], end[flight], duration[flight]
+
+        # Docking cycles: DockingCyclus -> Cyclus interval
+        d_drone = AnalyticsHelper._ints(docking["DroneId"])
+        d_dock = AnalyticsHelper._ints(docking["DockingId"])
+        d_cyclus = AnalyticsHelper._ints(docking["CyclusId"])
+        d_start = lookup(d_cyclus, cyclus_id, start)
+        d_end = lookup(d_cyclus, cyclus_id, end)
+        timed = (d_cyclus >= 0) & np.isin(d_cyclus, cyclus_id)
+        d_drone, d_dock, d_start, d_end = d_drone[timed], d_dock[timed], d_start[timed], d_end[timed]
+        d_duration = (d_end - d_start).astype(np.float64)
+
+        hours = lambda seconds: np.round(seconds / 3600.0, 2).tolist()
+        share = lambda seconds: np.round(seconds / SECONDS_PER_DAY, 3).tolist()
+
+        # Per drone
+        drones = np.sort(drone_ids)
+        fd, dd = f_drone >= 0, d_drone >= 0
+        busy = busy_and_idle(np.r_[f_drone[fd], d_drone[dd]], np.r_[f_start[fd], d_start[dd]],
+                             np.r_[f_end[fd], d_end[dd]], drones)
+        per_drone = {
+            "DroneId": drones.tolist(),
+            "flight_hours": hours(group_sum(f_drone[fd], f_duration[fd], drones)),
+            "flight_cycles": group_sum(f_drone[fd], np.ones(fd.sum()), drones).astype(int).tolist(),
+            "docking_hours": hours(group_sum(d_drone[dd], d_duration[dd], drones)),
+            "docking_cycles": group_sum(d_drone[dd], np.ones(dd.sum()), drones).astype(int).tolist(),
+            "idle_hours": hours(busy["idle"]),
+            "longest_idle_hours": hours(busy["longest_idle"]),
+            "utilization": share(busy["busy"]),
+        }
+
+        # Per zone (flights only)
+        zone_order = np.argsort(zone_id)
+        zone_sorted = zone_id[zone_order]
+        fz = f_zone >= 0
+        per_zone = {
+            "ZoneId": zone_sorted.tolist(),
+            "naam": [zones["naam"][i] for i in zone_order],
+            "EvenementId": zone_event[zone_order].tolist(),
+            "flight_hours": hours(group_sum(f_zone[fz], f_duration[fz], zone_sorted)),
+            "flight_cycles": group_sum(f_zone[fz], np.ones(fz.sum()), zone_sorted).astype(int).tolist(),
+            "drones": group_distinct(f_zone[fz & fd], f_drone[fz & fd], zone_sorted).tolist(),
+        }
+
+        # Per event, with the docking cycles of the drones that fly in it
+        event_order = np.argsort(event_id)
+        event_sorted = event_id[event_order]
+        fe = (f_event >= 0) & fd
+        pairs = np.unique(np.stack([f_event[fe], f_drone[fe]], axis=1), axis=0) if fe.any() else np.zeros((0, 2), np.int64)
+        drone_docking = group_sum(d_drone[dd], d_duration[dd], drones)
+        drone_docking_cycles = group_sum(d_drone[dd], np.ones(dd.sum()), drones)
+        pair_drone, known = group_index(pairs[:, 1], drones)
+        pairs, pair_drone = pairs[known], pair_drone[known]
+        per_event = {
+            "EvenementId": event_sorted.tolist(),
+            "Naam": [events["Naam"][i] for i in event_order],
+            "flight_hours": hours(group_sum(f_event[fe], f_duration[fe], event_sorted)),
+            "flight_cycles": group_sum(f_event[fe], np.ones(fe.sum()), event_sorted).astype(int).tolist(),
+            "docking_hours": hours(group_sum(pairs[:, 0], drone_docking[pair_drone], event_sorted)),
+            "docking_cycles": group_sum(pairs[:, 0], drone_docking_cycles[pair_drone], event_sorted).astype(int).tolist(),
+            "drones": group_sum(pairs[:, 0], np.ones(len(pairs)), event_sorted).astype(int).tolist(),
+            "zones": group_sum(zone_event, np.ones(len(zone_event)), event_sorted).astype(int).tolist(),
+        }
+
+        # Per docking station
+        docks = np.sort(dock_ids)
+        dk = d_dock >= 0
+        occupancy = busy_and_idle(d_dock[dk], d_start[dk], d_end[dk], docks)
+        per_dock = {
+            "DockingId": docks.tolist(),
+            "docking_hours": hours(group_sum(d_dock[dk], d_duration[dk], docks)),
+            "docking_cycles": group_sum(d_dock[dk], np.ones(dk.sum()), docks).astype(int).tolist(),
+            "drones": group_distinct(d_dock[dk & dd], d_drone[dk & dd], docks).tolist(),
+            "occupancy": share(occupancy["busy"]),
+        }
+
+        # Drones flying in each event and the docks they use, to scope the result to one event
+        docks_of_drone: Dict[int, set] = {}
+        for drone, dock in zip(d_drone[dk & dd].tolist(), d_dock[dk & dd].tolist()):
+            docks_of_drone.setdefault(drone, set()).add(dock)
+        scope: Dict[int, Dict[str, set]] = {}
+        for event, drone in pairs.tolist():
+            entry = scope.setdefault(event, {"drones": set(), "docks": set()})
+            entry["drones"].add(drone)
+            entry["docks"].update(docks_of_drone.get(drone, ()))
+
+        rows = lambda columns: [dict(zip(columns, values)) for values in zip(*columns.values())]
+        return {
+            "computed_at": datetime.now(timezone.utc).isoformat(),
+            "drone": rows(per_drone),
+            "zone": rows(per_zone),
+            "event": rows(per_event),
+            "dock": rows(per_dock),
+            "scope": scope,
+        }
+
+    @staticmethod
+    def get_utilization(event_id: Optional[int] = None, groups: Optional[List[str]] = None,
+                        include_archived: bool = False) -> Dict:
+        """Cached utilization, optionally limited to one event (its zones, the drones flying
+        in it and the docks those drones use) and to some of GROUPS."""
+        unknown = [g for g in groups or [] if g not in AnalyticsHelper.GROUPS]
+        if unknown:
+            raise ValueError(f"Unknown group(s) {', '.join(unknown)}. Must be among: {', '.join(AnalyticsHelper.GROUPS)}")
+        groups = groups or AnalyticsHelper.GROUPS
+
+        version = ChangeHelper.latest_seq(AnalyticsHelper.SOURCE_TABLES)
+        include_archived = bool(include_archived)
+        cached = AnalyticsHelper._cache.get(include_archived)
+        if cached is None or cached[0] != version:
+            with AnalyticsHelper._lock:
+                cached = AnalyticsHelper._cache.get(include_archived)
+                if cached is None or cached[0] != version:
+                    try:
+                        cached = (version, AnalyticsHelper.compute(include_archived))
+                    except Exception as e:
+                        logger.error(f"Error computing utilization analytics: {e}")
+                        raise
+                    AnalyticsHelper._cache[include_archived] = cached
+                    logger.info(f"Computed utilization analytics for data version {version}")
+        result = cached[1]
+
+        selected = {"version": version, "computed_at": result["computed_at"]}
+        if event_id is None:
+            selected.update({g: result[g] for g in groups})
+            return selected
+
+        events = [e for e in result["event"] if e["EvenementId"] == event_id]
+        if not events:
+            raise LookupError(f"Event {event_id} not found")
+        scope = result["scope"].get(event_id, {"drones": set(), "docks": set()})
+        scoped = {
+            "event": events,
+            "zone": [z for z in result["zone"] if z["EvenementId"] == event_id],
+            "drone": [d for d in result["drone"] if d["DroneId"] in scope["drones"]],
+            "dock": [d for d in result["dock"] if d["DockingId"] in scope["docks"]],
+        }
+        selected.update({g: scoped[g] for g in groups})
+        return selected
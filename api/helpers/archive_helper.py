@@ -0,0 +1,105 @@
+from typing import Dict, List, Optional
+from datetime import date, timedelta
+import threading
+from ..config import supabase
+from .cycle_index import CycleIndex
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ArchiveHelper:
+    """Moves the cycles of finished events out of the live tables (archive_event RPC, migration 0002).
+
+    Each event is archived in one transaction on the database side: its flight
+    cycles, their cycles and the docking cycles on those move to the *Archief
+    tables in bulk. The live helpers keep reading the hot tables; passing
+    include_archived=True makes them read the *Historie views (live + archive).
+    """
+    TABLE_NAME = "EvenementArchief"
+    EVENT_TABLE = "Evenement"
+    DEFAULT_GRACE_DAYS = 7
+
+    _maintenance_thread: Optional[threading.Thread] = None
+    _maintenance_stop = threading.Event()
+
+    @staticmethod
+    def archive_event(event_id: int) -> Optional[Dict]:
+        """Archive the cycle tree of one ended event. Returns the moved row counts, None if the
+        event does not exist. Raises ValueError when the event has not ended yet."""
+        try:
+            response = supabase.rpc("archive_event", {"evenement": event_id}).execute()
+        except Exception as e:
+            if f"Evenement {event_id} not found" in str(e):
+                return None
+            if "has not ended" in str(e):
+                raise ValueError(f"Evenement {event_id} has not ended yet; only finished events can be archived.")
+            logger.error(f"Error archiving evenement {event_id}: {e}")
+            raise
+
+        counts = response.data[0] if response.data else {"vluchtCycli": 0, "cycli": 0, "dockingCycli": 0}
+        if counts["cycli"] or counts["dockingCycli"]:
+            # The moved cycles no longer exist in the live tables the overlap index mirrors
+            CycleIndex.invalidate()
+        logger.info(f"Archived evenement {event_id}: {counts}")
+        return {"EvenementId": event_id, **counts}
+
+    @staticmethod
+    def get_archived_events() -> List[Dict]:
+        try:
+            response = supabase.table(ArchiveHelper.TABLE_NAME).select("*").order("EvenementId").execute()
+            return response.data
+        except Exception as e:
+            logger.error(f"Error fetching archived events: {e}")
+            raise
+
+    @staticmethod
+    def get_archivable_event_ids(grace_days: int = DEFAULT_GRACE_DAYS) -> List[int]:
+        """Events that ended more than grace_days ago and have not been archived yet."""
+        if grace_days < 0:
+            raise ValueError("grace_days must be non-negative")
+        cutoff = date.today() - timedelta(days=grace_days)
+        try:
+            ended = (supabase.table(ArchiveHelper.EVENT_TABLE).select("Id")
+                     .lt("EindDatum", cutoff.isoformat()).order("Id").execute().data)
+            done = supabase.table(ArchiveHelper.TABLE_NAME).select("EvenementId").execute().data
+        except Exception as e:
+            logger.error(f"Error fetching events that ended before {cutoff}: {e}")
+            raise
+        archived = {row["EvenementId"] for row in done}
+        return [row["Id"] for row in ended if row["Id"] not in archived]
+
+    @staticmethod
+    def archive_finished_events(grace_days: int = DEFAULT_GRACE_DAYS) -> Dict:
+        """Archive every finished event, one transaction per event, so a failure only holds back that event."""
+        archived, failed = [], []
+        for event_id in ArchiveHelper.get_archivable_event_ids(grace_days):
+            try:
+                result = ArchiveHelper.archive_event(event_id)
+                if result:
+                    archived.append(result)
+            except Exception as e:
+                logger.error(f"Archiving evenement {event_id} failed: {e}")
+                failed.append(event_id)
+        return {"archived": archived, "failed": failed}
+
+    @staticmethod
+    def _maintenance_loop(interval_seconds: float, grace_days: int) -> None:
+        while not ArchiveHelper._maintenance_stop.wait(interval_seconds):
+            try:
+                ArchiveHelper.archive_finished_events(grace_days)
+            except Exception as e:
+                logger.error(f"Event archival failed: {e}")
+
+    @staticmethod
+    def start_background_archival(interval_seconds: float, grace_days: int = DEFAULT_GRACE_DAYS) -> None:
+        """Archive finished events periodically in a daemon thread (once per process). Serverless
+        deployments should schedule archive_event instead, e.g. with pg_cron."""
+        if ArchiveHelper._maintenance_thread and ArchiveHelper._maintenance_thread.is_alive():
+            return
+        ArchiveHelper._maintenance_stop.clear()
+        ArchiveHelper._maintenance_thread = threading.Thread(
+            target=ArchiveHelper._maintenance_loop, args=(interval_seconds, grace_days),
+            name="event-archival", daemon=True
+        )
+        ArchiveHelper._maintenance_thread.start()
+        logger.info(f"Event archival every {interval_seconds}s, {grace_days} days after EindDatum")
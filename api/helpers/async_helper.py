@@ -0,0 +1,93 @@
+from typing import Dict, List, Optional
+import asyncio
+from ..config import get_async_supabase
+from .evenement_helper import EvenementHelper
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AsyncHelper:
+    """Async counterparts of the helpers for the ASGI entry point (api/asgi.py).
+
+    They use the async Supabase client and run independent queries concurrently
+    with asyncio.gather, so a composite request costs one round trip instead of
+    one per query. Validation and error messages match the sync helpers.
+    """
+
+    @staticmethod
+    async def select(table: str, columns: str = "*", **filters) -> List[Dict]:
+        """SELECT with equality filters, e.g. select("Zone", EvenementId=3)."""
+        client = await get_async_supabase()
+        query = client.table(table).select(columns)
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        return (await query.execute()).data
+
+    @staticmethod
+    async def get_by_id(table: str, row_id: int) -> Optional[Dict]:
+        client = await get_async_supabase()
+        response = await client.table(table).select("*").eq("Id", row_id).limit(1).execute()
+        return response.data[0] if response.data else None
+
+    @staticmethod
+    async def exists(table: str, row_id: int) -> bool:
+        client = await get_async_supabase()
+        response = await client.table(table).select("Id").eq("Id", row_id).limit(1).execute()
+        return bool(response.data)
+
+    @staticmethod
+    async def create_vlucht_cyclus(verslag_id: Optional[int] = None, plaats_id: Optional[int] = None,
+                                   drone_id: Optional[int] = None, zone_id: Optional[int] = None) -> Dict:
+        """Async VluchtCyclusHelper.create_vlucht_cyclus: the reference checks run concurrently."""
+        references = {
+            "VerslagId": ("Verslag", verslag_id),
+            "PlaatsId": ("Startplaats", plaats_id),
+            "DroneId": ("Drone", drone_id),
+            "ZoneId": ("Zone", zone_id),
+        }
+        vlucht_cyclus_data = {column: value for column, (_, value) in references.items() if value is not None}
+        if not vlucht_cyclus_data:
+            raise ValueError("Cannot create VluchtCyclus with no associated IDs.")
+
+        try:
+            columns = list(vlucht_cyclus_data)
+            found = await asyncio.gather(*(AsyncHelper.exists(references[c][0], vlucht_cyclus_data[c]) for c in columns))
+            for column, ok in zip(columns, found):
+                if not ok:
+                    raise ValueError(f"{references[column][0]} with ID {vlucht_cyclus_data[column]} does not exist.")
+
+            client = await get_async_supabase()
+            response = await client.table("VluchtCyclus").insert(vlucht_cyclus_data).execute()
+            if not response.data:
+                raise ValueError("Failed to create VluchtCyclus")
+            return response.data[0]
+        except Exception as e:
+            if "violates foreign key constraint" in str(e):
+                logger.warning(f"Create VluchtCyclus failed due to invalid FK in data {vlucht_cyclus_data}")
+                raise ValueError("One or more reference IDs do not exist.")
+            if not isinstance(e, ValueError):
+                logger.error(f"Error creating vlucht cyclus with data {vlucht_cyclus_data}: {e}")
+            raise
+
+    @staticmethod
+    async def get_event_overview(event_id: int) -> Optional[Dict]:
+        """Async EvenementHelper.get_event_overview: all independent queries in one gather."""
+        try:
+            event, zones, drones, startplaatsen, dockings = await asyncio.gather(
+                AsyncHelper.get_by_id("Evenement", event_id),
+                AsyncHelper.select("Zone", EvenementId=event_id),
+                AsyncHelper.select("Drone", "Id, status"),
+                AsyncHelper.select("Startplaats", "Id, isbeschikbaar, gereserveerdTot"),
+                AsyncHelper.select("Docking", "Id, isbeschikbaar, gereserveerdTot"),
+            )
+            if not event:
+                return None
+            vlucht_cycli = []
+            if zones:
+                client = await get_async_supabase()
+                vlucht_cycli = (await client.table("VluchtCyclus").select("Id, ZoneId, DroneId")
+                                .in_("ZoneId", [z["Id"] for z in zones]).execute()).data
+        except Exception as e:
+            logger.error(f"Error fetching overview for event {event_id}: {e}")
+            raise
+        return EvenementHelper.summarize_overview(event, zones, vlucht_cycli, drones, startplaatsen, dockings)
@@ -0,0 +1,35 @@
+from typing import Dict
+from datetime import time
+from .cycle_index import CycleIndex, cyclus_interval
+from .docking_helper import DockingHelper
+from .drone_helper import DroneHelper
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AvailabilityHelper:
+    """Answers "which drones and docks are free between two times" from the cycle index."""
+
+    @staticmethod
+    def get_availability(van: time, tot: time) -> Dict:
+        """Drones and docking stations without a cycle overlapping [van, tot).
+
+        Busy ranges come from CycleIndex, which keeps each resource's cycles sorted
+        with a running maximum end, so every resource costs one binary search.
+        """
+        start, end = cyclus_interval(van, tot)
+        try:
+            busy_drones = CycleIndex.busy_resources(start, end, "drone")
+            busy_dockings = CycleIndex.busy_resources(start, end, "docking")
+            drones = DroneHelper.get_all_drones()
+            dockings = DockingHelper.get_all_dockings()
+        except Exception as e:
+            logger.error(f"Error computing availability {van}-{tot}: {e}")
+            raise
+
+        return {
+            "from": van.isoformat(),
+            "to": tot.isoformat(),
+            "drones": [d for d in drones if d["Id"] not in busy_drones],
+            "dockings": [d for d in dockings if d["Id"] not in busy_dockings],
+        }
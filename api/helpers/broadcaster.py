@@ -0,0 +1,123 @@
+from typing import Dict, Optional
+from collections import deque
+import asyncio
+import itertools
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One subscriber's bounded event buffer. Consumed by a single streaming response,
+    either from a thread with get() or from an event loop with next_event()."""
+
+    def __init__(self, max_buffer: int):
+        self.max_buffer = max_buffer
+        self.closed = False
+        self._queue = deque()
+        self._ready = threading.Condition()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_ready: Optional[asyncio.Event] = None
+
+    def _notify(self) -> None:
+        # Caller holds self._ready
+        self._ready.notify()
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._async_ready.set)
+            except RuntimeError:
+                pass # Loop already closed; the stream is gone
+
+    def _offer(self, event: Dict) -> bool:
+        """Queue an event; returns False when the buffer is full (the subscriber is too slow)."""
+        with self._ready:
+            if self.closed:
+                return True
+            if len(self._queue) >= self.max_buffer:
+                return False
+            self._queue.append(event)
+            self._notify()
+            return True
+
+    def _evict(self) -> None:
+        # Drop the backlog and leave one "resync" event so the client reconnects and reloads
+        with self._ready:
+            self._queue.clear()
+            self._queue.append({"id": None, "type": "resync", "data": {}})
+            self.closed = True
+            self._notify()
+
+    def close(self) -> None:
+        with self._ready:
+            self.closed = True
+            self._notify()
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        """Next event, or None after timeout or once closed and drained."""
+        with self._ready:
+            if not self._queue and not self.closed:
+                self._ready.wait(timeout)
+            return self._queue.popleft() if self._queue else None
+
+    async def next_event(self, timeout: float) -> Optional[Dict]:
+        """get() for a consumer on the running event loop; waiting holds no thread."""
+        with self._ready:
+            if self._loop is None:
+                self._loop = asyncio.get_running_loop()
+                self._async_ready = asyncio.Event()
+            if self._queue or self.closed:
+                return self._queue.popleft() if self._queue else None
+            # Cleared under the lock: a publisher's set() is scheduled after this
+            self._async_ready.clear()
+        try:
+            await asyncio.wait_for(self._async_ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._ready:
+            return self._queue.popleft() if self._queue else None
+
+
+class Broadcaster:
+    """In-process fan-out of change events to many subscribers.
+
+    publish() never blocks on a subscriber: each one has a bounded buffer and is
+    evicted when it falls max_buffer events behind. The subscriber list is
+    copy-on-write, so publishing takes no shared lock.
+    """
+
+    def __init__(self, name: str, max_buffer: int = 256, max_subscribers: int = 1000):
+        self.name = name
+        self.max_buffer = max_buffer
+        self.max_subscribers = max_subscribers
+        self._subscribers = ()
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self.evictions = 0
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.max_buffer)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise ValueError(f"Too many {self.name} stream subscribers.")
+            self._subscribers = self._subscribers + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.close()
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+
+    def publish(self, event_type: str, data: Dict) -> None:
+        event = {"id": next(self._sequence), "type": event_type, "data": data}
+        slow = [s for s in self._subscribers if not s._offer(event)]
+        for subscription in slow:
+            subscription._evict()
+            self.unsubscribe(subscription)
+            self.evictions += 1
+        if slow:
+            logger.warning(f"Evicted {len(slow)} slow {self.name} stream subscribers")
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
@@ -0,0 +1,145 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import timedelta
+import threading
+from ..config import supabase
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ChangeHelper:
+    """Reads the Wijziging change journal for delta sync, and compacts/prunes it.
+
+    The journal itself is written by the journal_change trigger (see db.sql) in
+    the same transaction as every helper write, so no write can be missed.
+    Entries are read in (xid, seq) order through the get_changes RPC (migration
+    0008), which only returns entries of transactions older than any still
+    running; the client's cursor is that position, formatted as "<xid>-<seq>".
+    """
+    TABLE_NAME = "Wijziging"
+    HORIZON_TABLE = "WijzigingHorizon"
+    TABLES = ["Evenement", "Zone", "Startplaats", "Verslag", "Drone", "Docking",
+              "Cyclus", "VluchtCyclus", "DockingCyclus"]
+    DEFAULT_LIMIT = 500
+    MAX_LIMIT = 5000
+    COMPACT_AFTER = timedelta(hours=1)
+    RETENTION = timedelta(days=7)
+
+    _maintenance_thread: Optional[threading.Thread] = None
+    _maintenance_stop = threading.Event()
+
+    @staticmethod
+    def get_horizon() -> Tuple[int, int]:
+        """Last (xid, seq) dropped by retention. A client behind it has to reload everything."""
+        try:
+            response = (supabase.table(ChangeHelper.HORIZON_TABLE).select("gesnoeidXid, gesnoeidTot")
+                        .eq("Id", 1).execute())
+            if not response.data:
+                return (0, 0)
+            return (int(response.data[0]["gesnoeidXid"]), response.data[0]["gesnoeidTot"])
+        except Exception as e:
+            logger.error(f"Error fetching change journal horizon: {e}")
+            raise
+
+    @staticmethod
+    def parse_cursor(since: str) -> Tuple[int, int]:
+        """"<xid>-<seq>" as returned in next_since; "0" (or empty) starts from the oldest retained entry.
+
+        A bare seq from before the journal recorded transaction ids raises LookupError, so
+        the client reloads and continues with a new cursor.
+        """
+        since = (since or "0").strip()
+        if since == "0":
+            return (0, 0)
+        if since.isdigit():
+            raise LookupError("Change cursors are now '<xid>-<seq>'; reload and use the new next_since.")
+        xid, _, seq = since.partition("-")
+        if not (xid.isdigit() and seq.isdigit()):
+            raise ValueError("since must be 0 or a next_since value from a previous call.")
+        return (int(xid), int(seq))
+
+    @staticmethod
+    def latest_seq(tables: Optional[List[str]] = None) -> int:
+        """Seq of the newest journal entry (for the given tables). Usable as a data version for caches."""
+        try:
+            query = supabase.table(ChangeHelper.TABLE_NAME).select("seq")
+            if tables:
+                query = query.in_("tabel", tables)
+            response = query.order("seq", desc=True).limit(1).execute()
+            return response.data[0]["seq"] if response.data else 0
+        except Exception as e:
+            logger.error(f"Error fetching latest change seq for {tables}: {e}")
+            raise
+
+    @staticmethod
+    def get_changes(since: str = "0", tables: Optional[List[str]] = None, limit: int = DEFAULT_LIMIT) -> Dict:
+        """Journal entries after cursor `since`, oldest first.
+
+        since="0" starts at the retention horizon, so a client that has just reloaded
+        its tables can always start over with it. Raises LookupError when any other
+        `since` is older than the horizon.
+        """
+        cursor = ChangeHelper.parse_cursor(since)
+        if not (1 <= limit <= ChangeHelper.MAX_LIMIT):
+            raise ValueError(f"limit must be between 1 and {ChangeHelper.MAX_LIMIT}")
+        unknown = [t for t in tables or [] if t not in ChangeHelper.TABLES]
+        if unknown:
+            raise ValueError(f"Unknown table(s) {', '.join(unknown)}. Must be among: {', '.join(ChangeHelper.TABLES)}")
+
+        horizon = ChangeHelper.get_horizon()
+        if cursor == (0, 0):
+            cursor = horizon
+        elif cursor < horizon:
+            raise LookupError(f"Changes since {since} are no longer retained (horizon {horizon[0]}-{horizon[1]}).")
+
+        try:
+            # One extra row tells whether there is more
+            rows = supabase.rpc("get_changes", {
+                "na_xid": str(cursor[0]), "na_seq": cursor[1], "tabellen": tables, "aantal": limit + 1,
+            }).execute().data or []
+        except Exception as e:
+            logger.error(f"Error fetching changes since {since} for {tables}: {e}")
+            raise
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "changes": [{k: v for k, v in row.items() if k != "xid"} for row in rows],
+            "next_since": f"{rows[-1]['xid']}-{rows[-1]['seq']}" if rows else since,
+            "has_more": has_more,
+        }
+
+    @staticmethod
+    def compact(older_than: timedelta = COMPACT_AFTER, retention: timedelta = RETENTION) -> Dict:
+        """Collapse old entries to one per row and drop entries past retention (compact_changes RPC)."""
+        try:
+            response = supabase.rpc("compact_changes", {
+                "ouder_dan": f"{int(older_than.total_seconds())} seconds",
+                "bewaren": f"{int(retention.total_seconds())} seconds",
+            }).execute()
+            result = response.data[0] if response.data else {"samengevoegd": 0, "verwijderd": 0}
+            logger.info(f"Change journal compacted: {result}")
+            return result
+        except Exception as e:
+            logger.error(f"Error compacting change journal: {e}")
+            raise
+
+    @staticmethod
+    def _maintenance_loop(interval_seconds: float) -> None:
+        while not ChangeHelper._maintenance_stop.wait(interval_seconds):
+            try:
+                ChangeHelper.compact()
+            except Exception as e:
+                logger.error(f"Change journal maintenance failed: {e}")
+
+    @staticmethod
+    def start_background_maintenance(interval_seconds: float) -> None:
+        """Compact periodically in a daemon thread (once per process). Serverless deployments
+        should schedule the compact_changes RPC instead, e.g. with pg_cron."""
+        if ChangeHelper._maintenance_thread and ChangeHelper._maintenance_thread.is_alive():
+            return
+        ChangeHelper._maintenance_stop.clear()
+        ChangeHelper._maintenance_thread = threading.Thread(
+            target=ChangeHelper._maintenance_loop, args=(interval_seconds,), name="change-journal", daemon=True
+        )
+        ChangeHelper._maintenance_thread.start()
+        logger.info(f"Change journal maintenance every {interval_seconds}s")
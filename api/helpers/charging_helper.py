@@ -0,0 +1,120 @@
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+import heapq
+import threading
+from ..config import supabase
+from .cycle_index import SECONDS_PER_DAY, CycleIndex, overlap_message
+from .docking_helper import DockingHelper
+from .drone_helper import DroneHelper
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ChargingHelper:
+    """Matches low-battery drones to free docking stations.
+
+    Drones are kept in a min-heap on batterij and free docks in a pool, so a
+    scheduling pass is O(n log n). The resulting Cyclus/DockingCyclus rows and
+    the Docking availability flip are written by the schedule_charging RPC
+    (db.sql, redefined in migration 0007) in one transaction.
+    """
+    RPC_NAME = "schedule_charging"
+    DEFAULT_THRESHOLD = 30          # batterij below this needs charging
+    CHARGE_RATE_PER_MINUTE = 1.0    # percent gained per minute on a dock
+
+    _tick_thread: Optional[threading.Thread] = None
+    _tick_stop = threading.Event()
+
+    @staticmethod
+    def _charge_window(batterij: int, start: datetime) -> Dict[str, str]:
+        """Cyclus times for charging to 100%. A window past midnight ends the next day, which a
+        tijdstip before the startuur means (cyclus_interval); it is kept between 1 second and
+        just under a day, as equal times would be an empty cycle."""
+        start = start.replace(microsecond=0)
+        seconds = round((100 - batterij) / ChargingHelper.CHARGE_RATE_PER_MINUTE * 60)
+        end = start + timedelta(seconds=min(max(seconds, 1), SECONDS_PER_DAY - 1))
+        return {
+            "startuur": start.time().isoformat(),
+            "tijdstip": end.time().isoformat(),
+        }
+
+    @staticmethod
+    def plan_charging(drones: List[Dict], dockings: List[Dict], threshold: int = DEFAULT_THRESHOLD,
+                      start: Optional[datetime] = None) -> List[Dict]:
+        """Greedily give the emptiest drones the free docks. Pure function, no database access."""
+        start = start or datetime.now()
+        queue = [(int(d["batterij"]), d["Id"]) for d in drones if int(d["batterij"]) < threshold]
+        heapq.heapify(queue)
+        free_docks = sorted(d["Id"] for d in dockings)
+        free_docks.reverse() # pop() hands out the lowest Id first
+
+        assignments = []
+        while queue and free_docks:
+            batterij, drone_id = heapq.heappop(queue)
+            assignment = {"DroneId": drone_id, "DockingId": free_docks.pop(), "batterij": batterij}
+            assignment.update(ChargingHelper._charge_window(batterij, start))
+            assignments.append(assignment)
+        return assignments
+
+    @staticmethod
+    def get_docked_drone_ids() -> set:
+        """Drones that already occupy a dock, i.e. have a DockingCyclus on an unavailable Docking."""
+        try:
+            response = (supabase.table("DockingCyclus")
+                        .select("DroneId, Docking!inner(isbeschikbaar)")
+                        .eq("Docking.isbeschikbaar", False)
+                        .execute())
+            return {row["DroneId"] for row in response.data if row.get("DroneId") is not None}
+        except Exception as e:
+            logger.error(f"Error fetching docked drones: {e}")
+            raise
+
+    @staticmethod
+    def schedule_charging(threshold: int = DEFAULT_THRESHOLD, dry_run: bool = False) -> List[Dict]:
+        """Run one scheduling pass. Returns the planned assignments, or the created DockingCyclus rows."""
+        if not (0 <= threshold <= 100):
+            raise ValueError("threshold must be between 0 and 100")
+
+        docked = ChargingHelper.get_docked_drone_ids()
+        candidates = [d for d in DroneHelper.get_available_drones() if d["Id"] not in docked]
+        assignments = ChargingHelper.plan_charging(candidates, DockingHelper.get_available_dockings(), threshold)
+        if dry_run or not assignments:
+            return assignments
+
+        try:
+            response = supabase.rpc(ChargingHelper.RPC_NAME, {"assignments": assignments}).execute()
+            CycleIndex.invalidate() # New cycles were written server-side
+            return response.data or []
+        except Exception as e:
+            if "no longer available" in str(e) or overlap_message(e):
+                logger.warning(f"Charging schedule lost a race for a docking station: {e}")
+                raise ValueError("A docking station was claimed concurrently, retry the schedule.")
+            logger.error(f"Error writing charging schedule {assignments}: {e}")
+            raise
+
+    @staticmethod
+    def _tick_loop(interval_seconds: float) -> None:
+        while not ChargingHelper._tick_stop.wait(interval_seconds):
+            try:
+                created = ChargingHelper.schedule_charging()
+                if created:
+                    logger.info(f"Charging tick scheduled {len(created)} drones")
+            except Exception as e:
+                # Keep ticking; the next pass starts from fresh database state
+                logger.error(f"Charging tick failed: {e}")
+
+    @staticmethod
+    def start_background_tick(interval_seconds: float) -> None:
+        """Start the periodic scheduler in a daemon thread (once per process)."""
+        if ChargingHelper._tick_thread and ChargingHelper._tick_thread.is_alive():
+            return
+        ChargingHelper._tick_stop.clear()
+        ChargingHelper._tick_thread = threading.Thread(
+            target=ChargingHelper._tick_loop, args=(interval_seconds,), name="charging-tick", daemon=True
+        )
+        ChargingHelper._tick_thread.start()
+        logger.info(f"Charging scheduler ticking every {interval_seconds}s")
+
+    @staticmethod
+    def stop_background_tick() -> None:
+        ChargingHelper._tick_stop.set()
@@ -0,0 +1,152 @@
+from typing import Dict, List, Tuple
+from collections import OrderedDict
+import math
+import threading
+import numpy as np
+from .zone_helper import ZoneHelper
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CoverageCache:
+    """Bounded LRU cache of coverage results keyed by (zone dims, parameters)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple, value: Dict) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class CoverageHelper:
+    """Boustrophedon (lawnmower) coverage planning for zones.
+
+    Lanes run along the zone's lengte and are stacked across its breedte, spaced
+    by the sensor swath minus the overlap. Both are in metres.
+    """
+    DEFAULT_SWATH = 20.0          # metres covered per lane
+    DEFAULT_OVERLAP = 0.2         # fraction of the swath shared by neighbouring lanes
+    DEFAULT_SPEED = 8.0           # metres per second
+    DEFAULT_TURN_SECONDS = 10.0   # per lane change
+    DEFAULT_ENDURANCE_MINUTES = 25.0
+    MAX_LANES = 10000             # per zone; bounds the waypoint list built on request
+
+    cache = CoverageCache(max_entries=1024)
+
+    @staticmethod
+    def _compute(breedte: np.ndarray, lengte: np.ndarray, swath: float, overlap: float, speed: float,
+                 turn_seconds: float, endurance_minutes: float) -> Dict[str, np.ndarray]:
+        """Vectorized lane count, path length, flight time and battery cycles for many zones."""
+        spacing = swath * (1.0 - overlap)
+        lanes = np.maximum(np.ceil((breedte - swath) / spacing), 0).astype(np.int64) + 1
+        path_m = lanes * lengte + (lanes - 1) * spacing
+        flight_minutes = (path_m / speed + (lanes - 1) * turn_seconds) / 60.0
+        battery_cycles = np.maximum(np.ceil(flight_minutes / endurance_minutes), 1).astype(np.int64)
+        return {
+            "lanes": lanes,
+            "spacing_m": np.full(len(breedte), spacing),
+            "path_m": path_m,
+            "flight_minutes": flight_minutes,
+            "battery_cycles": battery_cycles,
+            "cyclus_minutes": flight_minutes / battery_cycles,
+        }
+
+    @staticmethod
+    def waypoints(breedte: float, lengte: float, swath: float, overlap: float) -> List[List[float]]:
+        """Lane endpoints in zone coordinates (x across breedte, y along lengte), alternating direction."""
+        spacing = swath * (1.0 - overlap)
+        lanes = max(math.ceil((breedte - swath) / spacing), 0) + 1
+        if lanes > CoverageHelper.MAX_LANES:
+            raise ValueError(f"{lanes} lanes exceed the maximum of {CoverageHelper.MAX_LANES}; "
+                             "use a wider swath or less overlap")
+        # Lane centres, the last lane pulled in so its swath ends at the zone edge
+        x = np.minimum(swath / 2 + np.arange(lanes) * spacing, max(breedte - swath / 2, swath / 2))
+        y_start = np.where(np.arange(lanes) % 2 == 0, 0.0, lengte)
+        points = np.empty((lanes * 2, 2))
+        points[0::2, 0] = x
+        points[1::2, 0] = x
+        points[0::2, 1] = y_start
+        points[1::2, 1] = lengte - y_start
+        return np.round(points, 2).tolist()
+
+    @staticmethod
+    def plan_zones(zones: List[Dict], swath: float = DEFAULT_SWATH, overlap: float = DEFAULT_OVERLAP,
+                   speed: float = DEFAULT_SPEED, turn_seconds: float = DEFAULT_TURN_SECONDS,
+                   endurance_minutes: float = DEFAULT_ENDURANCE_MINUTES,
+                   include_waypoints: bool = False) -> List[Dict]:
+        """Coverage plan per zone. Cache misses are computed together in one vectorized pass."""
+        # nan fails every comparison, so test finiteness explicitly rather than relying on "<= 0"
+        if not all(map(math.isfinite, (swath, overlap, speed, turn_seconds, endurance_minutes))):
+            raise ValueError("swath, overlap, speed, turn_seconds and endurance must be finite numbers")
+        if swath <= 0: raise ValueError("swath must be positive")
+        if not (0 <= overlap < 1): raise ValueError("overlap must be at least 0 and below 1")
+        if speed <= 0 or endurance_minutes <= 0: raise ValueError("speed and endurance must be positive")
+        if turn_seconds < 0: raise ValueError("turn_seconds cannot be negative")
+
+        params = (swath, overlap, speed, turn_seconds, endurance_minutes)
+        keys = [(float(z["breedte"]), float(z["lengte"])) + params for z in zones]
+        invalid = [z.get("Id") for z, key in zip(zones, keys) if not all(math.isfinite(v) and v >= 0 for v in key[:2])]
+        if invalid:
+            raise ValueError(f"Zone(s) {', '.join(map(str, invalid))} have no finite, non-negative breedte and lengte")
+        spacing = swath * (1.0 - overlap)
+        too_many = [z.get("Id") for z, key in zip(zones, keys)
+                    if (key[0] - swath) / spacing + 1 > CoverageHelper.MAX_LANES]
+        if too_many:
+            raise ValueError(f"Zone(s) {', '.join(map(str, too_many))} need more than {CoverageHelper.MAX_LANES} "
+                             "lanes; use a wider swath or less overlap")
+        results = {key: CoverageHelper.cache.get(key) for key in set(keys)}
+        missing = [key for key, value in results.items() if value is None]
+
+        if missing:
+            dims = np.array([key[:2] for key in missing])
+            computed = CoverageHelper._compute(dims[:, 0], dims[:, 1], *params)
+            for i, key in enumerate(missing):
+                value = {name: column[i].item() for name, column in computed.items()}
+                value["path_m"] = round(value["path_m"], 1)
+                value["flight_minutes"] = round(value["flight_minutes"], 1)
+                value["cyclus_minutes"] = round(value["cyclus_minutes"], 1)
+                CoverageHelper.cache.put(key, value)
+                results[key] = value
+
+        plans = []
+        for zone, key in zip(zones, keys):
+            result = results[key]
+            if include_waypoints and "waypoints" not in result:
+                # Generated on first request and cached from then on; a new entry, since other
+                # threads may be reading the cached one
+                result = {**result, "waypoints": CoverageHelper.waypoints(key[0], key[1], swath, overlap)}
+                CoverageHelper.cache.put(key, result)
+                results[key] = result
+            plan = {"ZoneId": zone.get("Id"), "naam": zone.get("naam"), **result}
+            if not include_waypoints:
+                plan.pop("waypoints", None)
+            plans.append(plan)
+        return plans
+
+    @staticmethod
+    def plan_event(event_id: int, **params) -> List[Dict]:
+        """Coverage plans for every zone of an event"""
+        try:
+            zones = ZoneHelper.get_zones_by_event(event_id)
+        except Exception as e:
+            logger.error(f"Error fetching zones for coverage plan of event {event_id}: {e}")
+            raise
+        return CoverageHelper.plan_zones(zones, **params)
@@ -0,0 +1,311 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import time
+import bisect
+import heapq
+import re
+import threading
+import time as clock
+from ..config import supabase
+import logging
+
+logger = logging.getLogger(__name__)
+
+Resource = Tuple[str, int] # ("drone", DroneId) or ("docking", DockingId)
+
+SECONDS_PER_DAY = 24 * 60 * 60
+OVERLAP_ERROR = re.compile(r"Cyclus \d+ overlaps Cyclus \d+ of \w+ \d+\.")
+
+
+def time_to_seconds(value) -> int:
+    """Seconds since midnight for a TIME column value (string or datetime.time)."""
+    if isinstance(value, str):
+        value = time.fromisoformat(value)
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def cyclus_interval(startuur, tijdstip) -> Tuple[int, int]:
+    """Half-open [start, end) in seconds. A tijdstip before startuur runs past midnight;
+    equal times give an empty interval (the database rejects those for new cycles)."""
+    start = time_to_seconds(startuur)
+    end = time_to_seconds(tijdstip)
+    if end < start:
+        end += SECONDS_PER_DAY
+    return start, end
+
+
+def overlap_message(error: Exception) -> Optional[str]:
+    """The message of a cycle overlap rejected by the database (migration 0005), else None."""
+    match = OVERLAP_ERROR.search(str(error))
+    return match.group(0) if match else None
+
+
+class IntervalSet:
+    """Intervals of one resource, sorted by start.
+
+    max_ends[i] is the largest end among the first i + 1 intervals, so "does
+    anything overlap [start, end)" is one bisect plus one comparison.
+    """
+    __slots__ = ("starts", "ends", "ids", "max_ends")
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.ids: List[int] = []
+        self.max_ends: List[int] = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _fix_max_ends(self, position: int) -> None:
+        # Recompute the prefix maximum from position on, stopping once it matches the old value
+        for i in range(position, len(self.ends)):
+            value = max(self.max_ends[i - 1], self.ends[i]) if i else self.ends[i]
+            if i > position and self.max_ends[i] == value:
+                return
+            self.max_ends[i] = value
+
+    def add(self, start: int, end: int, cyclus_id: int) -> None:
+        position = bisect.bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.ids.insert(position, cyclus_id)
+        self.max_ends.insert(position, end)
+        self._fix_max_ends(position)
+
+    def remove(self, start: int, cyclus_id: int) -> bool:
+        position = bisect.bisect_left(self.starts, start)
+        while position < len(self.starts) and self.starts[position] == start:
+            if self.ids[position] == cyclus_id:
+                for column in (self.starts, self.ends, self.ids, self.max_ends):
+                    del column[position]
+                if position < len(self.ends):
+                    self._fix_max_ends(position)
+                return True
+            position += 1
+        return False
+
+    def overlapping(self, start: int, end: int, exclude: Optional[int] = None) -> List[int]:
+        """Ids of intervals overlapping [start, end), excluding the given cyclus id."""
+        position = bisect.bisect_left(self.starts, end) - 1
+        found = []
+        # max_ends is non-decreasing, so once it drops to start nothing further left can overlap
+        while position >= 0 and self.max_ends[position] > start:
+            if self.ends[position] > start and self.ids[position] != exclude:
+                found.append(self.ids[position])
+            position -= 1
+        return found
+
+    def has_overlap(self, start: int, end: int, exclude: Optional[int] = None) -> bool:
+        position = bisect.bisect_left(self.starts, end) - 1
+        if position < 0 or self.max_ends[position] <= start:
+            return False
+        return exclude is None or bool(self.overlapping(start, end, exclude))
+
+    @staticmethod
+    def _day_windows(start: int, end: int) -> Tuple[Tuple[int, int], ...]:
+        # TIME values repeat daily: a range running past midnight also meets early-morning ranges
+        return ((start, end),
+                (start + SECONDS_PER_DAY, end + SECONDS_PER_DAY),
+                (start - SECONDS_PER_DAY, end - SECONDS_PER_DAY))
+
+    def overlapping_daily(self, start: int, end: int, exclude: Optional[int] = None) -> List[int]:
+        found = []
+        for window in self._day_windows(start, end):
+            found.extend(i for i in self.overlapping(*window, exclude) if i not in found)
+        return found
+
+    def has_overlap_daily(self, start: int, end: int, exclude: Optional[int] = None) -> bool:
+        return any(self.has_overlap(*window, exclude) for window in self._day_windows(start, end))
+
+    def conflicts(self) -> List[Tuple[int, int]]:
+        """All overlapping (earlier, later) id pairs, by sweep over the sorted starts."""
+        pairs = []
+        active: List[Tuple[int, int]] = [] # min-heap of (end, id)
+        for start, end, cyclus_id in zip(self.starts, self.ends, self.ids):
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            pairs.extend((other_id, cyclus_id) for _, other_id in active)
+            heapq.heappush(active, (end, cyclus_id))
+        # Ranges past midnight against the early-morning ranges of the same day
+        seen = {frozenset(pair) for pair in pairs}
+        for start, end, cyclus_id in zip(self.starts, self.ends, self.ids):
+            if end > SECONDS_PER_DAY:
+                for other_id in self.overlapping(start - SECONDS_PER_DAY, end - SECONDS_PER_DAY, cyclus_id):
+                    if frozenset((cyclus_id, other_id)) not in seen:
+                        seen.add(frozenset((cyclus_id, other_id)))
+                        pairs.append((cyclus_id, other_id))
+        return pairs
+
+
+class CycleIndex:
+    """In-process interval index over Cyclus time ranges per drone and per docking station.
+
+    A read cache for the availability query and the conflict report. Overlaps are
+    enforced by the database (check_cyclus_overlap triggers, migration 0005), which
+    sees the writes of every process; this index only serves reads. It is built
+    lazily on the first read, kept current by the helpers' writes in this process
+    and fully rebuilt every REBUILD_SECONDS to pick up writes made elsewhere.
+    """
+    REBUILD_SECONDS = 300
+    PAGE_SIZE = 1000
+
+    _lock = threading.RLock()
+    _sets: Dict[Resource, IntervalSet] = {}
+    _cycli: Dict[int, Tuple[int, int, Tuple[Resource, ...]]] = {}
+    _built_at: Optional[float] = None
+
+    @staticmethod
+    def _fetch_all(table: str, columns: str) -> List[Dict]:
+        rows = []
+        offset = 0
+        while True:
+            response = (supabase.table(table).select(columns).order("Id")
+                        .range(offset, offset + CycleIndex.PAGE_SIZE - 1).execute())
+            rows.extend(response.data)
+            if len(response.data) < CycleIndex.PAGE_SIZE:
+                return rows
+            offset += CycleIndex.PAGE_SIZE
+
+    @staticmethod
+    def resources_for(vlucht_cyclus: Optional[Dict], docking_cycli: Iterable[Dict]) -> Tuple[Resource, ...]:
+        resources = set()
+        if vlucht_cyclus and vlucht_cyclus.get("DroneId") is not None:
+            resources.add(("drone", vlucht_cyclus["DroneId"]))
+        for docking_cyclus in docking_cycli:
+            if docking_cyclus.get("DroneId") is not None:
+                resources.add(("drone", docking_cyclus["DroneId"]))
+            if docking_cyclus.get("DockingId") is not None:
+                resources.add(("docking", docking_cyclus["DockingId"]))
+        return tuple(sorted(resources))
+
+    @staticmethod
+    def _put(cyclus_id: int, start: int, end: int, resources: Tuple[Resource, ...]) -> None:
+        CycleIndex._drop(cyclus_id)
+        CycleIndex._cycli[cyclus_id] = (start, end, resources)
+        if start == end:
+            return # Empty, overlaps nothing
+        for resource in resources:
+            CycleIndex._sets.setdefault(resource, IntervalSet()).add(start, end, cyclus_id)
+
+    @staticmethod
+    def _drop(cyclus_id: int) -> None:
+        previous = CycleIndex._cycli.pop(cyclus_id, None)
+        if previous and previous[0] != previous[1]:
+            start, _, resources = previous
+            for resource in resources:
+                CycleIndex._sets[resource].remove(start, cyclus_id)
+
+    @staticmethod
+    def rebuild() -> None:
+        """Reload every cycle and its drone/docking links from the database."""
+        try:
+            cycli = CycleIndex._fetch_all("Cyclus", "Id, startuur, tijdstip, VluchtCyclus(DroneId)")
+            links: Dict[int, List[Dict]] = {}
+            for row in CycleIndex._fetch_all("DockingCyclus", "Id, CyclusId, DroneId, DockingId"):
+                links.setdefault(row["CyclusId"], []).append(row)
+        except Exception as e:
+            logger.error(f"Error rebuilding cycle index: {e}")
+            raise
+
+        sets: Dict[Resource, IntervalSet] = {}
+        entries: Dict[int, Tuple[int, int, Tuple[Resource, ...]]] = {}
+        rows_per_resource: Dict[Resource, List[Tuple[int, int, int]]] = {}
+        for row in cycli:
+            start, end = cyclus_interval(row["startuur"], row["tijdstip"])
+            resources = CycleIndex.resources_for(row.get("VluchtCyclus"), links.get(row["Id"], []))
+            entries[row["Id"]] = (start, end, resources)
+            if start == end:
+                continue
+            for resource in resources:
+                rows_per_resource.setdefault(resource, []).append((start, end, row["Id"]))
+        for resource, intervals in rows_per_resource.items():
+            # Bulk load: sort once and compute the prefix maximum in a single pass
+            intervals.sort()
+            interval_set = IntervalSet()
+            interval_set.starts = [i[0] for i in intervals]
+            interval_set.ends = [i[1] for i in intervals]
+            interval_set.ids = [i[2] for i in intervals]
+            running = -1
+            for end in interval_set.ends:
+                running = max(running, end)
+                interval_set.max_ends.append(running)
+            sets[resource] = interval_set
+
+        with CycleIndex._lock:
+            CycleIndex._sets = sets
+            CycleIndex._cycli = entries
+            CycleIndex._built_at = clock.monotonic()
+        logger.info(f"Cycle index rebuilt: {len(entries)} cycli over {len(sets)} resources")
+
+    @staticmethod
+    def _ensure_built() -> None:
+        built_at = CycleIndex._built_at
+        if built_at is None or clock.monotonic() - built_at > CycleIndex.REBUILD_SECONDS:
+            CycleIndex.rebuild()
+
+    @staticmethod
+    def invalidate() -> None:
+        """Force a full rebuild on next use, e.g. after a VluchtCyclus changes drone."""
+        CycleIndex._built_at = None
+
+    @staticmethod
+    def refresh_cyclus(cyclus_id: int) -> None:
+        """Re-read one cycle and its links and update the index in place."""
+        if CycleIndex._built_at is None:
+            return # Not built yet, the first use loads everything
+        try:
+            response = (supabase.table("Cyclus")
+                        .select("Id, startuur, tijdstip, VluchtCyclus(DroneId), DockingCyclus(DroneId, DockingId)")
+                        .eq("Id", cyclus_id).limit(1).execute())
+        except Exception as e:
+            logger.error(f"Error refreshing cyclus {cyclus_id} in cycle index, scheduling rebuild: {e}")
+            CycleIndex.invalidate()
+            return
+        with CycleIndex._lock:
+            if not response.data:
+                CycleIndex._drop(cyclus_id)
+                return
+            row = response.data[0]
+            start, end = cyclus_interval(row["startuur"], row["tijdstip"])
+            CycleIndex._put(cyclus_id, start, end, CycleIndex.resources_for(row.get("VluchtCyclus"), row.get("DockingCyclus") or []))
+
+    @staticmethod
+    def remove_cyclus(cyclus_id: int) -> None:
+        with CycleIndex._lock:
+            CycleIndex._drop(cyclus_id)
+
+    @staticmethod
+    def find_overlaps(start: int, end: int, resources: Iterable[Resource],
+                      exclude: Optional[int] = None) -> List[Dict]:
+        if start >= end:
+            return []
+        CycleIndex._ensure_built()
+        found = []
+        with CycleIndex._lock:
+            for resource in resources:
+                interval_set = CycleIndex._sets.get(resource)
+                if interval_set and interval_set.has_overlap_daily(start, end, exclude):
+                    found.extend({"type": resource[0], "Id": resource[1], "CyclusId": other}
+                                 for other in interval_set.overlapping_daily(start, end, exclude))
+        return found
+
+    @staticmethod
+    def busy_resources(start: int, end: int, kind: str) -> set:
+        """Ids of all drones or docking stations ("drone"/"docking") with a cycle in [start, end)."""
+        if start >= end:
+            return set()
+        CycleIndex._ensure_built()
+        with CycleIndex._lock:
+            return {resource[1] for resource, interval_set in CycleIndex._sets.items()
+                    if resource[0] == kind and interval_set.has_overlap_daily(start, end)}
+
+    @staticmethod
+    def conflicts() -> List[Dict]:
+        """Every overlapping pair of cycles per drone and per docking station."""
+        CycleIndex._ensure_built()
+        report = []
+        with CycleIndex._lock:
+            for resource, interval_set in sorted(CycleIndex._sets.items()):
+                for first, second in interval_set.conflicts():
+                    report.append({"type": resource[0], "Id": resource[1], "CyclusIds": [first, second]})
+        return report
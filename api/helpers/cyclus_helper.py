@@ -1,18 +1,21 @@
 from typing import Dict, List, Optional
 from datetime import time
 from ..config import supabase
+from .cycle_index import CycleIndex, overlap_message
 import logging
 
 logger = logging.getLogger(__name__)
 
 class CyclusHelper:
     TABLE_NAME = "Cyclus"
+    HISTORY_VIEW = "CyclusHistorie"  # live and archived rows, see ArchiveHelper
 
     @staticmethod
-    def get_all_cycli() -> List[Dict]:
-        """Get all cycles"""
+    def get_all_cycli(include_archived: bool = False) -> List[Dict]:
+        """Get all cycles (of archived events too with include_archived)"""
+        table = CyclusHelper.HISTORY_VIEW if include_archived else CyclusHelper.TABLE_NAME
         try:
-            response = supabase.table(CyclusHelper.TABLE_NAME).select("*").execute()
+            response = supabase.table(table).select("*").execute()
             return response.data
         except Exception as e:
             logger.error(f"Error fetching all cycli: {e}")
@@ -29,10 +32,11 @@ class CyclusHelper:
             raise
 
     @staticmethod
-    def get_cycli_by_vlucht_cyclus(vlucht_cyclus_id: int) -> List[Dict]:
+    def get_cycli_by_vlucht_cyclus(vlucht_cyclus_id: int, include_archived: bool = False) -> List[Dict]:
         """Get cycles associated with a specific VluchtCyclus"""
+        table = CyclusHelper.HISTORY_VIEW if include_archived else CyclusHelper.TABLE_NAME
         try:
-            response = supabase.table(CyclusHelper.TABLE_NAME).select("*").eq("VluchtCyclusId", vlucht_cyclus_id).execute()
+            response = supabase.table(table).select("*").eq("VluchtCyclusId", vlucht_cyclus_id).execute()
             return response.data
         except Exception as e:
             logger.error(f"Error fetching cycli for VluchtCyclus {vlucht_cyclus_id}: {e}")
@@ -41,15 +45,19 @@ class CyclusHelper:
     @staticmethod
     def create_cyclus(startuur: time, tijdstip: time, vlucht_cyclus_id: Optional[int] = None) -> Optional[Dict]:
         """Create a new cycle"""
+        if startuur == tijdstip:
+            raise ValueError("startuur and tijdstip must differ.")
         cyclus_data = {
             "startuur": startuur.isoformat(),
             "tijdstip": tijdstip.isoformat(),
             "VluchtCyclusId": vlucht_cyclus_id # Handles None correctly
         }
 
+        # A time range overlapping another cycle of the same drone is rejected by the database
         try:
             response = supabase.table(CyclusHelper.TABLE_NAME).insert(cyclus_data).execute()
             if response.data:
+                CycleIndex.refresh_cyclus(response.data[0]["Id"])
                 return response.data[0]
             else:
                 if hasattr(response, 'error') and response.error:
@@ -63,6 +71,8 @@ class CyclusHelper:
             if "violates foreign key constraint" in str(e) and '"fk_cyclus_vluchtcyclus"' in str(e):
                  logger.warning(f"Attempted to create cyclus with non-existent VluchtCyclusId {vlucht_cyclus_id}")
                  raise ValueError(f"Invalid VluchtCyclusId: {vlucht_cyclus_id} does not exist.")
+            if overlap_message(e):
+                raise ValueError(overlap_message(e))
             logger.error(f"Error creating cyclus with data {cyclus_data}: {e}")
             raise
 
@@ -83,9 +93,14 @@ class CyclusHelper:
         if "VluchtCyclusId" in update_data and update_data["VluchtCyclusId"] is None:
             pass # Client should handle setting NULL
 
+        if "startuur" in update_data and update_data["startuur"] == update_data.get("tijdstip"):
+            raise ValueError("startuur and tijdstip must differ.")
+
         try:
             response = supabase.table(CyclusHelper.TABLE_NAME).update(update_data).eq("Id", cyclus_id).execute()
             if response.data:
+                if {"startuur", "tijdstip", "VluchtCyclusId"} & update_data.keys():
+                    CycleIndex.refresh_cyclus(cyclus_id)
                 return response.data[0]
             else:
                 existing = CyclusHelper.get_cyclus_by_id(cyclus_id)
@@ -101,9 +116,22 @@ class CyclusHelper:
             if "violates foreign key constraint" in str(e) and '"fk_cyclus_vluchtcyclus"' in str(e):
                  logger.warning(f"Update cyclus {cyclus_id} failed due to invalid VluchtCyclusId in data {update_data}")
                  raise ValueError(f"Invalid VluchtCyclusId provided in update.")
+            if overlap_message(e):
+                raise ValueError(overlap_message(e))
+            if '"cyclus_niet_leeg"' in str(e):
+                raise ValueError("startuur and tijdstip must differ.")
             logger.error(f"Error updating cyclus {cyclus_id} with data {update_data}: {e}")
             raise
 
+    @staticmethod
+    def get_conflicts() -> List[Dict]:
+        """Report every pair of overlapping cycles per drone and per docking station"""
+        try:
+            return CycleIndex.conflicts()
+        except Exception as e:
+            logger.error(f"Error building cyclus conflict report: {e}")
+            raise
+
     @staticmethod
     def delete_cyclus(cyclus_id: int) -> bool:
         """Delete a cycle. Returns True if successful, False otherwise."""
@@ -122,6 +150,7 @@ class CyclusHelper:
             if hasattr(response, 'error') and response.error:
                 logger.error(f"Supabase delete cyclus {cyclus_id} error: {response.error.message}")
                 raise Exception(f"Supabase delete cyclus error: {response.error.message}")
+            CycleIndex.remove_cyclus(cyclus_id)
             return True
         except ValueError: # Re-raise specific error for 409
              raise
@@ -1,5 +1,6 @@
 from typing import Dict, List, Optional
 from ..config import supabase
+from .reservation_helper import ReservationHelper
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,9 +20,9 @@ class DockingHelper:
 
     @staticmethod
     def get_available_dockings() -> List[Dict]:
-        """Get all available docking stations"""
+        """Get all available docking stations, including ones whose reservation expired"""
         try:
-            response = supabase.table(DockingHelper.TABLE_NAME).select("*").eq("isbeschikbaar", True).execute()
+            response = supabase.table(DockingHelper.TABLE_NAME).select("*").or_(ReservationHelper.free_filter()).execute()
             return response.data
         except Exception as e:
             logger.error(f"Error fetching available dockings: {e}")
@@ -70,6 +71,9 @@ class DockingHelper:
              raise ValueError("Docking location (locatie) cannot be empty")
         if 'isbeschikbaar' in kwargs and not isinstance(kwargs['isbeschikbaar'], bool):
              raise ValueError("isbeschikbaar must be a boolean")
+        if 'isbeschikbaar' in kwargs:
+            # A manual availability change overrides any pending reservation (see ReservationHelper)
+            kwargs.update({"gereserveerdTot": None, "reserveringToken": None})
 
         try:
             response = supabase.table(DockingHelper.TABLE_NAME).update(kwargs).eq("Id", docking_id).execute()
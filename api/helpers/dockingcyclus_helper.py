@@ -1,17 +1,20 @@
 from typing import Dict, List, Optional
 from ..config import supabase
+from .cycle_index import CycleIndex, overlap_message
 import logging
 
 logger = logging.getLogger(__name__)
 
 class DockingCyclusHelper:
     TABLE_NAME = "DockingCyclus"
+    HISTORY_VIEW = "DockingCyclusHistorie"  # live and archived rows, see ArchiveHelper
 
     @staticmethod
-    def get_all_docking_cycli() -> List[Dict]:
-        """Get all docking cycles"""
+    def get_all_docking_cycli(include_archived: bool = False) -> List[Dict]:
+        """Get all docking cycles (of archived events too with include_archived)"""
+        table = DockingCyclusHelper.HISTORY_VIEW if include_archived else DockingCyclusHelper.TABLE_NAME
         try:
-            response = supabase.table(DockingCyclusHelper.TABLE_NAME).select("*").execute()
+            response = supabase.table(table).select("*").execute()
             return response.data
         except Exception as e:
             logger.error(f"Error fetching all docking cycli: {e}")
@@ -66,9 +69,11 @@ class DockingCyclusHelper:
             "DockingId": docking_id,
             "CyclusId": cyclus_id
         }
+        # Linking a cycle to a drone or dock that already has an overlapping cycle is rejected by the database
         try:
             response = supabase.table(DockingCyclusHelper.TABLE_NAME).insert(docking_cyclus_data).execute()
             if response.data:
+                CycleIndex.refresh_cyclus(cyclus_id)
                 return response.data[0]
             else:
                 if hasattr(response, 'error') and response.error:
@@ -97,6 +102,8 @@ class DockingCyclusHelper:
                  # ... logic to find offending fk ...
                  logger.warning(f"Create DockingCyclus failed due to {offending_fk} in data {docking_cyclus_data}")
                  raise ValueError(f"Cannot create DockingCyclus: {offending_fk} does not exist.")
+            if overlap_message(e):
+                raise ValueError(overlap_message(e))
             logger.error(f"Error creating docking cyclus with data {docking_cyclus_data}: {e}")
             raise
 
@@ -117,9 +124,13 @@ class DockingCyclusHelper:
         if not update_data:
             raise ValueError("No valid fields provided for DockingCyclus update.")
 
+        existing = DockingCyclusHelper.get_docking_cyclus_by_id(docking_cyclus_id)
+
         try:
             response = supabase.table(DockingCyclusHelper.TABLE_NAME).update(update_data).eq("Id", docking_cyclus_id).execute()
             if response.data:
+                for affected_cyclus_id in {existing["CyclusId"] if existing else None, response.data[0]["CyclusId"]} - {None}:
+                    CycleIndex.refresh_cyclus(affected_cyclus_id)
                 return response.data[0]
             else:
                 existing = DockingCyclusHelper.get_docking_cyclus_by_id(docking_cyclus_id)
@@ -137,6 +148,8 @@ class DockingCyclusHelper:
                  # FK check logic as in create
                  logger.warning(f"Update DockingCyclus {docking_cyclus_id} failed due to invalid FK in data {update_data}")
                  raise ValueError(f"Invalid reference ID provided in update.")
+            if overlap_message(e):
+                raise ValueError(overlap_message(e))
             logger.error(f"Error updating docking cyclus {docking_cyclus_id} with data {update_data}: {e}")
             raise
 
@@ -152,6 +165,8 @@ class DockingCyclusHelper:
                 logger.error(f"Supabase delete docking cyclus {docking_cyclus_id} error: {response.error.message}")
                 raise Exception(f"Supabase delete docking cyclus error: {response.error.message}")
             # This table is not referenced by others, so deletion should be straightforward
+            if existing.get("CyclusId") is not None:
+                CycleIndex.refresh_cyclus(existing["CyclusId"])
             return True
         except Exception as e:
             logger.error(f"Error deleting docking cyclus {docking_cyclus_id}: {e}")
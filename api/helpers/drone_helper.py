@@ -1,5 +1,6 @@
 from typing import Dict, List, Optional
 from ..config import supabase
+from .broadcaster import Broadcaster
 import logging
 
 logger = logging.getLogger(__name__)
@@ -7,6 +8,15 @@ logger = logging.getLogger(__name__)
 class DroneHelper:
     TABLE_NAME = "Drone"
     VALID_STATUSES = ['AVAILABLE', 'IN_USE', 'MAINTENANCE', 'OFFLINE']
+    STREAMED_FIELDS = ("Id", "status", "batterij", "magOpstijgen")
+
+    # Live drone changes for GET /api/stream/drones
+    events = Broadcaster("drone", max_buffer=256, max_subscribers=1000)
+
+    @staticmethod
+    def publish(event_type: str, drone: Dict) -> None:
+        """Send a drone change to the stream subscribers, for helpers that write Drone rows themselves"""
+        DroneHelper.events.publish(event_type, {k: drone[k] for k in DroneHelper.STREAMED_FIELDS if k in drone})
 
     @staticmethod
     def get_all_drones() -> List[Dict]:
@@ -64,6 +74,7 @@ class DroneHelper:
         try:
             response = supabase.table(DroneHelper.TABLE_NAME).insert(drone_data).execute()
             if response.data:
+                DroneHelper.publish("created", response.data[0])
                 return response.data[0]
             else:
                 if hasattr(response, 'error') and response.error:
@@ -90,6 +101,7 @@ class DroneHelper:
         try:
             response = supabase.table(DroneHelper.TABLE_NAME).update(kwargs).eq("Id", drone_id).execute()
             if response.data:
+                DroneHelper.publish("updated", response.data[0])
                 return response.data[0]
             else:
                 existing = DroneHelper.get_drone_by_id(drone_id)
@@ -115,6 +127,7 @@ class DroneHelper:
                 logger.error(f"Supabase delete drone {drone_id} error: {response.error.message}")
                 raise Exception(f"Supabase delete drone error: {response.error.message}")
             # Check VluchtCyclus/DockingCyclus FKs
+            DroneHelper.publish("deleted", {"Id": drone_id})
             return True
         except Exception as e:
             if "violates foreign key constraint" in str(e): # Add specific FK names if needed
@@ -1,6 +1,8 @@
 from typing import Dict, List, Optional
 from datetime import date, time
 from ..config import supabase
+from .cycle_index import CycleIndex
+from .reservation_helper import ReservationHelper
 import logging # Add logging
 
 logger = logging.getLogger(__name__)
@@ -116,4 +118,64 @@ class EvenementHelper:
         except Exception as e:
             # Catch potential DB errors like FK violations if ON DELETE CASCADE has issues
             logger.error(f"Error deleting event {event_id}: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    @staticmethod
+    def delete_event_cascade(event_id: int) -> Optional[Dict]:
+        """Delete an event with its zones, flight cycles, cycles, docking cycles and archived cycles
+        in one transaction (delete_event_cascade RPC). Returns the deleted counts, None if not found."""
+        try:
+            response = supabase.rpc("delete_event_cascade", {"evenement": event_id}).execute()
+        except Exception as e:
+            logger.error(f"Error cascade deleting event {event_id}: {e}")
+            raise
+        if not response.data:
+            return None
+        counts = response.data[0]
+        if counts["cycli"] or counts["dockingCycli"]:
+            # The deleted cycles are still in the overlap index
+            CycleIndex.invalidate()
+        logger.info(f"Event {event_id} deleted with its tree: {counts}")
+        return counts
+
+    @staticmethod
+    def summarize_overview(event: Dict, zones: List[Dict], vlucht_cycli: List[Dict], drones: List[Dict],
+                           startplaatsen: List[Dict], dockings: List[Dict]) -> Dict:
+        """Shapes the event overview. Shared by the sync route and the async (ASGI) one."""
+        cycli_per_zone, drones_per_zone = {}, {}
+        for vc in vlucht_cycli:
+            cycli_per_zone[vc["ZoneId"]] = cycli_per_zone.get(vc["ZoneId"], 0) + 1
+            if vc.get("DroneId") is not None:
+                drones_per_zone.setdefault(vc["ZoneId"], set()).add(vc["DroneId"])
+        drone_status = {}
+        for drone in drones:
+            drone_status[drone["status"]] = drone_status.get(drone["status"], 0) + 1
+        return {
+            "event": event,
+            "zones": [{**zone,
+                       "vlucht_cycli": cycli_per_zone.get(zone["Id"], 0),
+                       "drones": sorted(drones_per_zone.get(zone["Id"], ()))}
+                      for zone in zones],
+            "drones": {"total": len(drones), "status_distribution": drone_status},
+            "startplaatsen": {"total": len(startplaatsen), "available": sum(1 for s in startplaatsen if ReservationHelper.is_free(s))},
+            "docking": {"total": len(dockings), "available": sum(1 for d in dockings if ReservationHelper.is_free(d))},
+        }
+
+    @staticmethod
+    def get_event_overview(event_id: int) -> Optional[Dict]:
+        """Event with its zones, their flight cycles and fleet/pad/dock availability. None if the event does not exist."""
+        try:
+            event = EvenementHelper.get_event_by_id(event_id)
+            if not event:
+                return None
+            zones = supabase.table("Zone").select("*").eq("EvenementId", event_id).execute().data
+            zone_ids = [z["Id"] for z in zones]
+            vlucht_cycli = (supabase.table("VluchtCyclus").select("Id, ZoneId, DroneId").in_("ZoneId", zone_ids)
+                            .execute().data) if zone_ids else []
+            drones = supabase.table("Drone").select("Id, status").execute().data
+            startplaatsen = supabase.table("Startplaats").select("Id, isbeschikbaar, gereserveerdTot").execute().data
+            dockings = supabase.table("Docking").select("Id, isbeschikbaar, gereserveerdTot").execute().data
+        except Exception as e:
+            logger.error(f"Error fetching overview for event {event_id}: {e}")
+            raise
+        return EvenementHelper.summarize_overview(event, zones, vlucht_cycli, drones, startplaatsen, dockings)
@@ -0,0 +1,241 @@
+from typing import Callable, Dict, Iterator, List, Optional
+from datetime import date
+import csv
+import heapq
+import io
+from ..config import supabase
+from .cycle_index import time_to_seconds
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Sink:
+    """Write-only file object that hands written bytes back to a generator."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self.closed = False
+
+    def write(self, data) -> int:
+        return self.buffer.write(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+class ExportHelper:
+    """Streams whole tables as CSV or Parquet with constant memory.
+
+    Rows are read in Id-keyset pages and written out page by page (CSV) or one
+    row group per ROW_GROUP_PAGES pages (Parquet). An event/date filter is
+    pushed down as an embedded !inner join to Zone.EvenementId, so each page
+    request carries the event Ids only, never the Ids of the rows in scope.
+
+    With include_archived the cycles of archived events are exported too: from
+    the *Historie views, or for an event filter from the archive side of each
+    table (ARCHIVE_SCOPE), merged with the live rows in Id order.
+    """
+    PAGE_SIZE = 1000
+    ROW_GROUP_PAGES = 20
+    FORMATS = ["csv", "parquet"]
+
+    # Exportable tables and their column types ("int", "str", "bool", "time")
+    TABLES = {
+        "Cyclus": {"Id": "int", "startuur": "time", "tijdstip": "time", "VluchtCyclusId": "int"},
+        "VluchtCyclus": {"Id": "int", "VerslagId": "int", "PlaatsId": "int", "DroneId": "int", "ZoneId": "int"},
+        "DockingCyclus": {"Id": "int", "DroneId": "int", "DockingId": "int", "CyclusId": "int"},
+        "Drone": {"Id": "int", "status": "str", "batterij": "int", "magOpstijgen": "bool"},
+        "Verslag": {"Id": "int", "onderwerp": "str", "inhoud": "str", "isverzonden": "bool",
+                    "isgeaccepteerd": "bool", "VluchtCyclusId": "int", "inhoudLengte": "int", "inhoudDigest": "str",
+                    # inhoud is only a preview when set; GET /api/verslagen/<id>/content has the full body
+                    "inhoudAfgekapt": "bool"},
+    }
+    # Embedded join that links a table to its event(s), and the column path to filter on
+    SCOPE_JOIN = {
+        "Cyclus": ("VluchtCyclus!inner(Zone!inner(EvenementId))", "VluchtCyclus.Zone.EvenementId"),
+        "VluchtCyclus": ("Zone!inner(EvenementId)", "Zone.EvenementId"),
+        "Drone": ("VluchtCyclus!inner(Zone!inner(EvenementId))", "VluchtCyclus.Zone.EvenementId"),
+        # Verslag and VluchtCyclus point at each other; the report of a flight is VluchtCyclus.VerslagId
+        "Verslag": ("VluchtCyclus!VluchtCyclus_VerslagId_fkey!inner(Zone!inner(EvenementId))",
+                    "VluchtCyclus.Zone.EvenementId"),
+    }
+    # Docking cycles have no event link of their own: read them from the EvenementCyclus view
+    # (migration 0006), i.e. those of drones flying in the event and not on another event's flight
+    SCOPE_VIEW = {"DockingCyclus": ("EvenementCyclus", "docking")}
+    # Live and archived rows of the tables archive_event moves (migration 0002)
+    HISTORY_VIEW = {"Cyclus": "CyclusHistorie", "VluchtCyclus": "VluchtCyclusHistorie",
+                    "DockingCyclus": "DockingCyclusHistorie"}
+    # Rows of archived events by their EvenementId: the archive tables, and for drones and
+    # reports the views over the archived flight cycles (migration 0013)
+    ARCHIVE_SCOPE = {"Cyclus": "CyclusArchief", "VluchtCyclus": "VluchtCyclusArchief",
+                     "DockingCyclus": "DockingCyclusArchief", "Drone": "EvenementArchiefDrone",
+                     "Verslag": "EvenementArchiefVerslag"}
+
+    @staticmethod
+    def resolve_columns(table: str, columns: Optional[List[str]]) -> List[str]:
+        if table not in ExportHelper.TABLES:
+            raise ValueError(f"Invalid table '{table}'. Must be one of: {', '.join(ExportHelper.TABLES)}")
+        available = ExportHelper.TABLES[table]
+        if not columns:
+            return list(available)
+        unknown = [c for c in columns if c not in available]
+        if unknown:
+            raise ValueError(f"Unknown column(s) for {table}: {', '.join(unknown)}")
+        # Id is always exported, the keyset pagination needs it
+        return columns if "Id" in columns else ["Id"] + columns
+
+    @staticmethod
+    def resolve_scope(event_id: Optional[int] = None, date_from: Optional[date] = None,
+                      date_to: Optional[date] = None) -> Optional[List[int]]:
+        """Ids of the event and/or the events overlapping [date_from, date_to]. None means no filter."""
+        if event_id is None and date_from is None and date_to is None:
+            return None
+        query = supabase.table("Evenement").select("Id")
+        if event_id is not None:
+            query = query.eq("Id", event_id)
+        if date_from is not None:
+            query = query.gte("EindDatum", date_from.isoformat())
+        if date_to is not None:
+            query = query.lte("StartDatum", date_to.isoformat())
+        return [e["Id"] for e in query.execute().data]
+
+    @staticmethod
+    def _scoped_query(table: str, columns: List[str], event_ids: Optional[List[int]]):
+        if event_ids is None:
+            return supabase.table(table).select(", ".join(columns))
+        if table in ExportHelper.SCOPE_VIEW:
+            view, soort = ExportHelper.SCOPE_VIEW[table]
+            return (supabase.table(view).select(", ".join(columns))
+                    .eq("soort", soort).in_("EvenementId", event_ids))
+        join, path = ExportHelper.SCOPE_JOIN[table]
+        return supabase.table(table).select(", ".join(columns + [join])).in_(path, event_ids)
+
+    @staticmethod
+    def _sources(table: str, columns: List[str], event_ids: Optional[List[int]],
+                 include_archived: bool) -> List[Callable]:
+        """Query builders whose rows together make up the export, each read in Id order."""
+        select = ", ".join(columns)
+        if event_ids is None:
+            source = ExportHelper.HISTORY_VIEW.get(table, table) if include_archived else table
+            return [lambda: supabase.table(source).select(select)]
+        sources = [lambda: ExportHelper._scoped_query(table, columns, event_ids)]
+        if include_archived:
+            archive = ExportHelper.ARCHIVE_SCOPE[table]
+            sources.append(lambda: supabase.table(archive).select(select).in_("EvenementId", event_ids))
+        return sources
+
+    @staticmethod
+    def _rows(table: str, build_query: Callable) -> Iterator[Dict]:
+        """Rows of one source using keyset pagination on Id."""
+        last_id = None
+        while True:
+            query = build_query()
+            if last_id is not None:
+                query = query.gt("Id", last_id)
+            try:
+                rows = query.order("Id").limit(ExportHelper.PAGE_SIZE).execute().data
+            except Exception as e:
+                logger.error(f"Error exporting {table} after Id {last_id}: {e}")
+                raise
+            yield from rows
+            if len(rows) < ExportHelper.PAGE_SIZE:
+                return
+            last_id = rows[-1]["Id"]
+
+    @staticmethod
+    def iter_pages(table: str, columns: List[str], event_ids: Optional[List[int]] = None,
+                   include_archived: bool = False) -> Iterator[List[Dict]]:
+        """Pages of rows in Id order."""
+        if event_ids is not None and not event_ids:
+            return
+        streams = [ExportHelper._rows(table, build)
+                   for build in ExportHelper._sources(table, columns, event_ids, include_archived)]
+        rows = heapq.merge(*streams, key=lambda row: row["Id"]) if len(streams) > 1 else streams[0]
+
+        page: List[Dict] = []
+        last_id = None
+        for row in rows:
+            # The scope views repeat a row once per event it belongs to, and a drone or report
+            # can be in a live and an archived event
+            if row["Id"] == last_id:
+                continue
+            last_id = row["Id"]
+            page.append(row)
+            if len(page) == ExportHelper.PAGE_SIZE:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    @staticmethod
+    def stream_csv(table: str, columns: List[str], event_ids: Optional[List[int]] = None,
+                   include_archived: bool = False) -> Iterator[str]:
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(columns)
+        for rows in ExportHelper.iter_pages(table, columns, event_ids, include_archived):
+            writer.writerows([row.get(c) for c in columns] for row in rows)
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+        if out.tell():
+            yield out.getvalue()
+
+    @staticmethod
+    def arrow_schema(table: str, columns: List[str]):
+        import pyarrow as pa
+        types = {"int": pa.int64(), "str": pa.string(), "bool": pa.bool_(), "time": pa.time32("s")}
+        return pa.schema([(c, types[ExportHelper.TABLES[table][c]]) for c in columns])
+
+    @staticmethod
+    def to_record_batch(table: str, columns: List[str], rows: List[Dict], schema):
+        import pyarrow as pa
+        arrays = []
+        for column in columns:
+            values = [row.get(column) for row in rows]
+            if ExportHelper.TABLES[table][column] == "time":
+                values = [time_to_seconds(v) if v is not None else None for v in values]
+            arrays.append(pa.array(values, type=schema.field(column).type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    @staticmethod
+    def stream_parquet(table: str, columns: List[str], event_ids: Optional[List[int]] = None,
+                       include_archived: bool = False) -> Iterator[bytes]:
+        """Parquet file as a byte stream, one row group per ROW_GROUP_PAGES pages. Requires pyarrow."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = ExportHelper.arrow_schema(table, columns)
+        sink = _Sink()
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+        batches = []
+        try:
+            for rows in ExportHelper.iter_pages(table, columns, event_ids, include_archived):
+                batches.append(ExportHelper.to_record_batch(table, columns, rows, schema))
+                if len(batches) == ExportHelper.ROW_GROUP_PAGES:
+                    writer.write_table(pa.Table.from_batches(batches, schema=schema))
+                    batches = []
+                    yield sink.drain()
+            if batches:
+                writer.write_table(pa.Table.from_batches(batches, schema=schema))
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    @staticmethod
+    def parquet_available() -> bool:
+        try:
+            import pyarrow.parquet # noqa: F401
+            return True
+        except ImportError:
+            return False
@@ -0,0 +1,133 @@
+from typing import Dict, List
+import numpy as np
+from ..config import supabase
+from .cycle_index import cyclus_interval
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ForecastHelper:
+    """Projects drone battery levels over the scheduled cycles of an event."""
+    DEFAULT_DRAIN_RATE = 1.5    # percent per minute in a flight cycle
+    DEFAULT_CHARGE_RATE = 1.0   # percent per minute in a docking cycle
+    DEFAULT_SAFE_LEVEL = 20     # percent
+    VIEW_NAME = "EvenementCyclus"
+    PAGE_SIZE = 1000
+
+    @staticmethod
+    def project(batterij: np.ndarray, drone_index: np.ndarray, start: np.ndarray,
+                minutes: np.ndarray, rate: np.ndarray, safe_level: float) -> Dict[str, np.ndarray]:
+        """Vectorized battery projection for the whole fleet.
+
+        batterij holds the current level per drone; the other arrays hold one entry per
+        cycle (drone position, start second, duration, signed %/min). Cycles are applied
+        in start order per drone, levels are capped at 100 while charging, and nothing
+        loops in Python: the cap uses b_k = S_k - max(0, max_{j<=k}(S_j - 100)) with S
+        the uncapped running sum, computed with a segmented cumsum and running max.
+        """
+        drone_count = len(batterij)
+        level_min = batterij.astype(np.float64)
+        level_end = batterij.astype(np.float64)
+        first_unsafe = np.full(drone_count, -1, dtype=np.int64)
+        if len(drone_index) == 0:
+            return {"min": level_min, "end": level_end, "first_unsafe": first_unsafe}
+
+        # One int64 sort key (drone, start); start < 2 days fits in 18 bits. Skip the sort if
+        # the caller already delivered cycles in that order.
+        key = (drone_index.astype(np.int64) << 18) | start.astype(np.int64)
+        if np.all(key[1:] >= key[:-1]):
+            order = np.arange(len(key))
+        else:
+            order = np.argsort(key)
+        drone_index = drone_index[order]
+        delta = (minutes * rate)[order]
+
+        # Segmented cumulative sum: subtract the running total at the start of each drone's run
+        totals = np.cumsum(delta)
+        segment_start = np.r_[True, drone_index[1:] != drone_index[:-1]]
+        first_positions = np.flatnonzero(segment_start)
+        before_segment = totals[first_positions] - delta[first_positions]
+        segment_id = np.cumsum(segment_start) - 1
+        uncapped = batterij[drone_index] + totals - before_segment[segment_id]
+
+        # Segmented running max of the excess over 100, offset per segment so runs never mix
+        excess = np.maximum(uncapped - 100.0, 0.0)
+        span = excess.max() + 1.0
+        offset = segment_id * span
+        running_excess = np.maximum.accumulate(excess + offset) - offset
+        levels = uncapped - running_excess
+
+        # Per-drone minimum and final level (the minimum also considers the starting level)
+        segment_min = np.minimum.reduceat(levels, first_positions)
+        segment_drones = drone_index[first_positions]
+        level_min[segment_drones] = np.minimum(level_min[segment_drones], segment_min)
+        last_positions = np.r_[first_positions[1:] - 1, len(levels) - 1]
+        level_end[segment_drones] = levels[last_positions]
+
+        # First cycle (in start order) that ends below the safe level
+        unsafe = np.flatnonzero(levels < safe_level)
+        if len(unsafe):
+            unsafe_drones = drone_index[unsafe]
+            keep = np.r_[True, unsafe_drones[1:] != unsafe_drones[:-1]]
+            first_unsafe[unsafe_drones[keep]] = order[unsafe[keep]]
+        return {"min": level_min, "end": level_end, "first_unsafe": first_unsafe}
+
+    @staticmethod
+    def _load_event_cycles(event_id: int) -> List[Dict]:
+        """Flight cycles in the event's zones plus docking cycles of the drones flying them.
+
+        Reads the EvenementCyclus view (migration 0006), which joins server-side, one
+        kind at a time in Id-keyset pages so PostgREST's max-rows never truncates it.
+        """
+        cycles = []
+        for soort in ("vlucht", "docking"):
+            last_id = None
+            while True:
+                query = (supabase.table(ForecastHelper.VIEW_NAME)
+                         .select("Id, CyclusId, DroneId, startuur, tijdstip, batterij")
+                         .eq("EvenementId", event_id).eq("soort", soort))
+                if last_id is not None:
+                    query = query.gt("Id", last_id)
+                rows = query.order("Id").limit(ForecastHelper.PAGE_SIZE).execute().data
+                cycles.extend({"Id": r["CyclusId"], "DroneId": r["DroneId"], "batterij": r["batterij"],
+                               "startuur": r["startuur"], "tijdstip": r["tijdstip"], "type": soort} for r in rows)
+                if len(rows) < ForecastHelper.PAGE_SIZE:
+                    break
+                last_id = rows[-1]["Id"]
+        return cycles
+
+    @staticmethod
+    def forecast_event(event_id: int, drain_rate: float = DEFAULT_DRAIN_RATE,
+                       charge_rate: float = DEFAULT_CHARGE_RATE,
+                       safe_level: float = DEFAULT_SAFE_LEVEL) -> List[Dict]:
+        """Per-drone projected minimum and final battery over the event's cycles."""
+        try:
+            cycles = ForecastHelper._load_event_cycles(event_id)
+        except Exception as e:
+            logger.error(f"Error loading battery forecast data for event {event_id}: {e}")
+            raise
+        if not cycles:
+            return []
+        batterij = {c["DroneId"]: c["batterij"] for c in cycles}
+        drones = [{"Id": drone_id, "batterij": batterij[drone_id]} for drone_id in sorted(batterij)]
+
+        ids = np.array([d["Id"] for d in drones], dtype=np.int64)
+        position = {drone_id: i for i, drone_id in enumerate(ids.tolist())}
+        intervals = np.array([cyclus_interval(c["startuur"], c["tijdstip"]) for c in cycles], dtype=np.int64).reshape(-1, 2)
+
+        result = ForecastHelper.project(
+            batterij=np.array([d["batterij"] for d in drones], dtype=np.float64),
+            drone_index=np.array([position[c["DroneId"]] for c in cycles], dtype=np.int64),
+            start=intervals[:, 0],
+            minutes=(intervals[:, 1] - intervals[:, 0]) / 60.0,
+            rate=np.array([-drain_rate if c["type"] == "vlucht" else charge_rate for c in cycles]),
+            safe_level=safe_level,
+        )
+        return [{
+            "DroneId": int(ids[i]),
+            "batterij": drones[i]["batterij"],
+            "projected_min": round(max(float(result["min"][i]), 0.0), 1),
+            "projected_end": round(max(float(result["end"][i]), 0.0), 1),
+            "drops_below_safe": bool(result["min"][i] < safe_level),
+            "first_unsafe_cyclus_id": cycles[result["first_unsafe"][i]]["Id"] if result["first_unsafe"][i] >= 0 else None,
+        } for i in range(len(ids))]
@@ -0,0 +1,186 @@
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+import hashlib
+import threading
+import time
+from ..config import supabase
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of IdempotencyHelper.begin
+NEW = "new"             # caller owns the key and must call complete() or abort()
+REPLAY = "replay"       # a stored response exists for this key
+MISMATCH = "mismatch"   # the key was used before with a different request
+BUSY = "busy"           # the original request is still running after the wait timeout
+
+
+class IdempotencyStore:
+    """Bounded in-process store of responses per Idempotency-Key (LRU with a TTL).
+
+    Keys that are still being processed hold a threading.Event, so duplicates
+    arriving meanwhile wait for the first request instead of running again.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is not None and entry["record"] is not None and entry["expires"] < time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def begin(self, key: str, fingerprint: str, wait_seconds: float) -> Tuple[str, Optional[Dict]]:
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            with self._lock:
+                entry = self._live(key)
+                if entry is None:
+                    self._entries[key] = {"fingerprint": fingerprint, "record": None,
+                                          "done": threading.Event(), "expires": None}
+                    self._evict()
+                    return NEW, None
+                if entry["fingerprint"] != fingerprint:
+                    return MISMATCH, None
+                if entry["record"] is not None:
+                    self._entries.move_to_end(key)
+                    return REPLAY, entry["record"]
+                done = entry["done"]
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not done.wait(remaining):
+                return BUSY, None
+            # The first request finished (or aborted); look again
+
+    def complete(self, key: str, record: Dict) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry["record"] = record
+            entry["expires"] = time.monotonic() + self.ttl_seconds
+            self._entries.move_to_end(key)
+            entry["done"].set()
+
+    def abort(self, key: str) -> None:
+        """Forget an unfinished key so a retry may run the request again."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["record"] is None:
+                del self._entries[key]
+                entry["done"].set()
+
+    def _evict(self) -> None:
+        # Only finished entries are evicted; in-flight ones are bounded by the request concurrency
+        excess = len(self._entries) - self.max_entries
+        if excess <= 0:
+            return
+        for key in [k for k, e in self._entries.items() if e["record"] is not None][:excess]:
+            del self._entries[key]
+
+
+class IdempotencyHelper:
+    """Idempotency-Key handling for POST routes.
+
+    Every process keeps an IdempotencyStore. When the shared backend is enabled
+    (IdempotencyHelper.configure(shared=True)), keys are also claimed in the
+    IdempotencyKey table so retries that land on another worker or serverless
+    instance are deduplicated too (see db.sql).
+    """
+    TABLE_NAME = "IdempotencyKey"
+    HEADER = "Idempotency-Key"
+    MAX_KEY_LENGTH = 255
+    DEFAULT_TTL_SECONDS = 24 * 60 * 60
+    DEFAULT_MAX_ENTRIES = 10000
+    WAIT_SECONDS = 30.0         # how long a duplicate waits for the original request
+    POLL_SECONDS = 0.25         # shared backend poll interval while another instance runs the request
+    NEW, REPLAY, MISMATCH, BUSY = NEW, REPLAY, MISMATCH, BUSY
+
+    store = IdempotencyStore(max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS)
+    shared = False
+
+    @staticmethod
+    def configure(max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                  shared: bool = False) -> None:
+        IdempotencyHelper.store = IdempotencyStore(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        IdempotencyHelper.shared = shared
+
+    @staticmethod
+    def fingerprint(method: str, path: str, body: bytes) -> str:
+        """Identifies the request a key was first used for, so a reused key with another payload is refused."""
+        return hashlib.sha256(method.encode() + b" " + path.encode() + b"\n" + body).hexdigest()
+
+    @staticmethod
+    def begin(key: str, fingerprint: str) -> Tuple[str, Optional[Dict]]:
+        if not key or len(key) > IdempotencyHelper.MAX_KEY_LENGTH:
+            raise ValueError(f"{IdempotencyHelper.HEADER} must be 1 to {IdempotencyHelper.MAX_KEY_LENGTH} characters.")
+        outcome, record = IdempotencyHelper.store.begin(key, fingerprint, IdempotencyHelper.WAIT_SECONDS)
+        if outcome != NEW or not IdempotencyHelper.shared:
+            return outcome, record
+
+        try:
+            outcome, record = IdempotencyHelper._claim_shared(key, fingerprint)
+        except Exception as e:
+            # The local store still deduplicates; do not fail the request over the shared backend
+            logger.error(f"Shared idempotency backend failed for key {key}: {e}")
+            return NEW, None
+        if outcome == REPLAY:
+            IdempotencyHelper.store.complete(key, record)
+        elif outcome != NEW:
+            IdempotencyHelper.store.abort(key)
+        return outcome, record
+
+    @staticmethod
+    def complete(key: str, status: int, body: str, content_type: str) -> None:
+        record = {"status": status, "body": body, "content_type": content_type}
+        IdempotencyHelper.store.complete(key, record)
+        if IdempotencyHelper.shared:
+            try:
+                (supabase.table(IdempotencyHelper.TABLE_NAME)
+                 .update({"status": status, "body": body, "contentType": content_type})
+                 .eq("key", key).execute())
+            except Exception as e:
+                logger.error(f"Error storing idempotent response for key {key}: {e}")
+
+    @staticmethod
+    def abort(key: str) -> None:
+        IdempotencyHelper.store.abort(key)
+        if IdempotencyHelper.shared:
+            try:
+                supabase.table(IdempotencyHelper.TABLE_NAME).delete().eq("key", key).is_("status", "null").execute()
+            except Exception as e:
+                logger.error(f"Error releasing idempotency key {key}: {e}")
+
+    @staticmethod
+    def _claim_shared(key: str, fingerprint: str) -> Tuple[str, Optional[Dict]]:
+        """Insert a pending row for the key; if another instance already has it, wait for its response."""
+        now = datetime.now(timezone.utc)
+        expires = now + timedelta(seconds=IdempotencyHelper.store.ttl_seconds)
+        # Expired keys may be reused
+        supabase.table(IdempotencyHelper.TABLE_NAME).delete().eq("key", key).lt("verlooptOp", now.isoformat()).execute()
+        try:
+            supabase.table(IdempotencyHelper.TABLE_NAME).insert({"key": key, "fingerprint": fingerprint, "verlooptOp": expires.isoformat()}).execute()
+            return NEW, None
+        except Exception as e:
+            if "duplicate key" not in str(e) and "unique constraint" not in str(e):
+                raise
+
+        deadline = time.monotonic() + IdempotencyHelper.WAIT_SECONDS
+        while True:
+            rows = supabase.table(IdempotencyHelper.TABLE_NAME).select("fingerprint, status, body, contentType").eq("key", key).execute().data
+            if not rows:
+                # The other instance aborted; claim it ourselves
+                return IdempotencyHelper._claim_shared(key, fingerprint)
+            row = rows[0]
+            if row["fingerprint"] != fingerprint:
+                return MISMATCH, None
+            if row["status"] is not None:
+                return REPLAY, {"status": row["status"], "body": row["body"], "content_type": row["contentType"]}
+            if time.monotonic() >= deadline:
+                return BUSY, None
+            time.sleep(IdempotencyHelper.POLL_SECONDS)
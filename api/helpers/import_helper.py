@@ -0,0 +1,281 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import date, time
+import csv
+import io
+import numpy as np
+from ..config import supabase
+from .drone_helper import DroneHelper
+import logging
+
+logger = logging.getLogger(__name__)
+
+TRUE_VALUES = ['true', '1', 't', 'y', 'yes']
+FALSE_VALUES = ['false', '0', 'f', 'n', 'no']
+
+
+class ImportHelper:
+    """Bulk CSV import for Evenement, Zone, Drone and Docking.
+
+    Every column is parsed and checked as a whole numpy array with the same rules
+    as the per-row create_* helpers. Zone rows reference their event by EvenementId
+    or by event name (Evenement column); both are resolved with one query per batch
+    of distinct values. Valid rows are inserted INSERT_CHUNK at a time.
+    """
+    INSERT_CHUNK = 500
+    LOOKUP_CHUNK = 500
+    MAX_ROWS = 100000
+    MAX_REPORTED_ERRORS = 1000
+
+    # column: (kind, required, default). Kinds: "str", "int", "float", "bool", "date", "time"
+    COLUMNS = {
+        "Evenement": {
+            "Naam": ("str", True, None),
+            "StartDatum": ("date", True, None),
+            "EindDatum": ("date", True, None),
+            "StartTijd": ("time", True, None),
+            "Tijdsduur": ("time", True, None),
+        },
+        "Zone": {
+            "naam": ("str", True, None),
+            "breedte": ("float", True, None),
+            "lengte": ("float", True, None),
+            "EvenementId": ("int", False, None),
+            "Evenement": ("str", False, None), # Event name, resolved to EvenementId
+        },
+        "Drone": {
+            "status": ("str", True, None),
+            "batterij": ("int", True, None),
+            "magOpstijgen": ("bool", False, False),
+        },
+        "Docking": {
+            "locatie": ("str", True, None),
+            "isbeschikbaar": ("bool", False, True),
+        },
+    }
+
+    @staticmethod
+    def _parse(values: np.ndarray, kind: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Convert a column of stripped strings. Returns (parsed, invalid mask); empty cells are never invalid here."""
+        empty = values == ""
+        invalid = np.zeros(len(values), dtype=bool)
+        if kind == "str":
+            return values, invalid
+        if kind == "bool":
+            lowered = np.char.lower(values)
+            truthy = np.isin(lowered, TRUE_VALUES)
+            return truthy, ~(truthy | np.isin(lowered, FALSE_VALUES) | empty)
+        if kind in ("int", "float"):
+            dtype = np.int64 if kind == "int" else np.float64
+            filled = np.where(empty, "0", values)
+            try:
+                parsed = filled.astype(dtype)
+            except (ValueError, OverflowError):
+                # Slow path only for columns that contain a malformed value, to find which
+                parsed = np.zeros(len(values), dtype=dtype)
+                for i, value in enumerate(filled):
+                    try:
+                        parsed[i] = dtype(value)
+                    except (ValueError, OverflowError):
+                        invalid[i] = True
+            if kind == "float":
+                invalid |= ~np.isfinite(parsed)
+            return parsed, invalid
+
+        # Dates and times: spreadsheets repeat them a lot, so parse each distinct value once
+        unique, inverse = np.unique(values, return_inverse=True)
+        parse = date.fromisoformat if kind == "date" else time.fromisoformat
+        parsed_unique = np.empty(len(unique), dtype=object)
+        invalid_unique = np.zeros(len(unique), dtype=bool)
+        for i, value in enumerate(unique):
+            if not value:
+                continue
+            try:
+                parsed_unique[i] = parse(value)
+            except ValueError:
+                invalid_unique[i] = True
+        parsed = parsed_unique[inverse]
+        if kind == "date":
+            parsed = parsed.astype("datetime64[D]") # None becomes NaT, so comparisons with it are False
+        return parsed, invalid_unique[inverse]
+
+    @staticmethod
+    def _read_csv(table: str, text: str) -> Tuple[List[str], List[List[str]]]:
+        rows = list(csv.reader(io.StringIO(text)))
+        while rows and not any(cell.strip() for cell in rows[-1]):
+            rows.pop()
+        if len(rows) < 2:
+            raise ValueError("CSV must contain a header row and at least one data row")
+        if len(rows) - 1 > ImportHelper.MAX_ROWS:
+            raise ValueError(f"CSV has {len(rows) - 1} rows, the maximum per import is {ImportHelper.MAX_ROWS}")
+
+        # Header names are matched case-insensitively against the table's columns
+        known = {name.lower(): name for name in ImportHelper.COLUMNS[table]}
+        header = []
+        for cell in rows[0]:
+            name = known.get(cell.strip().lower())
+            if name is None:
+                raise ValueError(f"Unknown column '{cell.strip()}' for {table}. Must be among: {', '.join(known.values())}")
+            if name in header:
+                raise ValueError(f"Duplicate column '{name}'")
+            header.append(name)
+        missing = [name for name, (_, required, _) in ImportHelper.COLUMNS[table].items()
+                   if required and name not in header]
+        if table == "Zone" and "EvenementId" not in header and "Evenement" not in header:
+            missing.append("EvenementId or Evenement")
+        if missing:
+            raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+        return header, rows[1:]
+
+    @staticmethod
+    def _resolve_events(ids: np.ndarray, names: np.ndarray, errors: List) -> np.ndarray:
+        """EvenementId per row from an id or event name column; -1 where it cannot be resolved."""
+        resolved = np.full(len(ids), -1, dtype=np.int64)
+        wanted_ids = np.unique(ids[ids > 0]).tolist()
+        wanted_names = np.unique(names[(ids <= 0) & (names != "")]).tolist()
+
+        existing = set()
+        for i in range(0, len(wanted_ids), ImportHelper.LOOKUP_CHUNK):
+            chunk = wanted_ids[i:i + ImportHelper.LOOKUP_CHUNK]
+            existing.update(e["Id"] for e in supabase.table("Evenement").select("Id").in_("Id", chunk).execute().data)
+        by_name: Dict[str, List[int]] = {}
+        for i in range(0, len(wanted_names), ImportHelper.LOOKUP_CHUNK):
+            chunk = wanted_names[i:i + ImportHelper.LOOKUP_CHUNK]
+            for e in supabase.table("Evenement").select("Id, Naam").in_("Naam", chunk).execute().data:
+                by_name.setdefault(e["Naam"], []).append(e["Id"])
+
+        for row in np.flatnonzero(ids > 0):
+            if int(ids[row]) in existing:
+                resolved[row] = ids[row]
+            else:
+                errors.append((row, "EvenementId", f"Invalid EvenementId: {ids[row]} does not exist."))
+        for row in np.flatnonzero((ids <= 0) & (names != "")):
+            matches = by_name.get(str(names[row]), [])
+            if len(matches) == 1:
+                resolved[row] = matches[0]
+            elif matches:
+                errors.append((row, "Evenement", f"Event name '{names[row]}' is ambiguous, use EvenementId"))
+            else:
+                errors.append((row, "Evenement", f"Event '{names[row]}' does not exist"))
+        return resolved
+
+    @staticmethod
+    def validate(table: str, text: str) -> Tuple[int, List[Dict], np.ndarray, List[Dict]]:
+        """Parse and check a CSV. Returns (row count, records for valid rows, their row indexes, errors).
+
+        Error rows are spreadsheet row numbers: the header is row 1, the first data row is row 2.
+        Raises ValueError when the file as a whole is unusable (unknown table, bad header).
+        """
+        if table not in ImportHelper.COLUMNS:
+            raise ValueError(f"Invalid table '{table}'. Must be one of: {', '.join(ImportHelper.COLUMNS)}")
+        header, rows = ImportHelper._read_csv(table, text)
+        count = len(rows)
+        errors: List[Tuple[int, Optional[str], str]] = []
+
+        widths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=count)
+        for row in np.flatnonzero(widths != len(header)):
+            errors.append((row, None, f"Expected {len(header)} fields, got {widths[row]}"))
+        padded = [r if len(r) == len(header) else (r + [""] * len(header))[:len(header)] for r in rows]
+
+        raw = {name: np.char.strip(np.array([r[i] for r in padded], dtype=str))
+               for i, name in enumerate(header)}
+        parsed: Dict[str, np.ndarray] = {}
+        empty: Dict[str, np.ndarray] = {}
+        bad: Dict[str, np.ndarray] = {}
+        for name, (kind, required, default) in ImportHelper.COLUMNS[table].items():
+            values = raw.get(name, np.full(count, "", dtype=str))
+            empty[name] = values == ""
+            parsed[name], bad[name] = ImportHelper._parse(values, kind)
+            for row in np.flatnonzero(bad[name]):
+                errors.append((row, name, f"Invalid {kind} value '{values[row]}'"))
+            if required:
+                for row in np.flatnonzero(empty[name]):
+                    errors.append((row, name, f"{name} cannot be empty"))
+            elif default is not None:
+                parsed[name] = np.where(empty[name], default, parsed[name])
+
+        # Same rules as the create_* helpers, applied to whole columns of well-formed values
+        present = {name: ~empty[name] & ~bad[name] for name in parsed}
+        checks = []
+        if table == "Evenement":
+            checks.append(("EindDatum", parsed["EindDatum"] < parsed["StartDatum"], "End date cannot be before start date"))
+        elif table == "Zone":
+            checks.append(("breedte", present["breedte"] & (parsed["breedte"] <= 0), "Zone width (breedte) must be positive"))
+            checks.append(("lengte", present["lengte"] & (parsed["lengte"] <= 0), "Zone length (lengte) must be positive"))
+        elif table == "Drone":
+            checks.append(("status", present["status"] & ~np.isin(parsed["status"], DroneHelper.VALID_STATUSES),
+                           f"Invalid status. Must be one of: {', '.join(DroneHelper.VALID_STATUSES)}"))
+            checks.append(("batterij", present["batterij"] & ((parsed["batterij"] < 0) | (parsed["batterij"] > 100)),
+                           "Battery level (batterij) must be between 0 and 100"))
+        for name, mask, message in checks:
+            errors.extend((row, name, message) for row in np.flatnonzero(mask))
+
+        if table == "Zone":
+            ids = np.where(empty["EvenementId"], 0, parsed["EvenementId"])
+            for row in np.flatnonzero(empty["EvenementId"] & empty["Evenement"]):
+                errors.append((row, "EvenementId", "EvenementId or Evenement is required"))
+            for row in np.flatnonzero(~empty["EvenementId"] & ~bad["EvenementId"] & (ids <= 0)):
+                errors.append((row, "EvenementId", f"Invalid EvenementId: {ids[row]} does not exist."))
+            parsed["EvenementId"] = ImportHelper._resolve_events(ids, parsed["Evenement"], errors)
+
+        valid = np.ones(count, dtype=bool)
+        if errors:
+            valid[[row for row, _, _ in errors]] = False
+        keep = np.flatnonzero(valid)
+        records = ImportHelper._records(table, parsed, keep)
+        report = [{"row": int(row) + 2, "column": column, "error": message}
+                  for row, column, message in sorted(errors, key=lambda e: e[0])]
+        return count, records, keep, report
+
+    @staticmethod
+    def _records(table: str, parsed: Dict[str, np.ndarray], keep: np.ndarray) -> List[Dict]:
+        columns = {}
+        for name, (kind, _, _) in ImportHelper.COLUMNS[table].items():
+            if table == "Zone" and name == "Evenement":
+                continue
+            values = parsed[name][keep]
+            if kind == "date":
+                columns[name] = np.datetime_as_string(values, unit="D").tolist()
+            elif kind == "time":
+                columns[name] = [v.isoformat() for v in values]
+            else:
+                columns[name] = values.tolist() # numpy scalars to plain Python for the JSON body
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*(columns[n] for n in names))]
+
+    @staticmethod
+    def import_csv(table: str, text: str, skip_invalid: bool = False, dry_run: bool = False) -> Dict:
+        """Validate and insert a CSV. Nothing is inserted when any row is invalid, unless skip_invalid."""
+        count, records, keep, errors = ImportHelper.validate(table, text)
+        report = {
+            "table": table,
+            "rows": count,
+            "valid": len(records),
+            "inserted": 0,
+            "ids": [],
+            "error_count": len(errors),
+            "errors": errors[:ImportHelper.MAX_REPORTED_ERRORS],
+            "dry_run": dry_run,
+        }
+        if dry_run or (errors and not skip_invalid):
+            return report
+
+        for start in range(0, len(records), ImportHelper.INSERT_CHUNK):
+            chunk = records[start:start + ImportHelper.INSERT_CHUNK]
+            try:
+                inserted = supabase.table(table).insert(chunk).execute().data
+            except Exception as e:
+                # A chunk is one INSERT statement, so it fails as a whole; earlier chunks stay
+                logger.error(f"Bulk import into {table} failed after {report['inserted']} rows: {e}")
+                failed = [{"row": int(row) + 2, "column": None, "error": str(e)}
+                          for row in keep[start:start + len(chunk)]]
+                report["errors"] = (report["errors"] + failed)[:ImportHelper.MAX_REPORTED_ERRORS]
+                report["error_count"] += len(failed)
+                report["failed"] = True
+                return report
+            report["inserted"] += len(inserted)
+            report["ids"].extend(row["Id"] for row in inserted)
+            if table == "Drone":
+                for drone in inserted:
+                    DroneHelper.publish("created", drone)
+        logger.info(f"Imported {report['inserted']} rows into {table} ({report['error_count']} rejected)")
+        return report
@@ -0,0 +1,60 @@
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+import threading
+import time
+from ..config import supabase
+from .change_helper import ChangeHelper
+import logging
+
+logger = logging.getLogger(__name__)
+
+class KpiHelper:
+    """Event-scoped dashboard KPIs, computed by the event_kpis RPC (see db.sql) in one query.
+
+    The RPC also reads the archive tables (migration 0013), so an archived
+    event keeps its KPIs.
+
+    Results are cached per event together with the change journal seq of the
+    tables they are built from, and recomputed once any of them changed. The
+    completed cycle count also moves with the clock, so an entry is recomputed
+    after CACHE_SECONDS even on a quiet database.
+    """
+    SOURCE_TABLES = ["Evenement", "Zone", "VluchtCyclus", "Cyclus", "Verslag"]
+    MAX_CACHED_EVENTS = 256
+    CACHE_SECONDS = 60.0
+
+    _cache: "OrderedDict[int, Tuple[int, float, Dict]]" = OrderedDict()
+    _lock = threading.Lock()
+    hits = 0
+    misses = 0
+
+    @staticmethod
+    def get_event_kpis(event_id: int) -> Optional[Dict]:
+        """KPIs of one event, None if the event does not exist."""
+        version = ChangeHelper.latest_seq(KpiHelper.SOURCE_TABLES)
+        now = time.monotonic()
+        with KpiHelper._lock:
+            cached = KpiHelper._cache.get(event_id)
+            if cached and cached[0] == version and now - cached[1] < KpiHelper.CACHE_SECONDS:
+                KpiHelper._cache.move_to_end(event_id)
+                KpiHelper.hits += 1
+                return cached[2]
+            KpiHelper.misses += 1
+
+        try:
+            response = supabase.rpc("event_kpis", {"evenement": event_id}).execute()
+        except Exception as e:
+            logger.error(f"Error computing KPIs for event {event_id}: {e}")
+            raise
+        if not response.data:
+            return None
+        kpis = {"EvenementId": event_id, **response.data[0], "version": version}
+        planned = kpis["planned_cycles"]
+        kpis["completion_percent"] = round(100 * kpis["completed_cycles"] / planned, 1) if planned else 0.0
+
+        with KpiHelper._lock:
+            KpiHelper._cache[event_id] = (version, now, kpis)
+            KpiHelper._cache.move_to_end(event_id)
+            while len(KpiHelper._cache) > KpiHelper.MAX_CACHED_EVENTS:
+                KpiHelper._cache.popitem(last=False)
+        return kpis
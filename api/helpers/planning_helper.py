@@ -0,0 +1,114 @@
+from typing import Dict, List
+from ..config import supabase
+from .drone_helper import DroneHelper
+from .startplaats_helper import StartplaatsHelper
+from .vluchtcyclus_helper import VluchtCyclusHelper
+from .zone_helper import ZoneHelper
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PlanningHelper:
+    """Computes drone -> zone/startplaats assignments for an event in one pass."""
+
+    @staticmethod
+    def _zone_quotas(zones: List[Dict], drone_count: int) -> List[int]:
+        """Split drone_count over zones proportional to area (largest remainder method).
+        Evenly when the zones have no area at all."""
+        areas = [max(float(z["breedte"]) * float(z["lengte"]), 0.0) for z in zones]
+        total_area = sum(areas)
+        if total_area <= 0:
+            areas, total_area = [1.0] * len(zones), float(len(zones))
+        exact = [drone_count * a / total_area for a in areas]
+        quotas = [int(q) for q in exact]
+        leftover = drone_count - sum(quotas)
+        by_remainder = sorted(range(len(zones)), key=lambda i: exact[i] - quotas[i], reverse=True)
+        for i in by_remainder[:leftover]:
+            quotas[i] += 1
+        return quotas
+
+    @staticmethod
+    def compute_assignment(zones: List[Dict], drones: List[Dict], startplaatsen: List[Dict]) -> List[Dict]:
+        """Assign drones to zones and startplaatsen.
+
+        The score of a pairing is batterij x zone area. With zones sorted by area and
+        drones sorted by battery (both descending), handing out drones in that order
+        against the area-proportional quotas maximises the total score (rearrangement
+        inequality), so no general matching solver is needed: the cost is O(n log n).
+        Every assigned drone gets its own startplaats, so at most len(startplaatsen)
+        drones are planned; the highest-battery drones win.
+        """
+        if not zones or not drones or not startplaatsen:
+            return []
+
+        zones = sorted(zones, key=lambda z: float(z["breedte"]) * float(z["lengte"]), reverse=True)
+        drones = sorted(drones, key=lambda d: (-int(d["batterij"]), d["Id"]))
+        startplaatsen = sorted(startplaatsen, key=lambda s: s["Id"])
+
+        planned_count = min(len(drones), len(startplaatsen))
+        quotas = PlanningHelper._zone_quotas(zones, planned_count)
+
+        assignment = []
+        drone_index = 0
+        for zone, quota in zip(zones, quotas):
+            for _ in range(quota):
+                assignment.append({
+                    "DroneId": drones[drone_index]["Id"],
+                    "ZoneId": zone["Id"],
+                    "PlaatsId": startplaatsen[drone_index]["Id"],
+                })
+                drone_index += 1
+        return assignment
+
+    @staticmethod
+    def is_planned(zones: List[Dict]) -> bool:
+        """True when any of the event's zones already has flight cycles."""
+        try:
+            response = (supabase.table(VluchtCyclusHelper.TABLE_NAME).select("Id")
+                        .in_("ZoneId", [z["Id"] for z in zones]).limit(1).execute())
+            return bool(response.data)
+        except Exception as e:
+            logger.error(f"Error checking existing flight cycles for zones {[z['Id'] for z in zones]}: {e}")
+            raise
+
+    @staticmethod
+    def plan_event(event_id: int, dry_run: bool = False) -> List[Dict]:
+        """Plan flight-ready drones over an event's zones. The VluchtCyclus rows are written together
+        with taking the drones (IN_USE) and startplaatsen in one transaction (apply_event_plan RPC).
+
+        Raises ValueError when the event has no zones, was planned before ("already planned")
+        or lost a drone or startplaats to a concurrent write ("taken while planning").
+        """
+        zones = ZoneHelper.get_zones_by_event(event_id)
+        if not zones:
+            raise ValueError(f"Event {event_id} has no zones to plan.")
+        if PlanningHelper.is_planned(zones):
+            raise ValueError(f"Event {event_id} is already planned.")
+
+        drones = DroneHelper.get_flight_ready_drones()
+        assignment = PlanningHelper.compute_assignment(
+            zones,
+            drones,
+            StartplaatsHelper.get_available_startplaatsen(),
+        )
+        if dry_run or not assignment:
+            return assignment
+
+        try:
+            response = supabase.rpc("apply_event_plan", {"evenement": event_id, "toewijzingen": assignment}).execute()
+        except Exception as e:
+            if "is already planned" in str(e):
+                raise ValueError(f"Event {event_id} is already planned.")
+            if "no longer available" in str(e):
+                logger.warning(f"Plan event {event_id} lost a drone or startplaats to a concurrent write")
+                raise ValueError("A drone or startplaats was taken while planning, retry the plan.")
+            if "violates foreign key constraint" in str(e):
+                logger.warning(f"Plan event {event_id} failed due to a reference removed during planning")
+                raise ValueError("One or more reference IDs no longer exist, retry the plan.")
+            logger.error(f"Error applying plan for event {event_id}: {e}")
+            raise
+
+        drones_by_id = {d["Id"]: d for d in drones}
+        for row in response.data or []:
+            DroneHelper.publish("updated", {**drones_by_id[row["DroneId"]], "status": "IN_USE"})
+        return response.data or []
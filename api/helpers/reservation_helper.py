@@ -0,0 +1,88 @@
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
+from ..config import supabase
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ReservationHelper:
+    """Atomic, expiring claims on Startplaats and Docking rows.
+
+    The claim itself runs in the reserve_resources RPC (see db.sql) with
+    FOR UPDATE SKIP LOCKED, so concurrent reservers never get the same row and
+    never queue behind each other.
+
+    An expired reservation is not swept: the row keeps isbeschikbaar = FALSE
+    until the next claim. Readers treat it as free through free_filter/is_free,
+    the same condition the RPCs claim on.
+    """
+    RESERVABLE_TABLES = ["Startplaats", "Docking"]
+    DEFAULT_TTL_SECONDS = 300
+    MAX_TTL_SECONDS = 24 * 60 * 60
+    MAX_AANTAL = 100
+
+    @staticmethod
+    def free_filter() -> str:
+        """PostgREST or-filter for free rows: available, or reserved past gereserveerdTot."""
+        now = datetime.now(timezone.utc).isoformat()
+        return f'isbeschikbaar.eq.true,gereserveerdTot.lt."{now}"'
+
+    @staticmethod
+    def taken_filter() -> str:
+        """PostgREST or-filter for the gereserveerdTot half of taken rows; combine with isbeschikbaar = FALSE."""
+        now = datetime.now(timezone.utc).isoformat()
+        return f'gereserveerdTot.is.null,gereserveerdTot.gte."{now}"'
+
+    @staticmethod
+    def is_free(row: Dict, now: Optional[datetime] = None) -> bool:
+        """free_filter for a row that is already loaded (needs isbeschikbaar and gereserveerdTot)."""
+        if row["isbeschikbaar"]:
+            return True
+        until = row.get("gereserveerdTot")
+        if not until:
+            return False
+        return datetime.fromisoformat(until) < (now or datetime.now(timezone.utc))
+
+    @staticmethod
+    def _check_table(table: str) -> None:
+        if table not in ReservationHelper.RESERVABLE_TABLES:
+            raise ValueError(f"Invalid table '{table}'. Must be one of: {', '.join(ReservationHelper.RESERVABLE_TABLES)}")
+
+    @staticmethod
+    def reserve(table: str, aantal: int = 1, ttl_seconds: int = DEFAULT_TTL_SECONDS) -> List[Dict]:
+        """Claim aantal free rows for ttl_seconds. All rows share one reserveringToken.
+
+        Raises ValueError when fewer than aantal rows are free (nothing is claimed then).
+        """
+        ReservationHelper._check_table(table)
+        if not (1 <= aantal <= ReservationHelper.MAX_AANTAL):
+            raise ValueError(f"aantal must be between 1 and {ReservationHelper.MAX_AANTAL}")
+        if not (1 <= ttl_seconds <= ReservationHelper.MAX_TTL_SECONDS):
+            raise ValueError(f"ttl_seconds must be between 1 and {ReservationHelper.MAX_TTL_SECONDS}")
+
+        try:
+            response = supabase.rpc("reserve_resources", {
+                "tabel": table, "aantal": aantal, "ttl_seconds": ttl_seconds
+            }).execute()
+            return response.data or []
+        except Exception as e:
+            if "Not enough free" in str(e):
+                logger.info(f"Reservation of {aantal} {table} rows refused: not enough free")
+                raise ValueError(f"Not enough free {table} rows to reserve {aantal}.")
+            logger.error(f"Error reserving {aantal} {table} rows: {e}")
+            raise
+
+    @staticmethod
+    def end(table: str, token: str, confirm: bool = False) -> int:
+        """Release (or confirm) the rows held by a reservation token. Returns the number of rows affected."""
+        ReservationHelper._check_table(table)
+        try:
+            response = supabase.rpc("end_reservation", {
+                "tabel": table, "token": token, "bevestigen": confirm
+            }).execute()
+            return int(response.data or 0)
+        except Exception as e:
+            if "invalid input syntax for type uuid" in str(e):
+                raise ValueError("Invalid reservation token.")
+            logger.error(f"Error ending reservation {token} on {table} (confirm={confirm}): {e}")
+            raise
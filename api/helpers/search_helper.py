@@ -0,0 +1,259 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import base64
+import collections
+import html
+import json
+import math
+import re
+import threading
+import unicodedata
+from ..config import supabase
+import logging
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset(
+    "de het een en van in op te dat die is met voor aan er niet zijn om als bij ook tot maar dan of uit door "
+    "naar over nog wel was wordt werd ze hij zij we wij je u ik".split()
+)
+
+
+def normalize(word: str) -> str:
+    """Lowercase and strip accents, so "beschadigd" also finds "Beschädigd"."""
+    decomposed = unicodedata.normalize("NFKD", word.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+# search_verslagen delimits ts_headline hits with these (migration 0009), so the snippet can be escaped here
+HIT_START, HIT_STOP = "\ue000", "\ue001"
+
+
+def highlight(snippet: str) -> str:
+    """HTML-escape a ts_headline snippet and mark its hits the way InvertedIndex.snippet does."""
+    return html.escape(snippet or "").replace(HIT_START, "<mark>").replace(HIT_STOP, "</mark>")
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = (normalize(t) for t in TOKEN_PATTERN.findall(text or ""))
+    return [t for t in tokens if t not in STOPWORDS]
+
+
+class InvertedIndex:
+    """In-process BM25 index over Verslag onderwerp and inhoud, updated per document.
+
+    postings maps a term to {Id: (hits in onderwerp, hits in inhoud)}. A query
+    matches documents that contain every term (like websearch_to_tsquery).
+    Chunked bodies are indexed from the term counts of the whole body
+    (inhoud_terms); their inhoud is only the preview used for snippets.
+    """
+    K1 = 1.2
+    B = 0.75
+    ONDERWERP_WEIGHT = 2.0
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.postings: Dict[str, Dict[int, Tuple[int, int]]] = {}
+        self.lengths: Dict[int, float] = {}
+        self.docs: Dict[int, Dict] = {}
+        self.terms: Dict[int, Iterable[str]] = {}
+        # Id -> (inhoudVersie, term counts) of chunked bodies, reused when only other columns change
+        self.body_terms: Dict[int, Tuple[int, Dict[str, int]]] = {}
+        self._total_length = 0.0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, doc: Dict, inhoud_terms: Optional[Dict[str, int]] = None) -> None:
+        with self._lock:
+            versie = doc.get("inhoudVersie")
+            previous = self.body_terms.get(doc["Id"])
+            if inhoud_terms is None and versie is not None and previous and previous[0] == versie:
+                inhoud_terms = previous[1]
+            self.remove(doc["Id"])
+            onderwerp = tokenize(doc.get("onderwerp"))
+            if inhoud_terms is None:
+                inhoud_terms = collections.Counter(tokenize(doc.get("inhoud")))
+            elif versie is not None:
+                self.body_terms[doc["Id"]] = (versie, inhoud_terms)
+            counts: Dict[str, List[int]] = {term: [0, hits] for term, hits in inhoud_terms.items()}
+            for term in onderwerp:
+                counts.setdefault(term, [0, 0])[0] += 1
+            for term, (in_onderwerp, in_inhoud) in counts.items():
+                self.postings.setdefault(term, {})[doc["Id"]] = (in_onderwerp, in_inhoud)
+            self.terms[doc["Id"]] = tuple(counts)
+            length = self.ONDERWERP_WEIGHT * len(onderwerp) + sum(inhoud_terms.values())
+            self.lengths[doc["Id"]] = length
+            self._total_length += length
+            self.docs[doc["Id"]] = {k: doc.get(k) for k in ("Id", "onderwerp", "inhoud", "isverzonden", "isgeaccepteerd")}
+
+    def remove(self, doc_id: int) -> None:
+        with self._lock:
+            doc = self.docs.pop(doc_id, None)
+            if doc is None:
+                return
+            self.body_terms.pop(doc_id, None)
+            for term in self.terms.pop(doc_id):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self.postings[term]
+            self._total_length -= self.lengths.pop(doc_id)
+
+    def search(self, query: str) -> List[Tuple[float, int]]:
+        """(score, Id) of every matching document, best first, ties by Id."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            lists = [self.postings.get(term, {}) for term in terms]
+            if not all(lists):
+                return []
+            # Intersect starting from the rarest term
+            lists.sort(key=len)
+            candidates = set(lists[0]).intersection(*lists[1:])
+            doc_count = len(self.docs)
+            average = self._total_length / doc_count if doc_count else 1.0
+            scores = []
+            for doc_id in candidates:
+                norm = self.K1 * (1 - self.B + self.B * self.lengths[doc_id] / average)
+                score = 0.0
+                for postings in lists:
+                    in_onderwerp, in_inhoud = postings[doc_id]
+                    tf = self.ONDERWERP_WEIGHT * in_onderwerp + in_inhoud
+                    idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    score += idf * tf * (self.K1 + 1) / (tf + norm)
+                scores.append((round(score, 6), doc_id))
+        scores.sort(key=lambda s: (-s[0], s[1]))
+        return scores
+
+    def snippet(self, doc_id: int, query: str, width: int = 160) -> str:
+        """Window of inhoud around the first hit with matched words wrapped in <mark>."""
+        terms = set(tokenize(query))
+        text = self.docs[doc_id]["inhoud"] or ""
+        matches = [m for m in TOKEN_PATTERN.finditer(text) if normalize(m.group()) in terms]
+        start = max(0, matches[0].start() - width // 3) if matches else 0
+        end = min(len(text), start + width)
+        parts, position = [], start
+        for m in matches:
+            if m.start() < start or m.end() > end:
+                continue
+            parts.append(html.escape(text[position:m.start()]))
+            parts.append(f"<mark>{html.escape(m.group())}</mark>")
+            position = m.end()
+        parts.append(html.escape(text[position:end]))
+        return ("..." if start else "") + "".join(parts) + ("..." if end < len(text) else "")
+
+
+class SearchHelper:
+    """Ranked full-text search over Verslag.
+
+    BACKEND "database" uses the search_verslagen RPC (GIN-indexed tsvector, see
+    db.sql). BACKEND "memory" serves from an in-process InvertedIndex, built on
+    first use and kept current by VerslagHelper's create/update/delete.
+    """
+    BACKEND = "database"
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 100
+    PAGE_SIZE = 1000
+    INDEX_COLUMNS = ("Id, onderwerp, inhoud, isverzonden, isgeaccepteerd, "
+                     "inhoudVersie, inhoudBlokken, inhoudBlokGrootte, inhoudLengte")
+
+    index: Optional[InvertedIndex] = None
+    _build_lock = threading.Lock()
+
+    @staticmethod
+    def encode_cursor(rank: float, row_id: int) -> str:
+        raw = json.dumps([rank, row_id], separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[float, int]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            rank, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return float(rank), int(row_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+    @staticmethod
+    def _ensure_index() -> InvertedIndex:
+        if SearchHelper.index is not None:
+            return SearchHelper.index
+        from .verslag_content_helper import VerslagContentHelper # imports this module
+        with SearchHelper._build_lock:
+            if SearchHelper.index is None:
+                index = InvertedIndex()
+                offset = 0
+                while True:
+                    rows = (supabase.table("Verslag").select(SearchHelper.INDEX_COLUMNS)
+                            .order("Id").range(offset, offset + SearchHelper.PAGE_SIZE - 1).execute()).data
+                    for row in rows:
+                        # A chunked body's inhoud is only its preview
+                        terms = VerslagContentHelper.count_terms(row) if row["inhoudVersie"] is not None else None
+                        index.add(row, inhoud_terms=terms)
+                    if len(rows) < SearchHelper.PAGE_SIZE:
+                        break
+                    offset += SearchHelper.PAGE_SIZE
+                logger.info(f"Built Verslag search index with {len(index)} documents")
+                SearchHelper.index = index
+        return SearchHelper.index
+
+    @staticmethod
+    def index_verslag(verslag: Dict, inhoud_terms: Optional[Dict[str, int]] = None) -> None:
+        """Called after a Verslag write; a no-op until the in-process index has been built.
+        inhoud_terms are the term counts of a chunked body, which verslag itself only previews."""
+        if SearchHelper.index is not None:
+            SearchHelper.index.add(verslag, inhoud_terms)
+
+    @staticmethod
+    def remove_verslag(verslag_id: int) -> None:
+        if SearchHelper.index is not None:
+            SearchHelper.index.remove(verslag_id)
+
+    @staticmethod
+    def _search_memory(query: str, limit: int, after: Optional[Tuple[float, int]]) -> List[Dict]:
+        index = SearchHelper._ensure_index()
+        results = []
+        for score, doc_id in index.search(query):
+            if after and (score > after[0] or (score == after[0] and doc_id <= after[1])):
+                continue
+            doc = index.docs[doc_id]
+            results.append({"Id": doc_id, "onderwerp": doc["onderwerp"], "isverzonden": doc["isverzonden"],
+                            "isgeaccepteerd": doc["isgeaccepteerd"], "rank": score,
+                            "snippet": index.snippet(doc_id, query)})
+            if len(results) == limit:
+                break
+        return results
+
+    @staticmethod
+    def _search_database(query: str, limit: int, after: Optional[Tuple[float, int]]) -> List[Dict]:
+        params = {"zoekterm": query, "aantal": limit}
+        if after:
+            params.update({"na_rank": after[0], "na_id": after[1]})
+        rows = supabase.rpc("search_verslagen", params).execute().data or []
+        return [{**row, "snippet": highlight(row.get("snippet"))} for row in rows]
+
+    @staticmethod
+    def search(query: str, limit: int = DEFAULT_LIMIT, cursor: Optional[str] = None) -> Dict:
+        """One page of ranked results plus the cursor for the next page (None on the last)."""
+        if not query or not query.strip():
+            raise ValueError("Search query (q) cannot be empty")
+        if not (1 <= limit <= SearchHelper.MAX_LIMIT):
+            raise ValueError(f"limit must be between 1 and {SearchHelper.MAX_LIMIT}")
+        after = SearchHelper.decode_cursor(cursor) if cursor else None
+
+        try:
+            if SearchHelper.BACKEND == "memory":
+                # Fetch one extra to know whether another page exists
+                rows = SearchHelper._search_memory(query, limit + 1, after)
+            else:
+                rows = SearchHelper._search_database(query, limit + 1, after)
+        except Exception as e:
+            logger.error(f"Error searching verslagen for '{query}': {e}")
+            raise
+
+        page = rows[:limit]
+        next_cursor = SearchHelper.encode_cursor(page[-1]["rank"], page[-1]["Id"]) if len(rows) > limit else None
+        return {"results": page, "next_cursor": next_cursor}
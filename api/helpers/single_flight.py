@@ -0,0 +1,93 @@
+from typing import Any, Callable, Dict, Hashable
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls into one.
+
+    The first caller for a key (the leader) runs the function; callers arriving
+    while it runs wait and get the same result or exception. With cache_seconds
+    the result is also served for that long after the call finished. Counters per
+    metrics label feed the /api/metrics endpoint.
+    """
+    MAX_CACHED = 1024
+
+    def __init__(self, cache_seconds: float = 0.0):
+        self.cache_seconds = cache_seconds
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._cache: Dict[Hashable, tuple] = {} # key -> (expires, result)
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, label: str, field: str) -> None:
+        stats = self._stats.get(label)
+        if stats is None:
+            stats = self._stats[label] = {"executed": 0, "coalesced": 0, "cached": 0}
+        stats[field] += 1
+
+    def do(self, key: Hashable, fn: Callable[[], Any], label: str = "", cacheable: Callable[[Any], bool] = None) -> Any:
+        with self._lock:
+            if self.cache_seconds:
+                cached = self._cache.get(key)
+                if cached is not None and cached[0] > time.monotonic():
+                    self._count(label, "cached")
+                    return cached[1]
+            call = self._calls.get(key)
+            if call is not None:
+                self._count(label, "coalesced")
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._count(label, "executed")
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if self.cache_seconds and call.error is None and (cacheable is None or cacheable(call.result)):
+                    if len(self._cache) >= SingleFlight.MAX_CACHED:
+                        self._prune()
+                    self._cache[key] = (time.monotonic() + self.cache_seconds, call.result)
+            call.done.set()
+        return call.result
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self._cache.items() if expires <= now]:
+            del self._cache[key]
+        if len(self._cache) >= SingleFlight.MAX_CACHED:
+            self._cache.clear()
+
+    def metrics(self) -> Dict[str, Dict]:
+        """Per-label counters plus the coalesce ratio (requests served without their own backend call)."""
+        with self._lock:
+            report = {}
+            for label, stats in self._stats.items():
+                total = stats["executed"] + stats["coalesced"] + stats["cached"]
+                report[label] = {**stats, "requests": total,
+                                 "coalesce_ratio": round((total - stats["executed"]) / total, 3) if total else 0.0}
+            return report
@@ -0,0 +1,237 @@
+from typing import Dict, Iterator, List, Optional
+from datetime import date, datetime, time, timezone
+import base64
+import json
+import os
+from ..config import supabase
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotHelper:
+    """Full database dump to Arrow IPC files, and restore from them.
+
+    A snapshot is a directory with one <table>.arrow file per table plus
+    manifest.json, which is written last. Dates, times and timestamps are stored
+    as native Arrow types and VerslagBlok data as raw bytes. Files are
+    uncompressed by default so read_table() can memory-map them without copying;
+    zstd makes them smaller but has to be decompressed into memory on read.
+
+    The dump reads table by table, not in one transaction, so take it from a
+    quiet database (or use pg_dump) when point-in-time consistency matters.
+    Requires pyarrow.
+    """
+    FORMAT_VERSION = 1
+    PAGE_SIZE = 1000
+    MANIFEST = "manifest.json"
+
+    # Restore order: every table comes after the tables its foreign keys point to.
+    # Kinds: "int", "float", "str", "bool", "date", "time", "timestamp", "base64"
+    TABLES = {
+        "Evenement": {"Id": "int", "StartDatum": "date", "EindDatum": "date", "StartTijd": "time",
+                      "Tijdsduur": "time", "Naam": "str"},
+        "Zone": {"Id": "int", "breedte": "float", "lengte": "float", "naam": "str", "EvenementId": "int"},
+        "Startplaats": {"Id": "int", "locatie": "str", "isbeschikbaar": "bool", "gereserveerdTot": "timestamp",
+                        "reserveringToken": "str"},
+        "Docking": {"Id": "int", "locatie": "str", "isbeschikbaar": "bool", "gereserveerdTot": "timestamp",
+                    "reserveringToken": "str"},
+        "Drone": {"Id": "int", "status": "str", "batterij": "int", "magOpstijgen": "bool"},
+        "Verslag": {"Id": "int", "onderwerp": "str", "inhoud": "str", "isverzonden": "bool", "isgeaccepteerd": "bool",
+                    "VluchtCyclusId": "int", "inhoudVersie": "int", "inhoudBlokken": "int",
+                    "inhoudBlokGrootte": "int", "inhoudLengte": "int", "inhoudDigest": "str"},
+        "VluchtCyclus": {"Id": "int", "VerslagId": "int", "PlaatsId": "int", "DroneId": "int", "ZoneId": "int"},
+        "Cyclus": {"Id": "int", "startuur": "time", "tijdstip": "time", "VluchtCyclusId": "int"},
+        "DockingCyclus": {"Id": "int", "DroneId": "int", "DockingId": "int", "CyclusId": "int"},
+        "VerslagBlok": {"VerslagId": "int", "versie": "int", "volgnummer": "int", "data": "base64",
+                        "gecomprimeerd": "bool", "zoekvector": "str"},
+        # Full-text vectors of chunked bodies (migration 0010), in tsvector text form
+        "VerslagZoekvector": {"VerslagId": "int", "zoekvector": "str"},
+        # Cycles of archived events (migration 0002), with their original Ids; no foreign keys
+        "EvenementArchief": {"EvenementId": "int", "gearchiveerdOp": "timestamp", "vluchtCycli": "int",
+                             "cycli": "int", "dockingCycli": "int"},
+        "VluchtCyclusArchief": {"Id": "int", "VerslagId": "int", "PlaatsId": "int", "DroneId": "int",
+                                "ZoneId": "int", "EvenementId": "int", "gearchiveerdOp": "timestamp"},
+        "CyclusArchief": {"Id": "int", "startuur": "time", "tijdstip": "time", "VluchtCyclusId": "int",
+                          "EvenementId": "int", "gearchiveerdOp": "timestamp"},
+        "DockingCyclusArchief": {"Id": "int", "DroneId": "int", "DockingId": "int", "CyclusId": "int",
+                                 "EvenementId": "int", "gearchiveerdOp": "timestamp"},
+    }
+    KEYS = {"VerslagBlok": ["VerslagId", "versie", "volgnummer"], "VerslagZoekvector": ["VerslagId"],
+            "EvenementArchief": ["EvenementId"]}
+    # Verslag and VluchtCyclus reference each other; this side is filled in after both are restored
+    DEFERRED = {"Verslag": "VluchtCyclusId"}
+
+    @staticmethod
+    def _arrow_type(kind: str):
+        import pyarrow as pa
+        return {"int": pa.int64(), "float": pa.float64(), "str": pa.string(), "bool": pa.bool_(),
+                "date": pa.date32(), "time": pa.time64("us"), "timestamp": pa.timestamp("us", tz="UTC"),
+                "base64": pa.binary()}[kind]
+
+    @staticmethod
+    def schema(table: str):
+        import pyarrow as pa
+        return pa.schema([(name, SnapshotHelper._arrow_type(kind))
+                          for name, kind in SnapshotHelper.TABLES[table].items()])
+
+    @staticmethod
+    def _decode(kind: str, value):
+        """JSON value from the API to the Python value Arrow stores."""
+        if value is None:
+            return None
+        if kind == "date":
+            return date.fromisoformat(value)
+        if kind == "time":
+            return time.fromisoformat(value)
+        if kind == "timestamp":
+            return datetime.fromisoformat(value).astimezone(timezone.utc)
+        if kind == "base64":
+            return base64.b64decode(value)
+        return value
+
+    @staticmethod
+    def _encode(kind: str, value):
+        """Value read from Arrow back to what the API accepts."""
+        if value is None:
+            return None
+        if kind in ("date", "time", "timestamp"):
+            return value.isoformat()
+        if kind == "base64":
+            return base64.b64encode(value).decode()
+        return value
+
+    @staticmethod
+    def _iter_pages(table: str) -> Iterator[List[Dict]]:
+        columns = SnapshotHelper.TABLES[table]
+        keys = SnapshotHelper.KEYS.get(table)
+        last_id = None
+        offset = 0
+        while True:
+            query = supabase.table(table).select(", ".join(columns))
+            if keys:
+                # Composite key: offset paging in key order
+                for key in keys:
+                    query = query.order(key)
+                query = query.range(offset, offset + SnapshotHelper.PAGE_SIZE - 1)
+            else:
+                if last_id is not None:
+                    query = query.gt("Id", last_id)
+                query = query.order("Id").limit(SnapshotHelper.PAGE_SIZE)
+            rows = query.execute().data
+            if rows:
+                yield rows
+            if len(rows) < SnapshotHelper.PAGE_SIZE:
+                return
+            last_id = rows[-1].get("Id")
+            offset += len(rows)
+
+    @staticmethod
+    def dump(directory: str, tables: Optional[List[str]] = None, compression: Optional[str] = None) -> Dict:
+        """Write the tables (default: all) to directory. Returns the manifest."""
+        import pyarrow as pa
+
+        tables = SnapshotHelper._check_tables(tables)
+        os.makedirs(directory, exist_ok=True)
+        manifest = {"format": SnapshotHelper.FORMAT_VERSION, "compression": compression,
+                    "created": datetime.now(timezone.utc).isoformat(), "tables": {}}
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        for table in tables:
+            columns = SnapshotHelper.TABLES[table]
+            schema = SnapshotHelper.schema(table)
+            path = os.path.join(directory, f"{table}.arrow")
+            count = 0
+            try:
+                with pa.OSFile(path + ".tmp", "wb") as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+                    for rows in SnapshotHelper._iter_pages(table):
+                        arrays = [pa.array([SnapshotHelper._decode(kind, row.get(name)) for row in rows],
+                                           type=schema.field(name).type)
+                                  for name, kind in columns.items()]
+                        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                        count += len(rows)
+            except Exception as e:
+                logger.error(f"Error dumping {table} after {count} rows: {e}")
+                raise
+            os.replace(path + ".tmp", path)
+            manifest["tables"][table] = {"file": f"{table}.arrow", "rows": count}
+            logger.info(f"Dumped {count} {table} rows")
+
+        with open(os.path.join(directory, SnapshotHelper.MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+    @staticmethod
+    def read_manifest(directory: str) -> Dict:
+        path = os.path.join(directory, SnapshotHelper.MANIFEST)
+        if not os.path.exists(path):
+            raise ValueError(f"{directory} is not a complete snapshot (no {SnapshotHelper.MANIFEST})")
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get("format") != SnapshotHelper.FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format {manifest.get('format')}")
+        return manifest
+
+    @staticmethod
+    def read_table(directory: str, table: str):
+        """A snapshot table as a pyarrow Table backed by a memory map: only the pages actually
+        touched are read from disk (zero-copy unless the snapshot was compressed)."""
+        import pyarrow as pa
+        entry = SnapshotHelper.read_manifest(directory)["tables"].get(table)
+        if entry is None:
+            raise ValueError(f"Table {table} is not in the snapshot")
+        return pa.ipc.open_file(pa.memory_map(os.path.join(directory, entry["file"]))).read_all()
+
+    @staticmethod
+    def _check_tables(tables: Optional[List[str]]) -> List[str]:
+        unknown = [t for t in tables or [] if t not in SnapshotHelper.TABLES]
+        if unknown:
+            raise ValueError(f"Unknown table(s) {', '.join(unknown)}. Must be among: {', '.join(SnapshotHelper.TABLES)}")
+        # Always in restore order, whatever order they were given in
+        return [t for t in SnapshotHelper.TABLES if not tables or t in tables]
+
+    @staticmethod
+    def restore(directory: str, tables: Optional[List[str]] = None) -> Dict[str, int]:
+        """Insert a snapshot into an empty database with the original Ids. Returns rows per table.
+
+        Tables are loaded in foreign-key order, one bulk insert per record batch.
+        Afterwards the deferred Verslag -> VluchtCyclus links are set and the Id
+        sequences moved past the restored rows, archived ones included (restore_* RPCs
+        in db.sql, restore_sequences as of migration 0013).
+        """
+        import pyarrow as pa
+
+        manifest = SnapshotHelper.read_manifest(directory)
+        tables = [t for t in SnapshotHelper._check_tables(tables) if t in manifest["tables"]]
+        for table in tables:
+            key = (SnapshotHelper.KEYS.get(table) or ["Id"])[0]
+            if supabase.table(table).select(key).limit(1).execute().data:
+                raise ValueError(f"Table {table} is not empty; restore needs an empty database")
+
+        restored: Dict[str, int] = {}
+        links: List[Dict] = []
+        for table in tables:
+            columns = SnapshotHelper.TABLES[table]
+            deferred = SnapshotHelper.DEFERRED.get(table)
+            reader = pa.ipc.open_file(pa.memory_map(os.path.join(directory, manifest["tables"][table]["file"])))
+            count = 0
+            try:
+                for i in range(reader.num_record_batches):
+                    rows = [{name: SnapshotHelper._encode(columns[name], value) for name, value in row.items()}
+                            for row in reader.get_batch(i).to_pylist()]
+                    if deferred:
+                        links.extend({"Id": row["Id"], deferred: row[deferred]} for row in rows if row[deferred] is not None)
+                        for row in rows:
+                            row[deferred] = None
+                    if rows:
+                        supabase.table(table).insert(rows, returning="minimal").execute()
+                    count += len(rows)
+            except Exception as e:
+                logger.error(f"Error restoring {table} after {count} rows: {e}")
+                raise
+            restored[table] = count
+            logger.info(f"Restored {count} {table} rows")
+
+        for i in range(0, len(links), SnapshotHelper.PAGE_SIZE):
+            supabase.rpc("restore_verslag_links", {"koppelingen": links[i:i + SnapshotHelper.PAGE_SIZE]}).execute()
+        supabase.rpc("restore_sequences", {}).execute()
+        return restored
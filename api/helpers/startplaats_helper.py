@@ -1,5 +1,6 @@
 from typing import Dict, List, Optional
 from ..config import supabase
+from .reservation_helper import ReservationHelper
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,9 +20,9 @@ class StartplaatsHelper:
 
     @staticmethod
     def get_available_startplaatsen() -> List[Dict]:
-        """Get all available starting places"""
+        """Get all available starting places, including ones whose reservation expired"""
         try:
-            response = supabase.table(StartplaatsHelper.TABLE_NAME).select("*").eq("isbeschikbaar", True).execute()
+            response = supabase.table(StartplaatsHelper.TABLE_NAME).select("*").or_(ReservationHelper.free_filter()).execute()
             return response.data
         except Exception as e:
             logger.error(f"Error fetching available startplaatsen: {e}")
@@ -71,6 +72,9 @@ class StartplaatsHelper:
              raise ValueError("Startplaats location (locatie) cannot be empty")
         if 'isbeschikbaar' in kwargs and not isinstance(kwargs['isbeschikbaar'], bool):
              raise ValueError("isbeschikbaar must be a boolean")
+        if 'isbeschikbaar' in kwargs:
+            # A manual availability change overrides any pending reservation (see ReservationHelper)
+            kwargs.update({"gereserveerdTot": None, "reserveringToken": None})
 
         try:
             response = supabase.table(StartplaatsHelper.TABLE_NAME).update(kwargs).eq("Id", startplaats_id).execute()
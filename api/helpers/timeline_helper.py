@@ -0,0 +1,129 @@
+from typing import Dict, Iterator, Optional, Tuple
+import base64
+import heapq
+import json
+from ..config import supabase
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TimelineHelper:
+    """Builds a per-drone activity timeline from flight and docking cycles.
+
+    Both sources are read as Cyclus rows ordered by (startuur, Id), one page
+    at a time, and k-way merged so only a page per stream is held in memory.
+    They come from the *Tijdlijn views (migration 0013), which also carry the
+    cycles of archived events; include_archived=True keeps those in.
+    """
+    TABLE_NAME = "Cyclus"
+    VLUCHT_VIEW = "VluchtCyclusTijdlijn"
+    DOCKING_VIEW = "DockingCyclusTijdlijn"
+    DEFAULT_PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 1000
+
+    # Tie-break order when a flight and a docking cycle share a startuur
+    KIND_RANK = {"vlucht": 0, "docking": 1}
+
+    @staticmethod
+    def encode_cursor(key: Tuple[str, int, int]) -> str:
+        """Encode a (startuur, kind rank, Id) sort key as an opaque cursor"""
+        raw = json.dumps(list(key), separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[str, int, int]:
+        """Decode a cursor produced by encode_cursor. Raises ValueError if malformed."""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            startuur, rank, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return str(startuur), int(rank), int(row_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+    @staticmethod
+    def _after_cursor(query, rank: int, cursor: Optional[Tuple[str, int, int]]):
+        """Restrict a stream query to rows sorting strictly after the cursor."""
+        if cursor is None:
+            return query
+        startuur, cursor_rank, row_id = cursor
+        if rank < cursor_rank:
+            return query.gt("startuur", startuur)
+        if rank > cursor_rank:
+            return query.gte("startuur", startuur)
+        return query.or_(f"startuur.gt.{startuur},and(startuur.eq.{startuur},Id.gt.{row_id})")
+
+    @staticmethod
+    def _paged(build_query, rank: int, cursor: Optional[Tuple[str, int, int]], page_size: int) -> Iterator[Dict]:
+        """Yield rows of one stream in (startuur, Id) order using keyset pagination."""
+        after = cursor
+        while True:
+            query = TimelineHelper._after_cursor(build_query(), rank, after)
+            response = query.order("startuur").order("Id").limit(page_size).execute()
+            rows = response.data or []
+            for row in rows:
+                yield row
+            if len(rows) < page_size:
+                return
+            last = rows[-1]
+            after = (last["startuur"], rank, last["Id"])
+
+    @staticmethod
+    def _stream_query(view: str, columns: str, drone_id: int, include_archived: bool):
+        query = supabase.table(view).select(columns).eq("DroneId", drone_id)
+        return query if include_archived else query.eq("gearchiveerd", False)
+
+    @staticmethod
+    def _vlucht_stream(drone_id: int, cursor, page_size: int,
+                       include_archived: bool = False) -> Iterator[Tuple[Tuple[str, int, int], Dict]]:
+        rank = TimelineHelper.KIND_RANK["vlucht"]
+        build = lambda: TimelineHelper._stream_query(
+            TimelineHelper.VLUCHT_VIEW, "Id, startuur, tijdstip, VluchtCyclusId, ZoneId, PlaatsId, VerslagId, gearchiveerd",
+            drone_id, include_archived)
+        for row in TimelineHelper._paged(build, rank, cursor, page_size):
+            yield (row["startuur"], rank, row["Id"]), {
+                "type": "vlucht",
+                "CyclusId": row["Id"],
+                "startuur": row["startuur"],
+                "tijdstip": row["tijdstip"],
+                "VluchtCyclusId": row.get("VluchtCyclusId"),
+                "ZoneId": row.get("ZoneId"),
+                "PlaatsId": row.get("PlaatsId"),
+                "VerslagId": row.get("VerslagId"),
+                "gearchiveerd": row.get("gearchiveerd", False),
+            }
+
+    @staticmethod
+    def _docking_stream(drone_id: int, cursor, page_size: int,
+                        include_archived: bool = False) -> Iterator[Tuple[Tuple[str, int, int], Dict]]:
+        rank = TimelineHelper.KIND_RANK["docking"]
+        build = lambda: TimelineHelper._stream_query(
+            TimelineHelper.DOCKING_VIEW, "Id, startuur, tijdstip, DockingCyclus, gearchiveerd", drone_id, include_archived)
+        for row in TimelineHelper._paged(build, rank, cursor, page_size):
+            # A Cyclus can be shared by several DockingCyclus rows; emit one entry per row
+            for docking in row.get("DockingCyclus") or []:
+                yield (row["startuur"], rank, row["Id"]), {
+                    "type": "docking",
+                    "CyclusId": row["Id"],
+                    "startuur": row["startuur"],
+                    "tijdstip": row["tijdstip"],
+                    "DockingCyclusId": docking.get("Id"),
+                    "DockingId": docking.get("DockingId"),
+                    "gearchiveerd": row.get("gearchiveerd", False),
+                }
+
+    @staticmethod
+    def iter_drone_timeline(drone_id: int, cursor: Optional[str] = None, page_size: int = DEFAULT_PAGE_SIZE,
+                            include_archived: bool = False) -> Iterator[Tuple[Tuple[str, int, int], Dict]]:
+        """Yield (sort key, entry) pairs for a drone in chronological order, starting after cursor.
+        With include_archived the cycles of archived events are merged in too."""
+        after = TimelineHelper.decode_cursor(cursor) if cursor else None
+        page_size = max(1, min(int(page_size), TimelineHelper.MAX_PAGE_SIZE))
+        try:
+            yield from heapq.merge(
+                TimelineHelper._vlucht_stream(drone_id, after, page_size, include_archived),
+                TimelineHelper._docking_stream(drone_id, after, page_size, include_archived),
+                key=lambda pair: pair[0],
+            )
+        except Exception as e:
+            logger.error(f"Error building timeline for drone {drone_id}: {e}")
+            raise
@@ -0,0 +1,215 @@
+from typing import BinaryIO, Counter, Dict, Iterator, Optional, Tuple
+import base64
+import codecs
+import collections
+import hashlib
+import re
+import zlib
+from ..config import supabase
+from .search_helper import SearchHelper, tokenize
+import logging
+
+logger = logging.getLogger(__name__)
+
+TRAILING_WORD = re.compile(r"\S*\Z")
+
+
+class TextSplitter:
+    """Decodes a body chunk by chunk into text pieces that end on whitespace, so no character
+    or word is split between two chunks' search text."""
+    MAX_CARRY = 1024            # a longer run without whitespace is cut anyway
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self._carry = ""
+
+    def feed(self, chunk: bytes) -> str:
+        text = self._carry + self._decoder.decode(chunk)
+        cut = TRAILING_WORD.search(text).start()
+        if len(text) - cut > self.MAX_CARRY:
+            cut = len(text)
+        self._carry = text[cut:]
+        return text[:cut]
+
+    def finish(self) -> str:
+        text, self._carry = self._carry + self._decoder.decode(b"", final=True), ""
+        return text
+
+class VerslagContentHelper:
+    """Chunked storage of large Verslag bodies.
+
+    A body is split into fixed-size chunks stored as VerslagBlok rows under a
+    new version number, optionally zlib-compressed per chunk. Only when every
+    chunk is written does Verslag switch to the new version (compare-and-set on
+    inhoudVersie), so readers never see a half-written body. Fixed chunk sizes
+    let a byte range be served by fetching only the chunks it covers.
+    """
+    TABLE_NAME = "VerslagBlok"
+    CHUNK_SIZE = 256 * 1024
+    INSERT_BATCH = 8            # chunks per insert round trip
+    READ_BATCH = 8              # chunks per select round trip
+    PREVIEW_BYTES = 4096        # stored in Verslag.inhoud so lists still see the start; search indexes it all
+    META_COLUMNS = "Id, inhoud, inhoudVersie, inhoudBlokken, inhoudBlokGrootte, inhoudLengte, inhoudDigest"
+
+    @staticmethod
+    def get_meta(verslag_id: int) -> Optional[Dict]:
+        try:
+            response = (supabase.table("Verslag").select(VerslagContentHelper.META_COLUMNS)
+                        .eq("Id", verslag_id).limit(1).execute())
+            return response.data[0] if response.data else None
+        except Exception as e:
+            logger.error(f"Error fetching content metadata for verslag {verslag_id}: {e}")
+            raise
+
+    @staticmethod
+    def _read_chunk(stream: BinaryIO, size: int) -> bytes:
+        """Read up to size bytes; WSGI streams may return short reads before EOF."""
+        parts, remaining = [], size
+        while remaining:
+            data = stream.read(remaining)
+            if not data:
+                break
+            parts.append(data)
+            remaining -= len(data)
+        return b"".join(parts)
+
+    @staticmethod
+    def _delete_version(verslag_id: int, versie: int) -> None:
+        supabase.table(VerslagContentHelper.TABLE_NAME).delete().eq("VerslagId", verslag_id).eq("versie", versie).execute()
+
+    @staticmethod
+    def write_content(verslag_id: int, stream: BinaryIO, compress: bool = False) -> Optional[Dict]:
+        """Store the stream as the new body of a Verslag. Returns the updated metadata, None if not found.
+
+        Memory use is bounded by INSERT_BATCH chunks regardless of the body size. Each chunk also
+        carries its text for the full-text index (migration 0010), which the database keeps only as
+        a tsvector, and the in-process search index gets the term counts of the whole body.
+        """
+        meta = VerslagContentHelper.get_meta(verslag_id)
+        if not meta:
+            return None
+        old_versie = meta["inhoudVersie"]
+        versie = (old_versie or 0) + 1
+        digest = hashlib.sha256()
+        length = 0
+        count = 0
+        preview = b""
+        batch = []
+        splitter = TextSplitter()
+        terms: Counter[str] = collections.Counter()
+
+        try:
+            while True:
+                chunk = VerslagContentHelper._read_chunk(stream, VerslagContentHelper.CHUNK_SIZE)
+                if not chunk:
+                    break
+                if count == 0:
+                    preview = chunk[:VerslagContentHelper.PREVIEW_BYTES]
+                digest.update(chunk)
+                length += len(chunk)
+                # Flushed before appending, so the last chunk is still in the batch at the end
+                if len(batch) == VerslagContentHelper.INSERT_BATCH:
+                    supabase.table(VerslagContentHelper.TABLE_NAME).insert(batch).execute()
+                    batch = []
+                tekst = splitter.feed(chunk)
+                terms.update(tokenize(tekst))
+                data = zlib.compress(chunk) if compress else chunk
+                batch.append({"VerslagId": verslag_id, "versie": versie, "volgnummer": count,
+                              "data": base64.b64encode(data).decode(), "gecomprimeerd": compress,
+                              "tekst": tekst})
+                count += 1
+            if not length:
+                raise ValueError("Inhoud cannot be empty")
+            rest = splitter.finish()
+            terms.update(tokenize(rest))
+            batch[-1]["tekst"] += rest
+            supabase.table(VerslagContentHelper.TABLE_NAME).insert(batch).execute()
+
+            update = (supabase.table("Verslag").update({
+                "inhoud": preview.decode("utf-8", errors="ignore"),
+                "inhoudVersie": versie,
+                "inhoudBlokken": count,
+                "inhoudBlokGrootte": VerslagContentHelper.CHUNK_SIZE,
+                "inhoudLengte": length,
+                "inhoudDigest": digest.hexdigest(),
+            }).eq("Id", verslag_id))
+            update = update.eq("inhoudVersie", old_versie) if old_versie is not None else update.is_("inhoudVersie", "null")
+            response = update.execute()
+            if not response.data:
+                raise ValueError("The content was replaced concurrently, retry the upload.")
+        except Exception as e:
+            if count:
+                VerslagContentHelper._delete_version(verslag_id, versie)
+            if not isinstance(e, ValueError):
+                logger.error(f"Error writing content for verslag {verslag_id}: {e}")
+            raise
+
+        if old_versie is not None:
+            try:
+                VerslagContentHelper._delete_version(verslag_id, old_versie)
+            except Exception as e:
+                # Harmless leftovers: no reader uses an old version
+                logger.warning(f"Could not delete old content version {old_versie} of verslag {verslag_id}: {e}")
+        SearchHelper.index_verslag(response.data[0], inhoud_terms=terms)
+        return {key: response.data[0][key] for key in VerslagContentHelper.META_COLUMNS.split(", ") if key != "inhoud"}
+
+    @staticmethod
+    def count_terms(meta: Dict) -> Counter[str]:
+        """Search term counts of the whole body, read chunk by chunk (for the in-process index)."""
+        terms: Counter[str] = collections.Counter()
+        if not meta["inhoudLengte"]:
+            return terms
+        splitter = TextSplitter()
+        for data in VerslagContentHelper.iter_content(meta, 0, meta["inhoudLengte"] - 1):
+            terms.update(tokenize(splitter.feed(data)))
+        terms.update(tokenize(splitter.finish()))
+        return terms
+
+    @staticmethod
+    def parse_range(header: Optional[str], length: int) -> Optional[Tuple[int, int]]:
+        """Inclusive (start, end) for a single "bytes=" range, None for no/ignored Range.
+
+        Raises LookupError when the range cannot be satisfied (416).
+        """
+        if not header or not header.startswith("bytes=") or "," in header:
+            return None # Multi-range requests get the full body, which RFC 9110 allows
+        first, _, last = header[len("bytes="):].strip().partition("-")
+        try:
+            if first == "":
+                suffix = int(last)
+                if suffix <= 0:
+                    raise LookupError("Range not satisfiable")
+                return max(0, length - suffix), length - 1
+            start = int(first)
+            end = min(int(last), length - 1) if last else length - 1
+        except ValueError:
+            return None
+        if start >= length or end < start:
+            raise LookupError("Range not satisfiable")
+        return start, end
+
+    @staticmethod
+    def iter_content(meta: Dict, start: int, end: int) -> Iterator[bytes]:
+        """Yield bytes start..end (inclusive), fetching only the chunks that cover them."""
+        if meta["inhoudVersie"] is None:
+            yield meta["inhoud"].encode("utf-8")[start:end + 1]
+            return
+
+        size = meta["inhoudBlokGrootte"]
+        first, last = start // size, end // size
+        for batch_start in range(first, last + 1, VerslagContentHelper.READ_BATCH):
+            batch_end = min(batch_start + VerslagContentHelper.READ_BATCH - 1, last)
+            rows = (supabase.table(VerslagContentHelper.TABLE_NAME)
+                    .select("volgnummer, data, gecomprimeerd")
+                    .eq("VerslagId", meta["Id"]).eq("versie", meta["inhoudVersie"])
+                    .gte("volgnummer", batch_start).lte("volgnummer", batch_end)
+                    .order("volgnummer").execute()).data
+            if len(rows) != batch_end - batch_start + 1:
+                # The version was replaced while streaming
+                raise RuntimeError(f"Content of verslag {meta['Id']} changed during download")
+            for row in rows:
+                data = base64.b64decode(row["data"])
+                if row["gecomprimeerd"]:
+                    data = zlib.decompress(data)
+                offset = row["volgnummer"] * size
+                yield data[max(start - offset, 0):end - offset + 1]
@@ -1,11 +1,16 @@
 from typing import Dict, List, Optional
 from ..config import supabase
+from .search_helper import SearchHelper
 import logging
 
 logger = logging.getLogger(__name__)
 
 class VerslagHelper:
     TABLE_NAME = "Verslag"
+    # List responses carry the body's size, digest and a preview; the body itself comes from
+    # GET /api/verslagen/<id>/content (inhoudVoorbeeld is a computed column, see db.sql)
+    LIST_COLUMNS = ("Id, onderwerp, isverzonden, isgeaccepteerd, VluchtCyclusId, "
+                    "inhoudLengte, inhoudDigest, inhoudVoorbeeld")
 
     @staticmethod
     def get_all_verslagen() -> List[Dict]:
@@ -61,6 +66,7 @@ class VerslagHelper:
         try:
             response = supabase.table(VerslagHelper.TABLE_NAME).insert(verslag_data).execute()
             if response.data:
+                SearchHelper.index_verslag(response.data[0])
                 return response.data[0]
             else:
                 if hasattr(response, 'error') and response.error:
@@ -97,6 +103,7 @@ class VerslagHelper:
         try:
             response = supabase.table(VerslagHelper.TABLE_NAME).update(kwargs).eq("Id", verslag_id).execute()
             if response.data:
+                SearchHelper.index_verslag(response.data[0])
                 return response.data[0]
             else:
                 existing = VerslagHelper.get_verslag_by_id(verslag_id)
@@ -132,6 +139,7 @@ class VerslagHelper:
             # But Verslag->VluchtCyclus *does* (ON DELETE SET NULL). This helper deletes a Verslag.
             # Deleting a Verslag should SET NULL in the referencing VluchtCyclus row(s).
             # If VluchtCyclus referenced Verslag (it doesn't), then deleting Verslag would be restricted.
+            SearchHelper.remove_verslag(verslag_id)
             return True
         except Exception as e:
             # If deletion is blocked unexpectedly
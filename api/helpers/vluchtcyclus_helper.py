@@ -1,17 +1,20 @@
 from typing import Dict, List, Optional
 from ..config import supabase
+from .cycle_index import CycleIndex, overlap_message
 import logging
 
 logger = logging.getLogger(__name__)
 
 class VluchtCyclusHelper:
     TABLE_NAME = "VluchtCyclus"
+    HISTORY_VIEW = "VluchtCyclusHistorie"  # live and archived rows, see ArchiveHelper
 
     @staticmethod
-    def get_all_vlucht_cycli() -> List[Dict]:
-        """Get all flight cycles"""
+    def get_all_vlucht_cycli(include_archived: bool = False) -> List[Dict]:
+        """Get all flight cycles (of archived events too with include_archived)"""
+        table = VluchtCyclusHelper.HISTORY_VIEW if include_archived else VluchtCyclusHelper.TABLE_NAME
         try:
-            response = supabase.table(VluchtCyclusHelper.TABLE_NAME).select("*").execute()
+            response = supabase.table(table).select("*").execute()
             return response.data
         except Exception as e:
             logger.error(f"Error fetching all vlucht cycli: {e}")
@@ -139,6 +142,8 @@ class VluchtCyclusHelper:
 
             response = supabase.table(VluchtCyclusHelper.TABLE_NAME).update(merged_data).eq("Id", vlucht_cyclus_id).execute()
             if response.data:
+                if merged_data["DroneId"] != existing.get("DroneId"):
+                    CycleIndex.invalidate() # Every Cyclus of this flight cycle moved to another drone
                 return response.data[0]
             else:
                 if hasattr(response, 'error') and response.error:
@@ -154,6 +159,9 @@ class VluchtCyclusHelper:
             if "violates foreign key constraint" in str(e):
                 logger.warning(f"Update VluchtCyclus {vlucht_cyclus_id} failed due to invalid FK in data {update_data}")
                 raise ValueError("One or more reference IDs do not exist.")
+            if overlap_message(e):
+                # The new drone already flies or docks at one of this flight cycle's times
+                raise ValueError(overlap_message(e))
             logger.error(f"Error updating vlucht cyclus {vlucht_cyclus_id} with data {update_data}: {e}")
             raise
 
@@ -0,0 +1,176 @@
+"""Versioned schema migrations on top of db.sql.
+
+    python -m api.migrate status
+    python -m api.migrate up [--to 3]
+
+Migrations are migrations/NNNN_name.sql, applied in version order and recorded
+in the "SchemaMigratie" table with their checksum. A regular migration runs in
+one transaction. A migration whose first line is "-- migrate: no-transaction"
+runs statement by statement in autocommit mode, which CREATE INDEX CONCURRENTLY
+requires; such a migration must consist of simple statements ending in ";" at
+the end of a line, and must be safe to re-run (IF NOT EXISTS), because an
+interrupted one is retried from the start. Invalid indexes left behind by a
+failed concurrent build are dropped before the retry.
+
+Connects with DATABASE_URL, the Postgres connection string of the project (not
+the Supabase API URL). Requires psycopg 3 (pip install "psycopg[binary]").
+"""
+from typing import Dict, List, NamedTuple, Optional
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+FILE_PATTERN = re.compile(r"^(\d{4})_(\w+)\.sql$")
+NO_TRANSACTION = "-- migrate: no-transaction"
+CONCURRENT_INDEX = re.compile(r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?"?(\w+)"?',
+                              re.IGNORECASE)
+
+SCHEMA_TABLE = """
+CREATE TABLE IF NOT EXISTS "SchemaMigratie" (
+    "versie" INTEGER PRIMARY KEY,
+    "naam" TEXT NOT NULL,
+    "checksum" CHAR(64) NOT NULL,
+    "toegepastOp" TIMESTAMPTZ NOT NULL DEFAULT now(),
+    "duurMs" INTEGER NOT NULL
+)
+"""
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    sql: str
+    checksum: str
+    transactional: bool
+
+
+def discover(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename)) as f:
+            sql = f.read()
+        migrations.append(Migration(int(match.group(1)), match.group(2), sql,
+                                    hashlib.sha256(sql.encode()).hexdigest(),
+                                    not sql.lstrip().startswith(NO_TRANSACTION)))
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def connect(database_url: Optional[str] = None):
+    import psycopg
+    url = database_url or os.environ.get("DATABASE_URL")
+    if not url:
+        raise ValueError("Set DATABASE_URL or pass --database-url")
+    return psycopg.connect(url, autocommit=True)
+
+
+def applied(conn) -> Dict[int, Dict]:
+    conn.execute(SCHEMA_TABLE)
+    rows = conn.execute('SELECT "versie", "naam", "checksum", "toegepastOp", "duurMs" FROM "SchemaMigratie"').fetchall()
+    return {r[0]: {"naam": r[1], "checksum": r[2], "toegepastOp": r[3], "duurMs": r[4]} for r in rows}
+
+
+def split_statements(sql: str) -> List[str]:
+    """Statements of a no-transaction migration: ";" at the end of a line ends a statement."""
+    body = "\n".join(line for line in sql.splitlines() if not line.strip().startswith("--"))
+    return [s.strip() for s in re.split(r";[ \t]*$", body, flags=re.MULTILINE) if s.strip()]
+
+
+def drop_invalid_indexes(conn, sql: str) -> List[str]:
+    """Drop indexes of this migration left INVALID by an interrupted CREATE INDEX CONCURRENTLY."""
+    names = CONCURRENT_INDEX.findall(sql)
+    if not names:
+        return []
+    rows = conn.execute(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE NOT i.indisvalid AND c.relname = ANY(%s)", (names,)
+    ).fetchall()
+    for (name,) in rows:
+        conn.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+    return [name for (name,) in rows]
+
+
+def apply(conn, migration: Migration) -> int:
+    """Run one migration and record it. Returns its duration in milliseconds."""
+    started = time.perf_counter()
+    record = ('INSERT INTO "SchemaMigratie" ("versie", "naam", "checksum", "duurMs") VALUES (%s, %s, %s, %s)')
+    if migration.transactional:
+        with conn.transaction():
+            conn.execute(migration.sql)
+            duration = int((time.perf_counter() - started) * 1000)
+            conn.execute(record, (migration.version, migration.name, migration.checksum, duration))
+        return duration
+
+    dropped = drop_invalid_indexes(conn, migration.sql)
+    if dropped:
+        print(f"  dropped invalid indexes from an earlier attempt: {', '.join(dropped)}", file=sys.stderr)
+    for statement in split_statements(migration.sql):
+        conn.execute(statement)
+    duration = int((time.perf_counter() - started) * 1000)
+    conn.execute(record, (migration.version, migration.name, migration.checksum, duration))
+    return duration
+
+
+def pending(conn, migrations: List[Migration]) -> List[Migration]:
+    """Migrations not yet applied. Raises ValueError when an applied migration file was edited."""
+    done = applied(conn)
+    changed = [m for m in migrations if m.version in done and done[m.version]["checksum"] != m.checksum]
+    if changed:
+        raise ValueError("Applied migrations were modified afterwards: "
+                         + ", ".join(f"{m.version:04d}_{m.name}" for m in changed)
+                         + ". Add a new migration instead.")
+    return [m for m in migrations if m.version not in done]
+
+
+def up(conn, migrations: List[Migration], target: Optional[int] = None) -> List[Migration]:
+    done = []
+    for migration in pending(conn, migrations):
+        if target is not None and migration.version > target:
+            break
+        print(f"applying {migration.version:04d}_{migration.name}"
+              f"{'' if migration.transactional else ' (no transaction)'}", file=sys.stderr)
+        duration = apply(conn, migration)
+        print(f"  done in {duration} ms", file=sys.stderr)
+        done.append(migration)
+    return done
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations.")
+    parser.add_argument("command", choices=["status", "up"])
+    parser.add_argument("--to", type=int, help="stop after this version")
+    parser.add_argument("--database-url")
+    parser.add_argument("--migrations", default=MIGRATIONS_DIR)
+    args = parser.parse_args(argv)
+
+    try:
+        migrations = discover(args.migrations)
+        with connect(args.database_url) as conn:
+            if args.command == "up":
+                done = up(conn, migrations, args.to)
+                print(f"{len(done)} migration(s) applied")
+                return
+            done = applied(conn)
+            for m in migrations:
+                state = "pending"
+                if m.version in done:
+                    state = f"applied {done[m.version]['toegepastOp']:%Y-%m-%d %H:%M}"
+                    if done[m.version]["checksum"] != m.checksum:
+                        state += " (file modified since)"
+                print(f"{m.version:04d}_{m.name}: {state}")
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
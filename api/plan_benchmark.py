@@ -0,0 +1,169 @@
+"""Query-plan benchmark of the helpers' hot queries, before and after each pending migration.
+
+    createdb drone_bench
+    python -m api.plan_benchmark --database-url postgresql://localhost/drone_bench --setup --scale 100000
+
+--setup loads db.sql into the (empty) database and generates --scale flight
+cycles with proportional events, zones, drones, pads, docks and reports. The
+benchmark then measures every query shape, applies the pending migrations one
+by one (see api.migrate) and measures again after each, printing the plan and
+median latency per query and the change against the previous step. Run it
+against a local scratch database only. Requires psycopg 3.
+"""
+from typing import Dict, List, Optional, Tuple
+import argparse
+import json
+import os
+import statistics
+import sys
+from . import migrate
+
+DB_SQL = os.path.join(os.path.dirname(migrate.MIGRATIONS_DIR), "db.sql")
+
+# (name, helper it mirrors, SQL with {} placeholders, parameters)
+QUERY_SHAPES: List[Tuple[str, str, str, tuple]] = [
+    ("drones_available", "DroneHelper.get_available_drones",
+     'SELECT * FROM "Drone" WHERE "status" = {}', ("AVAILABLE",)),
+    ("drones_flight_ready", "DroneHelper.get_flight_ready_drones",
+     'SELECT * FROM "Drone" WHERE "status" = {} AND "magOpstijgen" = {}', ("AVAILABLE", True)),
+    ("startplaatsen_available", "StartplaatsHelper.get_available_startplaatsen",
+     'SELECT * FROM "Startplaats" WHERE "isbeschikbaar" = {}', (True,)),
+    ("docking_available", "DockingHelper.get_available_docking",
+     'SELECT * FROM "Docking" WHERE "isbeschikbaar" = {}', (True,)),
+    ("docking_reserve_pick", "reserve_resources RPC",
+     'SELECT "Id" FROM "Docking" WHERE "isbeschikbaar" OR "gereserveerdTot" < now() ORDER BY "Id" LIMIT {}', (5,)),
+    ("verslagen_by_status", "VerslagHelper.get_verslagen_by_status",
+     'SELECT * FROM "Verslag" WHERE "isverzonden" = {} AND "isgeaccepteerd" = {}', (True, True)),
+    ("events_in_range", "ExportHelper.resolve_scope",
+     'SELECT "Id" FROM "Evenement" WHERE "EindDatum" >= {} AND "StartDatum" <= {}', ("2024-06-01", "2024-06-07")),
+    ("events_ended", "finished-event lookups",
+     'SELECT "Id" FROM "Evenement" WHERE "EindDatum" < {}', ("2023-02-01",)),
+]
+
+GENERATE = """
+INSERT INTO "Evenement" ("StartDatum", "EindDatum", "StartTijd", "Tijdsduur", "Naam")
+SELECT DATE '2023-01-01' + (i % 1095), DATE '2023-01-01' + (i % 1095) + (i % 4), TIME '09:00', TIME '08:00',
+       'Evenement ' || i
+FROM generate_series(1, {events}) i;
+
+INSERT INTO "Zone" ("breedte", "lengte", "naam", "EvenementId")
+SELECT 50 + (i % 200), 50 + (i % 300), 'Zone ' || i, 1 + (i % {events})
+FROM generate_series(1, {zones}) i;
+
+INSERT INTO "Drone" ("status", "batterij", "magOpstijgen")
+SELECT (ARRAY['AVAILABLE', 'IN_USE', 'MAINTENANCE', 'OFFLINE'])[1 + (i % 4)], i % 101, i % 3 = 0
+FROM generate_series(1, {drones}) i;
+
+INSERT INTO "Startplaats" ("locatie", "isbeschikbaar") SELECT 'Pad ' || i, i % 10 = 0 FROM generate_series(1, {pads}) i;
+INSERT INTO "Docking" ("locatie", "isbeschikbaar") SELECT 'Dock ' || i, i % 10 = 0 FROM generate_series(1, {pads}) i;
+UPDATE "Docking" SET "gereserveerdTot" = now() + (("Id" % 7) - 3) * INTERVAL '1 minute' WHERE "Id" % 20 = 1;
+
+INSERT INTO "Verslag" ("onderwerp", "inhoud", "isverzonden", "isgeaccepteerd")
+SELECT 'Verslag ' || i, 'Vlucht zonder bijzonderheden ' || i, i % 2 = 0, i % 10 = 0
+FROM generate_series(1, {reports}) i;
+
+INSERT INTO "VluchtCyclus" ("VerslagId", "PlaatsId", "DroneId", "ZoneId")
+SELECT CASE WHEN i <= {reports} THEN i END, 1 + (i % {pads}), 1 + (i % {drones}), 1 + (i % {zones})
+FROM generate_series(1, {cycles}) i;
+
+INSERT INTO "Cyclus" ("startuur", "tijdstip", "VluchtCyclusId")
+SELECT TIME '06:00' + (i % 720) * INTERVAL '1 minute', TIME '06:30' + (i % 720) * INTERVAL '1 minute',
+       CASE WHEN i <= {cycles} THEN i END
+FROM generate_series(1, {cycles} + {dockings}) i;
+
+INSERT INTO "DockingCyclus" ("DroneId", "DockingId", "CyclusId")
+SELECT 1 + (i % {drones}), 1 + (i % {pads}), {cycles} + i FROM generate_series(1, {dockings}) i;
+"""
+
+
+def setup(conn, scale: int) -> None:
+    if conn.execute("SELECT to_regclass('\"Evenement\"')").fetchone()[0] is not None:
+        raise ValueError("--setup needs an empty database")
+    with open(DB_SQL) as f:
+        conn.execute(f.read())
+    try:
+        # Skips the change journal triggers while loading; needs superuser, which a local database usually grants
+        conn.execute("SET session_replication_role = replica")
+    except Exception as e:
+        print(f"loading with journal triggers enabled ({e})", file=sys.stderr)
+    sizes = {"events": max(scale // 100, 10), "zones": max(scale // 20, 50), "drones": max(scale // 10, 20),
+             "pads": max(scale // 20, 20), "reports": max(scale // 2, 10), "cycles": scale,
+             "dockings": max(scale // 2, 10)}
+    with conn.transaction():
+        conn.execute(GENERATE.format(**sizes))
+    conn.execute("SET session_replication_role = DEFAULT")
+    conn.execute("ANALYZE")
+    print(f"generated {json.dumps(sizes)}", file=sys.stderr)
+
+
+def summarize_plan(node: Dict) -> str:
+    """Compact plan outline, e.g. "Limit > Index Scan(idx_docking_beschikbaar)"."""
+    label = node["Node Type"]
+    if node.get("Index Name"):
+        label += f"({node['Index Name']})"
+    elif node.get("Relation Name"):
+        label += f"({node['Relation Name']})"
+    children = [summarize_plan(child) for child in node.get("Plans", [])]
+    if not children:
+        return label
+    return f"{label} > {' + '.join(children)}" if len(children) > 1 else f"{label} > {children[0]}"
+
+
+def measure(conn, repeat: int) -> Dict[str, Dict]:
+    from psycopg import sql
+    results = {}
+    for name, _, query, params in QUERY_SHAPES:
+        statement = sql.SQL("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query).format(*map(sql.Literal, params))
+        timings, plan = [], None
+        for _ in range(repeat):
+            explained = conn.execute(statement).fetchone()[0][0]
+            timings.append(explained["Planning Time"] + explained["Execution Time"])
+            plan = explained["Plan"]
+        results[name] = {"ms": statistics.median(timings), "plan": summarize_plan(plan),
+                         "buffers": plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0)}
+    return results
+
+
+def report(step: str, current: Dict[str, Dict], previous: Optional[Dict[str, Dict]]) -> None:
+    print(f"\n== {step}")
+    for name, _, _, _ in QUERY_SHAPES:
+        now = current[name]
+        line = f"{name:26} {now['ms']:9.3f} ms {now['buffers']:7d} buf  {now['plan']}"
+        if previous:
+            before = previous[name]
+            speedup = before["ms"] / now["ms"] if now["ms"] else float("inf")
+            line += f"\n{'':26} was {before['ms']:9.3f} ms ({speedup:.1f}x)"
+            if before["plan"] != now["plan"]:
+                line += f", plan was {before['plan']}"
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark query plans across pending migrations.")
+    parser.add_argument("--database-url")
+    parser.add_argument("--setup", action="store_true", help="load db.sql and generate data first")
+    parser.add_argument("--scale", type=int, default=100000, help="flight cycles to generate with --setup")
+    parser.add_argument("--repeat", type=int, default=15, help="runs per query; the median is reported")
+    args = parser.parse_args(argv)
+
+    try:
+        with migrate.connect(args.database_url) as conn:
+            if args.setup:
+                setup(conn, args.scale)
+            migrations = migrate.discover()
+            todo = migrate.pending(conn, migrations)
+            previous = measure(conn, args.repeat)
+            report("baseline" if todo else "current schema (no pending migrations)", previous, None)
+            for migration in todo:
+                migrate.apply(conn, migration)
+                conn.execute("ANALYZE")
+                current = measure(conn, args.repeat)
+                report(f"after {migration.version:04d}_{migration.name}", current, previous)
+                previous = current
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
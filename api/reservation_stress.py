@@ -0,0 +1,105 @@
+"""Concurrency stress check for the reservation endpoints.
+
+Fires many simultaneous reserve calls at a running API and verifies that no
+Startplaats/Docking Id was handed out to two reservations at once:
+
+    python -m api.reservation_stress --base-url http://localhost:5000 --table docking --workers 300
+
+Every granted reservation is released again afterwards. Exits with status 1
+on a double allocation or an unexpected (non 201/409) response. Only uses the
+standard library, so it can run from any machine that can reach the API.
+
+All workers share one address, so the API's rate limiter answers most of them
+with 429. Those calls are retried after Retry-After (plus jitter, up to
+--retries times), which spreads them out again. For full contention start the
+API with RATE_LIMIT_ENABLED=false for the run.
+"""
+from typing import Dict, List, Optional, Tuple
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+PATHS = {"startplaatsen": "/api/startplaatsen", "docking": "/api/docking"}
+
+
+def _post(url: str, body: Dict, timeout: float) -> Tuple[int, Dict]:
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), method="POST",
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        return e.code, {**json.loads(e.read() or b"{}"), "retry_after": e.headers.get("Retry-After")}
+
+
+def _post_admitted(url: str, body: Dict, timeout: float, retries: int, limited: Counter) -> Tuple[int, Dict]:
+    """POST, waiting out rate limiting (429) up to `retries` times."""
+    for attempt in range(retries + 1):
+        status, response = _post(url, body, timeout)
+        if status != 429 or attempt == retries:
+            return status, response
+        limited[url.rsplit("/", 1)[-1]] += 1
+        time.sleep(float(response.get("retry_after") or 1) + random.uniform(0, 1))
+
+
+def run(base_url: str, table: str, workers: int, aantal: int, ttl_seconds: int, timeout: float,
+        retries: int = 5) -> Dict:
+    base = base_url.rstrip("/") + PATHS[table]
+    start = threading.Barrier(workers)
+    limited: Counter = Counter()
+
+    def reserve(_) -> Tuple[int, Dict]:
+        start.wait() # Release all workers at once to maximise contention
+        return _post_admitted(f"{base}/reserve", {"aantal": aantal, "ttl_seconds": ttl_seconds}, timeout,
+                              retries, limited)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(reserve, range(workers)))
+
+    granted = [body for status, body in results if status == 201]
+    statuses = Counter(status for status, _ in results)
+    claimed = Counter(row["Id"] for body in granted for row in body["reserved"])
+    double = sorted(resource_id for resource_id, count in claimed.items() if count > 1)
+    short = [body["token"] for body in granted if len(body["reserved"]) != aantal]
+
+    for body in granted:
+        _post_admitted(f"{base}/release", {"token": body["token"]}, timeout, retries, limited)
+
+    return {
+        "workers": workers,
+        "statuses": dict(statuses),
+        "granted": len(granted),
+        "resources_claimed": len(claimed),
+        "double_allocations": double,
+        "partial_reservations": short,
+        "rate_limited_retries": dict(limited),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Check reservations for double allocations under load.")
+    parser.add_argument("--base-url", default="http://localhost:5000")
+    parser.add_argument("--table", choices=sorted(PATHS), default="startplaatsen")
+    parser.add_argument("--workers", type=int, default=300, help="concurrent reservers")
+    parser.add_argument("--aantal", type=int, default=1, help="resources per reservation")
+    parser.add_argument("--ttl", type=int, default=60, help="reservation ttl in seconds")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--retries", type=int, default=5, help="retries of a rate limited (429) call")
+    args = parser.parse_args(argv)
+
+    report = run(args.base_url, args.table, args.workers, args.aantal, args.ttl, args.timeout, args.retries)
+    print(json.dumps(report, indent=2))
+    unexpected = set(report["statuses"]) - {201, 409}
+    if report["double_allocations"] or report["partial_reservations"] or unexpected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""Discrete-event simulation for capacity planning an event.
+
+Answers "are N drones and M docks enough for this event?" offline. Every zone
+wants one drone on station for the whole event; drones launch from a
+startplaats, fly until their battery reaches the reserve, return, queue for a
+docking station and charge. The simulation reports utilization, idle time,
+dock queueing and missed zone coverage.
+
+Scenarios of a parameter sweep run in parallel on a process pool:
+
+    python -m api.simulation --event-id 3 --drones 10,15,20 --docks 2,4
+
+The engine itself has no database dependency, only load_event() does.
+"""
+from typing import Dict, List, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import heapq
+import itertools
+import json
+import math
+import os
+import sys
+
+DEFAULT_SCENARIO = {
+    "drain_rate": 1.5,        # battery percent per minute airborne
+    "charge_rate": 1.0,       # battery percent per minute on a dock
+    "reserve": 20.0,          # battery percent left when a drone lands
+    "launch_min_battery": 90.0, # a drone below this charges before its first launch
+    "transit_minutes": 3.0,   # startplaats <-> zone, each way
+    "launch_minutes": 1.0,    # startplaats occupancy per launch
+}
+
+
+def validate_scenario(params: Dict, duration: float, dock_count: int, pad_count: int) -> None:
+    """Raise ValueError for a scenario the engine cannot run (divisions by zero, endless loops)."""
+    values = {"duration_minutes": duration, **params}
+    bad = [name for name, value in values.items() if not math.isfinite(value)]
+    if bad:
+        raise ValueError(f"{', '.join(bad)} must be finite numbers")
+    if duration <= 0:
+        raise ValueError("The event has no duration (Tijdsduur 00:00), nothing to simulate")
+    if params["drain_rate"] <= 0 or params["charge_rate"] <= 0:
+        raise ValueError("drain_rate and charge_rate must be positive")
+    if not (0 <= params["reserve"] < 100):
+        raise ValueError("reserve must be at least 0 and below 100")
+    if params["transit_minutes"] < 0 or params["launch_minutes"] < 0:
+        raise ValueError("transit_minutes and launch_minutes cannot be negative")
+    if (100.0 - params["reserve"]) / params["drain_rate"] <= 2 * params["transit_minutes"]:
+        raise ValueError("A fully charged drone cannot reach a zone and return above the reserve")
+    if dock_count < 0 or pad_count < 0:
+        raise ValueError("docks and startplaatsen cannot be negative")
+
+
+class Simulation:
+    """One scenario run. Time is in minutes from the event start."""
+
+    def __init__(self, zones: List[Dict], batteries: List[float], dock_count: int, pad_count: int,
+                 duration: float, params: Dict):
+        self.params = {**DEFAULT_SCENARIO, **params}
+        validate_scenario(self.params, duration, dock_count, pad_count)
+        self.duration = duration
+        self.zone_ids = [z["Id"] for z in zones]
+        self.batteries = list(batteries)
+        self.dock_count = dock_count
+        self.pad_count = max(pad_count, 1)
+
+        self.now = 0.0
+        self._events = []
+        self._sequence = itertools.count()
+
+        self.idle = deque(range(len(batteries))) # drones at base, charged enough to launch
+        self.uncovered = deque(self.zone_ids)     # zones waiting for a drone
+        self.dock_queue = deque()                 # (drone, queued_at)
+        self.free_docks = dock_count
+        self.free_pads = self.pad_count
+
+        self.flying = [0.0] * len(batteries)
+        self.charging = [0.0] * len(batteries)
+        self.waiting = [0.0] * len(batteries)
+        self.covered = {zone_id: 0.0 for zone_id in self.zone_ids}
+        self.dock_busy = 0.0
+        self.queue_waits = []
+
+    def _at(self, when: float, handler, *args) -> None:
+        heapq.heappush(self._events, (when, next(self._sequence), handler, args))
+
+    def _clip(self, start: float, end: float) -> float:
+        """Part of [start, end) inside the event."""
+        return max(0.0, min(end, self.duration) - max(start, 0.0))
+
+    def _dispatch(self) -> None:
+        while self.uncovered and self.idle and self.free_pads:
+            drone = self.idle.popleft()
+            if self._station_minutes(drone) <= 0:
+                # Not enough battery to reach a zone and return, charge first
+                self._queue_for_dock(drone)
+                continue
+            self.free_pads -= 1
+            self._at(self.now + self.params["launch_minutes"], self._pad_released)
+            self._launch(drone, self.uncovered.popleft())
+
+    def _station_minutes(self, drone: int) -> float:
+        p = self.params
+        return (self.batteries[drone] - p["reserve"]) / p["drain_rate"] - 2 * p["transit_minutes"]
+
+    def _launch(self, drone: int, zone_id: int) -> None:
+        p = self.params
+        airborne = (self.batteries[drone] - p["reserve"]) / p["drain_rate"]
+        arrive = self.now + p["transit_minutes"]
+        leave = arrive + self._station_minutes(drone)
+        self.covered[zone_id] += self._clip(arrive, leave)
+        self.flying[drone] += self._clip(self.now, self.now + airborne)
+        self.batteries[drone] = p["reserve"]
+        # Ask for a relief drone early enough that it arrives as this one leaves
+        self._at(leave - p["transit_minutes"], self._relieve, zone_id)
+        self._at(self.now + airborne, self._landed, drone)
+
+    def _pad_released(self) -> None:
+        self.free_pads += 1
+        self._dispatch()
+
+    def _relieve(self, zone_id: int) -> None:
+        self.uncovered.append(zone_id)
+        self._dispatch()
+
+    def _landed(self, drone: int) -> None:
+        self._queue_for_dock(drone)
+
+    def _queue_for_dock(self, drone: int) -> None:
+        self.dock_queue.append((drone, self.now))
+        self._start_charging()
+
+    def _start_charging(self) -> None:
+        while self.dock_queue and self.free_docks:
+            drone, queued_at = self.dock_queue.popleft()
+            self.free_docks -= 1
+            wait = self.now - queued_at
+            self.queue_waits.append(wait)
+            self.waiting[drone] += self._clip(queued_at, self.now)
+            minutes = (100.0 - self.batteries[drone]) / self.params["charge_rate"]
+            self.charging[drone] += self._clip(self.now, self.now + minutes)
+            self.dock_busy += self._clip(self.now, self.now + minutes)
+            self._at(self.now + minutes, self._charged, drone)
+
+    def _charged(self, drone: int) -> None:
+        self.batteries[drone] = 100.0
+        self.free_docks += 1
+        self.idle.append(drone)
+        self._start_charging()
+        self._dispatch()
+
+    def run(self) -> Dict:
+        for drone in list(self.idle):
+            if self.batteries[drone] < self.params["launch_min_battery"]:
+                self.idle.remove(drone)
+                self._queue_for_dock(drone)
+        self._dispatch()
+        while self._events and self._events[0][0] < self.duration:
+            self.now, _, handler, args = heapq.heappop(self._events)
+            handler(*args)
+        for drone, queued_at in self.dock_queue:
+            self.waiting[drone] += self._clip(queued_at, self.duration)
+        return self.report()
+
+    def report(self) -> Dict:
+        duration = self.duration
+        drone_count = len(self.batteries)
+        fleet_minutes = drone_count * duration or 1.0
+        idle = [max(0.0, duration - f - c - w) for f, c, w in zip(self.flying, self.charging, self.waiting)]
+        missed = {zone_id: round(duration - covered, 1) for zone_id, covered in self.covered.items()}
+        return {
+            "drones": drone_count,
+            "docks": self.dock_count,
+            "startplaatsen": self.pad_count,
+            "drone_utilization": round(sum(self.flying) / fleet_minutes, 3),
+            "charging_fraction": round(sum(self.charging) / fleet_minutes, 3),
+            "dock_queue_fraction": round(sum(self.waiting) / fleet_minutes, 3),
+            "idle_fraction": round(sum(idle) / fleet_minutes, 3),
+            "dock_utilization": round(self.dock_busy / (self.dock_count * duration), 3) if self.dock_count else 0.0,
+            "avg_dock_wait_minutes": round(sum(self.queue_waits) / len(self.queue_waits), 1) if self.queue_waits else 0.0,
+            "max_dock_wait_minutes": round(max(self.queue_waits), 1) if self.queue_waits else 0.0,
+            "coverage_fraction": round(sum(self.covered.values()) / (len(self.covered) * duration), 3) if self.covered else 1.0,
+            "missed_coverage_minutes": round(sum(missed.values()), 1),
+            "missed_coverage_per_zone": missed,
+        }
+
+
+def run_scenario(event: Dict, scenario: Dict) -> Dict:
+    """Run one what-if scenario against loaded event data (see load_event).
+
+    scenario may override "drones", "docks" and "startplaatsen" counts and any
+    DEFAULT_SCENARIO parameter. Extra drones beyond the real fleet start full;
+    with fewer, the best-charged drones are used.
+    """
+    batteries = sorted(event["batteries"], reverse=True)
+    drone_count = scenario.get("drones")
+    if drone_count is not None:
+        batteries = (batteries + [100.0] * drone_count)[:drone_count]
+    params = {key: value for key, value in scenario.items() if key in DEFAULT_SCENARIO}
+    simulation = Simulation(
+        zones=event["zones"],
+        batteries=batteries,
+        dock_count=scenario.get("docks", event["dock_count"]),
+        pad_count=scenario.get("startplaatsen", event["pad_count"]),
+        duration=event["duration_minutes"],
+        params=params,
+    )
+    return {"scenario": scenario, **simulation.run()}
+
+
+def run_sweep(event: Dict, scenarios: List[Dict], workers: Optional[int] = None) -> List[Dict]:
+    """Run scenarios in parallel, one process per core by default."""
+    if len(scenarios) == 1:
+        return [run_scenario(event, scenarios[0])]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        return list(pool.map(run_scenario, itertools.repeat(event), scenarios))
+
+
+def load_event(event_id: int) -> Dict:
+    """Load an Evenement with its zones, startplaatsen, docks and usable drones."""
+    from .helpers import EvenementHelper, ZoneHelper, StartplaatsHelper, DockingHelper, DroneHelper
+    from .helpers.cycle_index import time_to_seconds
+
+    event = EvenementHelper.get_event_by_id(event_id)
+    if not event:
+        raise ValueError(f"Event {event_id} does not exist.")
+    drones = [d for d in DroneHelper.get_all_drones() if d["status"] in ("AVAILABLE", "IN_USE")]
+    return {
+        "event_id": event_id,
+        "duration_minutes": time_to_seconds(event["Tijdsduur"]) / 60.0,
+        "zones": [{"Id": z["Id"], "naam": z["naam"]} for z in ZoneHelper.get_zones_by_event(event_id)],
+        "batteries": [float(d["batterij"]) for d in drones],
+        "dock_count": len(DockingHelper.get_all_dockings()),
+        "pad_count": len(StartplaatsHelper.get_all_startplaatsen()),
+    }
+
+
+def _int_list(value: str) -> List[Optional[int]]:
+    return [int(v) for v in value.split(",")] if value else [None]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Simulate drone and dock capacity for an event.")
+    parser.add_argument("--event-id", type=int, required=True)
+    parser.add_argument("--drones", type=_int_list, default=[None], help="comma-separated fleet sizes")
+    parser.add_argument("--docks", type=_int_list, default=[None], help="comma-separated dock counts")
+    parser.add_argument("--startplaatsen", type=_int_list, default=[None], help="comma-separated startplaats counts")
+    for name, default in DEFAULT_SCENARIO.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=default)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    params = {name: getattr(args, name) for name in DEFAULT_SCENARIO}
+    scenarios = []
+    for drones, docks, pads in itertools.product(args.drones, args.docks, args.startplaatsen):
+        scenario = dict(params)
+        for key, value in (("drones", drones), ("docks", docks), ("startplaatsen", pads)):
+            if value is not None:
+                scenario[key] = value
+        scenarios.append(scenario)
+
+    try:
+        event = load_event(args.event_id)
+        # Fail before starting the pool rather than in every worker
+        for scenario in scenarios:
+            validate_scenario({**DEFAULT_SCENARIO, **{k: v for k, v in scenario.items() if k in DEFAULT_SCENARIO}},
+                              event["duration_minutes"], scenario.get("docks", event["dock_count"]),
+                              scenario.get("startplaatsen", event["pad_count"]))
+        results = run_sweep(event, scenarios, args.workers)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Full database snapshot and restore, for seeding staging, benchmarks or offline field servers.
+
+    python -m api.snapshot dump ./snapshots/2024-06-01 [--tables Drone Docking] [--compression zstd]
+    python -m api.snapshot restore ./snapshots/2024-06-01
+    python -m api.snapshot info ./snapshots/2024-06-01
+
+Every table is written to an Arrow IPC file (see SnapshotHelper). Restore needs
+an empty database with the schema from db.sql and keeps the original Ids.
+"info" reads the files memory-mapped, like analytics code would through
+SnapshotHelper.read_table(). Requires pyarrow.
+"""
+from typing import List, Optional
+import argparse
+import json
+import sys
+import time
+from .helpers.snapshot_helper import SnapshotHelper
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Dump or restore all Drone Manager tables.")
+    parser.add_argument("command", choices=["dump", "restore", "info"])
+    parser.add_argument("directory")
+    parser.add_argument("--tables", nargs="+", help="only these tables (default: all)")
+    parser.add_argument("--compression", choices=["zstd", "lz4"], help="smaller files, but no zero-copy reads")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        if args.command == "dump":
+            result = SnapshotHelper.dump(args.directory, args.tables, args.compression)
+        elif args.command == "restore":
+            result = SnapshotHelper.restore(args.directory, args.tables)
+        else:
+            manifest = SnapshotHelper.read_manifest(args.directory)
+            result = {"created": manifest["created"], "compression": manifest["compression"], "tables": {}}
+            for table in manifest["tables"]:
+                data = SnapshotHelper.read_table(args.directory, table)
+                result["tables"][table] = {"rows": data.num_rows, "bytes": data.nbytes,
+                                           "columns": data.schema.names}
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(result, indent=2, default=str))
+    print(f"{args.command} took {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
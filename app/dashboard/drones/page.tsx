@@ -18,7 +18,29 @@ export default function DronesPage() {
   const [drones, setDrones] = useState<Drone[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
-  const { getDrones } = useDrones;
+  const { getDrones, subscribeDrones } = useDrones;
+
+  // Live updates replace the page reload after add/edit/delete
+  useEffect(
+    () =>
+      subscribeDrones(
+        (snapshot) => setDrones(snapshot),
+        (type, change) =>
+          setDrones((current) => {
+            if (type === "deleted") {
+              return current.filter((d) => d.Id !== change.Id);
+            }
+            const index = current.findIndex((d) => d.Id === change.Id);
+            if (index === -1) {
+              return [...current, change as Drone];
+            }
+            const next = [...current];
+            next[index] = { ...next[index], ...change };
+            return next;
+          })
+      ),
+    [subscribeDrones]
+  );
 
   useEffect(() => {
     const loadDrones = async () => {
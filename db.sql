@@ -90,4 +90,417 @@ CREATE INDEX "idx_vluchtcyclus_zone" ON "VluchtCyclus"("ZoneId");
 CREATE INDEX "idx_dockingcyclus_drone" ON "DockingCyclus"("DroneId");
 CREATE INDEX "idx_dockingcyclus_docking" ON "DockingCyclus"("DockingId");
 CREATE INDEX "idx_dockingcyclus_cyclus" ON "DockingCyclus"("CyclusId");
-CREATE INDEX "idx_cyclus_vluchtcyclus" ON "Cyclus"("VluchtCyclusId"); 
\ No newline at end of file
+CREATE INDEX "idx_cyclus_vluchtcyclus" ON "Cyclus"("VluchtCyclusId"); 
+
+-- Functions called through supabase.rpc(...)
+
+-- Charging scheduler: claims the docks and creates the Cyclus/DockingCyclus rows in one transaction.
+-- assignments: [{"DroneId": 1, "DockingId": 2, "startuur": "14:00:00", "tijdstip": "15:10:00"}, ...]
+CREATE OR REPLACE FUNCTION "schedule_charging"(assignments JSONB)
+RETURNS SETOF "DockingCyclus"
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    claimed INTEGER;
+BEGIN
+    UPDATE "Docking" SET "isbeschikbaar" = FALSE
+    WHERE "Id" IN (SELECT (a->>'DockingId')::INTEGER FROM jsonb_array_elements(assignments) a)
+      AND "isbeschikbaar";
+    GET DIAGNOSTICS claimed = ROW_COUNT;
+    IF claimed <> jsonb_array_length(assignments) THEN
+        RAISE EXCEPTION 'Docking station no longer available';
+    END IF;
+
+    RETURN QUERY
+    WITH input AS (
+        SELECT a, nextval(pg_get_serial_sequence('"Cyclus"', 'Id'))::INTEGER AS cyclus_id
+        FROM jsonb_array_elements(assignments) a
+    ), new_cycli AS (
+        INSERT INTO "Cyclus" ("Id", "startuur", "tijdstip")
+        SELECT cyclus_id, (a->>'startuur')::TIME, (a->>'tijdstip')::TIME FROM input
+    )
+    INSERT INTO "DockingCyclus" ("DroneId", "DockingId", "CyclusId")
+    SELECT (a->>'DroneId')::INTEGER, (a->>'DockingId')::INTEGER, cyclus_id FROM input
+    RETURNING *;
+END;
+$$;
+
+-- Reservations: a claimed Startplaats/Docking is unavailable until "gereserveerdTot", after which
+-- the next reserve_resources call may claim it again. Confirming a reservation keeps the claim.
+ALTER TABLE "Startplaats"
+    ADD COLUMN IF NOT EXISTS "gereserveerdTot" TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS "reserveringToken" UUID;
+ALTER TABLE "Docking"
+    ADD COLUMN IF NOT EXISTS "gereserveerdTot" TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS "reserveringToken" UUID;
+
+-- Claims `aantal` free rows of "Startplaats" or "Docking" atomically. Concurrent callers skip
+-- each other's locked rows instead of waiting, and the call fails as a whole if too few are free.
+CREATE OR REPLACE FUNCTION "reserve_resources"(tabel TEXT, aantal INTEGER, ttl_seconds INTEGER)
+RETURNS TABLE("Id" INTEGER, "locatie" VARCHAR, "gereserveerdTot" TIMESTAMPTZ, "reserveringToken" UUID)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    token UUID := gen_random_uuid();
+    claimed INTEGER;
+BEGIN
+    IF tabel NOT IN ('Startplaats', 'Docking') THEN
+        RAISE EXCEPTION 'Unknown reservable table %', tabel;
+    END IF;
+    IF aantal < 1 OR ttl_seconds < 1 THEN
+        RAISE EXCEPTION 'aantal and ttl_seconds must be positive';
+    END IF;
+
+    RETURN QUERY EXECUTE format($q$
+        WITH picked AS (
+            SELECT t."Id" FROM %1$I t
+            WHERE t."isbeschikbaar" OR t."gereserveerdTot" < now()
+            ORDER BY t."Id"
+            LIMIT $1
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE %1$I t
+        SET "isbeschikbaar" = FALSE,
+            "gereserveerdTot" = now() + make_interval(secs => $2),
+            "reserveringToken" = $3
+        FROM picked
+        WHERE t."Id" = picked."Id"
+        RETURNING t."Id", t."locatie", t."gereserveerdTot", t."reserveringToken"
+    $q$, tabel) USING aantal, ttl_seconds, token;
+
+    GET DIAGNOSTICS claimed = ROW_COUNT;
+    IF claimed < aantal THEN
+        RAISE EXCEPTION 'Not enough free % rows: requested %, only % free', tabel, aantal, claimed;
+    END IF;
+END;
+$$;
+
+-- Ends a reservation: bevestigen = FALSE frees the rows, TRUE keeps them claimed without expiry.
+CREATE OR REPLACE FUNCTION "end_reservation"(tabel TEXT, token UUID, bevestigen BOOLEAN DEFAULT FALSE)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    affected INTEGER;
+BEGIN
+    IF tabel NOT IN ('Startplaats', 'Docking') THEN
+        RAISE EXCEPTION 'Unknown reservable table %', tabel;
+    END IF;
+
+    EXECUTE format($q$
+        UPDATE %1$I
+        SET "isbeschikbaar" = $2 IS NOT TRUE,
+            "gereserveerdTot" = NULL,
+            "reserveringToken" = NULL
+        WHERE "reserveringToken" = $1
+          AND ($2 IS NOT TRUE OR "gereserveerdTot" >= now())
+    $q$, tabel) USING token, bevestigen;
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END;
+$$;
+
+-- Responses stored per Idempotency-Key when IDEMPOTENCY_BACKEND=supabase. A row with a NULL
+-- "status" is a request still in progress on some instance.
+CREATE TABLE IF NOT EXISTS "IdempotencyKey" (
+    "key" VARCHAR(255) PRIMARY KEY,
+    "fingerprint" CHAR(64) NOT NULL,
+    "status" INTEGER,
+    "body" TEXT,
+    "contentType" VARCHAR(255),
+    "verlooptOp" TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX IF NOT EXISTS "IdempotencyKey_verlooptOp_idx" ON "IdempotencyKey" ("verlooptOp");
+
+-- Change journal for delta sync (GET /api/changes?since=). Filled by a trigger on every table in
+-- the same transaction as the write, so helper writes and RPC writes are journaled alike.
+-- "kolommen" lists the changed columns and "gegevens" holds their new values (NULL for deletes).
+CREATE TABLE IF NOT EXISTS "Wijziging" (
+    "seq" BIGSERIAL PRIMARY KEY,
+    "tabel" TEXT NOT NULL,
+    "rijId" INTEGER NOT NULL,
+    "operatie" TEXT NOT NULL CHECK ("operatie" IN ('INSERT', 'UPDATE', 'DELETE')),
+    "kolommen" TEXT[] NOT NULL DEFAULT '{}',
+    "gegevens" JSONB,
+    "tijdstip" TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS "idx_wijziging_tabel_seq" ON "Wijziging" ("tabel", "seq");
+CREATE INDEX IF NOT EXISTS "idx_wijziging_rij" ON "Wijziging" ("tabel", "rijId", "seq");
+
+-- Highest seq removed by retention; clients asking for changes since an older seq must resync.
+CREATE TABLE IF NOT EXISTS "WijzigingHorizon" (
+    "Id" INTEGER PRIMARY KEY DEFAULT 1 CHECK ("Id" = 1),
+    "gesnoeidTot" BIGINT NOT NULL DEFAULT 0
+);
+INSERT INTO "WijzigingHorizon" ("Id") VALUES (1) ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION "journal_change"()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    nieuw JSONB;
+    oud JSONB;
+    gewijzigd JSONB;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO "Wijziging" ("tabel", "rijId", "operatie")
+        VALUES (TG_TABLE_NAME, OLD."Id", 'DELETE');
+        RETURN OLD;
+    END IF;
+
+    nieuw := to_jsonb(NEW);
+    IF TG_OP = 'INSERT' THEN
+        gewijzigd := nieuw;
+    ELSE
+        oud := to_jsonb(OLD);
+        SELECT COALESCE(jsonb_object_agg(n.key, n.value), '{}'::jsonb) INTO gewijzigd
+        FROM jsonb_each(nieuw) n
+        WHERE oud -> n.key IS DISTINCT FROM n.value;
+        IF gewijzigd = '{}'::jsonb THEN
+            RETURN NEW; -- No-op update, nothing to sync
+        END IF;
+    END IF;
+
+    INSERT INTO "Wijziging" ("tabel", "rijId", "operatie", "kolommen", "gegevens")
+    VALUES (TG_TABLE_NAME, NEW."Id", TG_OP, ARRAY(SELECT jsonb_object_keys(gewijzigd)), gewijzigd);
+    RETURN NEW;
+END;
+$$;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['Evenement', 'Zone', 'Startplaats', 'Verslag', 'Drone', 'Docking',
+                             'Cyclus', 'VluchtCyclus', 'DockingCyclus'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS "journal_change" ON %I', t);
+        EXECUTE format('CREATE TRIGGER "journal_change" AFTER INSERT OR UPDATE OR DELETE ON %I
+                        FOR EACH ROW EXECUTE FUNCTION "journal_change"()', t);
+    END LOOP;
+END;
+$$;
+
+-- Compaction: entries older than `ouder_dan` collapse into one per row (the latest seq), with the
+-- changed columns merged. A row inserted and later updated stays an INSERT; a deleted row keeps
+-- only its DELETE. Retention: entries older than `bewaren` are dropped and the horizon advanced.
+CREATE OR REPLACE FUNCTION "compact_changes"(ouder_dan INTERVAL, bewaren INTERVAL)
+RETURNS TABLE("samengevoegd" BIGINT, "verwijderd" BIGINT)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    grens TIMESTAMPTZ := now() - ouder_dan;
+    samen BIGINT;
+    weg BIGINT;
+    horizon BIGINT;
+BEGIN
+    WITH groepen AS (
+        SELECT "tabel", "rijId", max("seq") AS laatste,
+               bool_or("operatie" = 'INSERT') AS ingevoegd,
+               (array_agg("operatie" ORDER BY "seq" DESC))[1] AS laatste_operatie,
+               count(*) AS aantal
+        FROM "Wijziging"
+        WHERE "tijdstip" < grens
+        GROUP BY "tabel", "rijId"
+        HAVING count(*) > 1
+    ), samengevoegd AS (
+        SELECT g.laatste,
+               CASE WHEN g.laatste_operatie = 'DELETE' THEN 'DELETE'
+                    WHEN g.ingevoegd THEN 'INSERT' ELSE 'UPDATE' END AS operatie,
+               (SELECT jsonb_object_agg(e.key, e.value ORDER BY w."seq")
+                FROM "Wijziging" w, jsonb_each(COALESCE(w."gegevens", '{}'::jsonb)) e
+                WHERE w."tabel" = g."tabel" AND w."rijId" = g."rijId" AND w."tijdstip" < grens) AS gegevens
+        FROM groepen g
+    ), bijgewerkt AS (
+        UPDATE "Wijziging" w
+        SET "operatie" = s.operatie,
+            "gegevens" = CASE WHEN s.operatie = 'DELETE' THEN NULL ELSE s.gegevens END,
+            "kolommen" = CASE WHEN s.operatie = 'DELETE' THEN '{}'
+                              ELSE ARRAY(SELECT jsonb_object_keys(COALESCE(s.gegevens, '{}'::jsonb))) END
+        FROM samengevoegd s
+        WHERE w."seq" = s.laatste
+        RETURNING w."tabel", w."rijId", w."seq"
+    )
+    DELETE FROM "Wijziging" w
+    USING bijgewerkt b
+    WHERE w."tabel" = b."tabel" AND w."rijId" = b."rijId" AND w."seq" < b."seq" AND w."tijdstip" < grens;
+    GET DIAGNOSTICS samen = ROW_COUNT;
+
+    SELECT max("seq") INTO horizon FROM "Wijziging" WHERE "tijdstip" < now() - bewaren;
+    DELETE FROM "Wijziging" WHERE "seq" <= horizon;
+    GET DIAGNOSTICS weg = ROW_COUNT;
+    IF horizon IS NOT NULL THEN
+        UPDATE "WijzigingHorizon" SET "gesnoeidTot" = GREATEST("gesnoeidTot", horizon) WHERE "Id" = 1;
+    END IF;
+
+    RETURN QUERY SELECT samen, weg;
+END;
+$$;
+
+-- Full-text search over Verslag. An expression index instead of a stored tsvector column keeps
+-- select("*") and the change journal free of search internals. Onderwerp weighs more than inhoud.
+CREATE OR REPLACE FUNCTION "verslag_zoekvector"(onderwerp TEXT, inhoud TEXT)
+RETURNS tsvector
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT setweight(to_tsvector('dutch'::regconfig, coalesce(onderwerp, '')), 'A')
+        || setweight(to_tsvector('dutch'::regconfig, coalesce(inhoud, '')), 'B');
+$$;
+CREATE INDEX IF NOT EXISTS "idx_verslag_zoekvector" ON "Verslag"
+    USING GIN ("verslag_zoekvector"("onderwerp", "inhoud"));
+
+-- Ranked search with highlighted snippets. Keyset pagination on (rank DESC, Id): pass the last
+-- row's rank and Id as na_rank/na_id to get the next page.
+CREATE OR REPLACE FUNCTION "search_verslagen"(zoekterm TEXT, aantal INTEGER DEFAULT 20,
+                                              na_rank REAL DEFAULT NULL, na_id INTEGER DEFAULT NULL)
+RETURNS TABLE("Id" INTEGER, "onderwerp" VARCHAR, "isverzonden" BOOLEAN, "isgeaccepteerd" BOOLEAN,
+              "rank" REAL, "snippet" TEXT)
+LANGUAGE sql STABLE
+AS $$
+    WITH q AS (SELECT websearch_to_tsquery('dutch'::regconfig, zoekterm) AS query),
+    hits AS (
+        SELECT v."Id", v."onderwerp", v."inhoud", v."isverzonden", v."isgeaccepteerd",
+               ts_rank_cd("verslag_zoekvector"(v."onderwerp", v."inhoud"), q.query) AS rank, q.query
+        FROM "Verslag" v, q
+        WHERE "verslag_zoekvector"(v."onderwerp", v."inhoud") @@ q.query
+    )
+    SELECT h."Id", h."onderwerp", h."isverzonden", h."isgeaccepteerd", h.rank,
+           ts_headline('dutch'::regconfig, h."inhoud", h.query,
+                       'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=20, MinWords=8')
+    FROM hits h
+    WHERE na_rank IS NULL OR h.rank < na_rank OR (h.rank = na_rank AND h."Id" > na_id)
+    ORDER BY h.rank DESC, h."Id"
+    LIMIT aantal;
+$$;
+
+-- Chunked report bodies (PUT/GET /api/verslagen/<id>/content). A chunked body lives in
+-- "VerslagBlok" under a version number; "Verslag"."inhoud" then only holds a preview.
+-- Length and digest describe the full body either way, so list endpoints can skip "inhoud".
+ALTER TABLE "Verslag"
+    ADD COLUMN IF NOT EXISTS "inhoudVersie" INTEGER,
+    ADD COLUMN IF NOT EXISTS "inhoudBlokken" INTEGER,
+    ADD COLUMN IF NOT EXISTS "inhoudBlokGrootte" INTEGER,
+    ADD COLUMN IF NOT EXISTS "inhoudLengte" BIGINT,
+    ADD COLUMN IF NOT EXISTS "inhoudDigest" CHAR(64);
+
+CREATE TABLE IF NOT EXISTS "VerslagBlok" (
+    "VerslagId" INTEGER NOT NULL REFERENCES "Verslag"("Id") ON DELETE CASCADE,
+    "versie" INTEGER NOT NULL,
+    "volgnummer" INTEGER NOT NULL,
+    "data" TEXT NOT NULL,                       -- base64, zlib-compressed when "gecomprimeerd"
+    "gecomprimeerd" BOOLEAN NOT NULL DEFAULT FALSE,
+    PRIMARY KEY ("VerslagId", "versie", "volgnummer")
+);
+
+-- Inline bodies get their length/digest here. Writing "inhoud" directly (create_verslag,
+-- update_verslag) replaces a chunked body.
+CREATE OR REPLACE FUNCTION "verslag_inhoud_meta"()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW."inhoudVersie" IS NOT DISTINCT FROM OLD."inhoudVersie" THEN
+        IF NEW."inhoud" IS NOT DISTINCT FROM OLD."inhoud" THEN
+            RETURN NEW;
+        END IF;
+        IF OLD."inhoudVersie" IS NOT NULL THEN
+            DELETE FROM "VerslagBlok" WHERE "VerslagId" = OLD."Id";
+            NEW."inhoudVersie" := NULL;
+        END IF;
+    END IF;
+    IF NEW."inhoudVersie" IS NULL THEN
+        NEW."inhoudBlokken" := NULL;
+        NEW."inhoudBlokGrootte" := NULL;
+        NEW."inhoudLengte" := octet_length(NEW."inhoud");
+        NEW."inhoudDigest" := encode(sha256(convert_to(NEW."inhoud", 'UTF8')), 'hex');
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS "verslag_inhoud_meta" ON "Verslag";
+CREATE TRIGGER "verslag_inhoud_meta" BEFORE INSERT OR UPDATE ON "Verslag"
+    FOR EACH ROW EXECUTE FUNCTION "verslag_inhoud_meta"();
+
+UPDATE "Verslag" SET "inhoudLengte" = octet_length("inhoud"),
+                     "inhoudDigest" = encode(sha256(convert_to("inhoud", 'UTF8')), 'hex')
+WHERE "inhoudLengte" IS NULL;
+
+-- Computed column for list endpoints: select("..., inhoudVoorbeeld") returns the first 200 characters.
+CREATE OR REPLACE FUNCTION "inhoudVoorbeeld"("Verslag")
+RETURNS TEXT
+LANGUAGE sql STABLE
+AS $$
+    SELECT left($1."inhoud", 200);
+$$;
+
+-- Snapshot restore (python -m api.snapshot restore) inserts rows with their original Ids.
+-- Afterwards the Verslag -> VluchtCyclus links, which form a cycle with VluchtCyclus.VerslagId,
+-- are filled in, and every Id sequence is moved past the restored rows.
+-- koppelingen: [{"Id": 1, "VluchtCyclusId": 2}, ...]
+CREATE OR REPLACE FUNCTION "restore_verslag_links"(koppelingen JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    affected INTEGER;
+BEGIN
+    UPDATE "Verslag" v SET "VluchtCyclusId" = k."VluchtCyclusId"
+    FROM jsonb_to_recordset(koppelingen) AS k("Id" INTEGER, "VluchtCyclusId" INTEGER)
+    WHERE v."Id" = k."Id";
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION "restore_sequences"()
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    tabel TEXT;
+BEGIN
+    FOREACH tabel IN ARRAY ARRAY['Evenement', 'Zone', 'Startplaats', 'Verslag', 'Drone', 'Docking',
+                                 'Cyclus', 'VluchtCyclus', 'DockingCyclus'] LOOP
+        EXECUTE format('SELECT setval(pg_get_serial_sequence(%L, ''Id''), COALESCE(max("Id"), 0) + 1, false) FROM %I',
+                       format('%I', tabel), tabel);
+    END LOOP;
+END;
+$$;
+
+-- Event KPIs for GET /api/dashboard/events/<id> in one statement. Drones are linked to the event
+-- through VluchtCyclus.ZoneId -> Zone.EvenementId. A cycle counts as completed once it has ended
+-- on the event's last day. No row when the event does not exist.
+CREATE OR REPLACE FUNCTION "event_kpis"(evenement INTEGER)
+RETURNS TABLE(zones BIGINT, active_drones BIGINT, flight_cycles BIGINT, planned_cycles BIGINT,
+              completed_cycles BIGINT, average_cycle_minutes NUMERIC, reports BIGINT,
+              reports_sent BIGINT, reports_accepted BIGINT)
+LANGUAGE sql STABLE
+AS $$
+    WITH ev AS (
+        SELECT * FROM "Evenement" WHERE "Id" = evenement
+    ), vc AS (
+        SELECT vc.* FROM "VluchtCyclus" vc JOIN "Zone" z ON z."Id" = vc."ZoneId"
+        WHERE z."EvenementId" = evenement
+    ), cy AS (
+        SELECT c.*, CASE WHEN c."tijdstip" > c."startuur" THEN c."tijdstip" - c."startuur"
+                         ELSE c."tijdstip" - c."startuur" + INTERVAL '24 hours' END AS duur
+        FROM "Cyclus" c WHERE c."VluchtCyclusId" IN (SELECT "Id" FROM vc)
+    ), vs AS (
+        SELECT * FROM "Verslag" WHERE "Id" IN (SELECT "VerslagId" FROM vc)
+    )
+    SELECT
+        (SELECT count(*) FROM "Zone" WHERE "EvenementId" = evenement),
+        (SELECT count(DISTINCT "DroneId") FROM vc),
+        (SELECT count(*) FROM vc),
+        (SELECT count(*) FROM cy),
+        (SELECT count(*) FROM cy WHERE ev."EindDatum" + cy."startuur" + cy.duur <= LOCALTIMESTAMP),
+        (SELECT round(extract(epoch FROM avg(duur)) / 60, 1) FROM cy),
+        (SELECT count(*) FROM vs),
+        (SELECT count(*) FROM vs WHERE "isverzonden"),
+        (SELECT count(*) FROM vs WHERE "isgeaccepteerd")
+    FROM ev;
+$$;
+
+-- Schema changes after this point are versioned migrations in migrations/ (python -m api.migrate up).
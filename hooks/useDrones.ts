@@ -1,6 +1,33 @@
 import { Drone } from "@/app/types";
 
 const apiUrl = "https://drone.ziasvannes.tech/api/drones";
+const streamUrl = "https://drone.ziasvannes.tech/api/stream/drones";
+
+type DroneChange = Partial<Drone> & { Id: number };
+
+// Live updates instead of polling or reloading after a write: onSnapshot gets the
+// full list on every (re)connect, onChange each created/updated/deleted drone.
+// Returns a cleanup, so it can be returned from useEffect directly.
+function subscribeDrones(
+  onSnapshot: (drones: Drone[]) => void,
+  onChange: (type: "created" | "updated" | "deleted", drone: DroneChange) => void
+): () => void {
+  const source = new EventSource(streamUrl);
+
+  source.addEventListener("snapshot", (e) =>
+    onSnapshot(JSON.parse((e as MessageEvent).data) as Drone[])
+  );
+  for (const type of ["created", "updated", "deleted"] as const) {
+    source.addEventListener(type, (e) =>
+      onChange(type, JSON.parse((e as MessageEvent).data) as DroneChange)
+    );
+  }
+  // The server ends the stream after "resync"; EventSource reconnects and a new snapshot follows
+  source.addEventListener("resync", () => console.warn("Drone stream resyncing"));
+  source.onerror = () => console.warn("Drone stream disconnected, retrying");
+
+  return () => source.close();
+}
 
 async function getDrones(): Promise<Drone[]> {
   console.log(`Server-side fetch initiated for: ${apiUrl}`);
@@ -48,8 +75,7 @@ const handleDelete = async (id: number) => {
     if (!res.ok) {
       throw new Error("Failed to delete drone");
     }
-
-    window.location.reload();
+    // The drone stream (subscribeDrones) removes it from the list
   } catch (error) {
     console.error("Error deleting drone:", error);
     alert("Er is een fout opgetreden bij het verwijderen van de drone.");
@@ -95,7 +121,6 @@ const handleAddDrone = async (
     } as Drone);
 
     alert("Drone succesvol toegevoegd!");
-    window.location.reload();
   } catch (error) {
     console.error("Error adding drone:", error);
     setError(error instanceof Error ? error.message : "Failed to add drone");
@@ -143,7 +168,6 @@ const handleUpdateDrone = async (
     } as Drone);
 
     alert("Drone successfully updated!");
-    window.location.reload();
   } catch (error) {
     console.error("Error updating drone:", error);
     setError(error instanceof Error ? error.message : "Failed to update drone");
@@ -154,6 +178,7 @@ const handleUpdateDrone = async (
 
 export default {
   getDrones,
+  subscribeDrones,
   handleDelete,
   handleAddDrone,
   handleUpdateDrone,
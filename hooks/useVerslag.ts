@@ -6,7 +6,8 @@ async function getVerslagen(): Promise<Verslag[]> {
   console.log(`Server-side fetch initiated for: ${apiUrl}`);
 
   try {
-    const res = await fetch(apiUrl, {
+    // full=true: the list and edit dialogs show and edit the whole inhoud
+    const res = await fetch(`${apiUrl}?full=true`, {
       cache: "no-store",
       headers: {
         Accept: "application/json",
@@ -0,0 +1,21 @@
+-- migrate: no-transaction
+-- Indexes for the filters the helpers use most, which db.sql leaves unindexed (it only indexes
+-- foreign keys). Built CONCURRENTLY so writes continue while they build.
+
+-- DroneHelper.get_available_drones / get_flight_ready_drones
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "idx_drone_status_magopstijgen" ON "Drone" ("status", "magOpstijgen");
+
+-- get_available_startplaatsen / get_available_docking and the first half of reserve_resources
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "idx_startplaats_beschikbaar" ON "Startplaats" ("Id") WHERE "isbeschikbaar";
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "idx_docking_beschikbaar" ON "Docking" ("Id") WHERE "isbeschikbaar";
+
+-- Second half of reserve_resources ("gereserveerdTot" < now()); only reserved rows have a value
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "idx_startplaats_gereserveerd" ON "Startplaats" ("gereserveerdTot") WHERE "gereserveerdTot" IS NOT NULL;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "idx_docking_gereserveerd" ON "Docking" ("gereserveerdTot") WHERE "gereserveerdTot" IS NOT NULL;
+
+-- VerslagHelper.get_verslagen_by_status
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "idx_verslag_status" ON "Verslag" ("isverzonden", "isgeaccepteerd");
+
+-- Date-range filters on events (export scope, archival of finished events)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "idx_evenement_periode" ON "Evenement" ("StartDatum", "EindDatum");
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "idx_evenement_einddatum" ON "Evenement" ("EindDatum");
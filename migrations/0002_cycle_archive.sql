@@ -0,0 +1,118 @@
+-- Hot/cold split of the cycle tables. The cycles of an event that has ended are moved out of
+-- Cyclus, VluchtCyclus and DockingCyclus into archive tables by archive_event(), so the live
+-- tables (and the helpers, the cycle index and the analytics that read them) only carry the
+-- events still being planned or flown. The *Historie views read both for history queries.
+
+-- Same columns as the live table, the original Id, the event it belonged to and when it moved.
+-- No foreign keys: archived rows may point at zones, drones and pads that are deleted later.
+CREATE TABLE "VluchtCyclusArchief" (LIKE "VluchtCyclus");
+ALTER TABLE "VluchtCyclusArchief"
+    ADD PRIMARY KEY ("Id"),
+    ADD COLUMN "EvenementId" INTEGER NOT NULL,
+    ADD COLUMN "gearchiveerdOp" TIMESTAMPTZ NOT NULL DEFAULT now();
+
+CREATE TABLE "CyclusArchief" (LIKE "Cyclus");
+ALTER TABLE "CyclusArchief"
+    ADD PRIMARY KEY ("Id"),
+    ADD COLUMN "EvenementId" INTEGER NOT NULL,
+    ADD COLUMN "gearchiveerdOp" TIMESTAMPTZ NOT NULL DEFAULT now();
+
+CREATE TABLE "DockingCyclusArchief" (LIKE "DockingCyclus");
+ALTER TABLE "DockingCyclusArchief"
+    ADD PRIMARY KEY ("Id"),
+    ADD COLUMN "EvenementId" INTEGER NOT NULL,
+    ADD COLUMN "gearchiveerdOp" TIMESTAMPTZ NOT NULL DEFAULT now();
+
+CREATE INDEX "idx_vluchtcyclusarchief_evenement" ON "VluchtCyclusArchief" ("EvenementId");
+CREATE INDEX "idx_cyclusarchief_evenement" ON "CyclusArchief" ("EvenementId");
+CREATE INDEX "idx_dockingcyclusarchief_evenement" ON "DockingCyclusArchief" ("EvenementId");
+
+-- One row per archived event with what was moved; also tells the archival job what is done
+CREATE TABLE "EvenementArchief" (
+    "EvenementId" INTEGER PRIMARY KEY REFERENCES "Evenement"("Id") ON DELETE CASCADE,
+    "gearchiveerdOp" TIMESTAMPTZ NOT NULL DEFAULT now(),
+    "vluchtCycli" INTEGER NOT NULL,
+    "cycli" INTEGER NOT NULL,
+    "dockingCycli" INTEGER NOT NULL
+);
+
+CREATE VIEW "VluchtCyclusHistorie" AS
+    SELECT "Id", "VerslagId", "PlaatsId", "DroneId", "ZoneId", FALSE AS "gearchiveerd" FROM "VluchtCyclus"
+    UNION ALL
+    SELECT "Id", "VerslagId", "PlaatsId", "DroneId", "ZoneId", TRUE FROM "VluchtCyclusArchief";
+
+CREATE VIEW "CyclusHistorie" AS
+    SELECT "Id", "startuur", "tijdstip", "VluchtCyclusId", FALSE AS "gearchiveerd" FROM "Cyclus"
+    UNION ALL
+    SELECT "Id", "startuur", "tijdstip", "VluchtCyclusId", TRUE FROM "CyclusArchief";
+
+CREATE VIEW "DockingCyclusHistorie" AS
+    SELECT "Id", "DroneId", "DockingId", "CyclusId", FALSE AS "gearchiveerd" FROM "DockingCyclus"
+    UNION ALL
+    SELECT "Id", "DroneId", "DockingId", "CyclusId", TRUE FROM "DockingCyclusArchief";
+
+-- Moves the cycle tree of one ended event to the archive tables: its flight cycles (through its
+-- zones), their cycles and the docking cycles on those cycles. Set-based DELETE ... RETURNING
+-- into INSERT, children before parents, all in the caller's transaction, so the event is either
+-- fully archived or not at all. Verslag rows stay live; the ON DELETE SET NULL on
+-- Verslag.VluchtCyclusId clears their back link, VluchtCyclusArchief.VerslagId keeps it.
+CREATE OR REPLACE FUNCTION "archive_event"(evenement INTEGER)
+RETURNS TABLE("vluchtCycli" INTEGER, "cycli" INTEGER, "dockingCycli" INTEGER)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+    einde DATE;
+    vc_ids INTEGER[];
+    c_ids INTEGER[];
+    vc_count INTEGER;
+    c_count INTEGER;
+    dc_count INTEGER;
+BEGIN
+    -- Serializes concurrent archive runs of the same event and blocks edits to it meanwhile
+    SELECT "EindDatum" INTO einde FROM "Evenement" WHERE "Id" = evenement FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Evenement % not found', evenement USING ERRCODE = 'no_data_found';
+    END IF;
+    IF einde >= CURRENT_DATE THEN
+        RAISE EXCEPTION 'Evenement % has not ended yet (EindDatum %)', evenement, einde
+            USING ERRCODE = 'object_not_in_prerequisite_state';
+    END IF;
+
+    vc_ids := ARRAY(SELECT vc."Id" FROM "VluchtCyclus" vc JOIN "Zone" z ON z."Id" = vc."ZoneId"
+                    WHERE z."EvenementId" = evenement);
+    c_ids := ARRAY(SELECT "Id" FROM "Cyclus" WHERE "VluchtCyclusId" = ANY(vc_ids));
+
+    WITH moved AS (
+        DELETE FROM "DockingCyclus" WHERE "CyclusId" = ANY(c_ids) RETURNING *
+    )
+    INSERT INTO "DockingCyclusArchief" ("Id", "DroneId", "DockingId", "CyclusId", "EvenementId")
+    SELECT "Id", "DroneId", "DockingId", "CyclusId", evenement FROM moved;
+    GET DIAGNOSTICS dc_count = ROW_COUNT;
+
+    WITH moved AS (
+        DELETE FROM "Cyclus" WHERE "Id" = ANY(c_ids) RETURNING *
+    )
+    INSERT INTO "CyclusArchief" ("Id", "startuur", "tijdstip", "VluchtCyclusId", "EvenementId")
+    SELECT "Id", "startuur", "tijdstip", "VluchtCyclusId", evenement FROM moved;
+    GET DIAGNOSTICS c_count = ROW_COUNT;
+
+    WITH moved AS (
+        DELETE FROM "VluchtCyclus" WHERE "Id" = ANY(vc_ids) RETURNING *
+    )
+    INSERT INTO "VluchtCyclusArchief" ("Id", "VerslagId", "PlaatsId", "DroneId", "ZoneId", "EvenementId")
+    SELECT "Id", "VerslagId", "PlaatsId", "DroneId", "ZoneId", evenement FROM moved;
+    GET DIAGNOSTICS vc_count = ROW_COUNT;
+
+    -- Re-archiving an event (cycles added after an earlier run) adds to its totals
+    INSERT INTO "EvenementArchief" ("EvenementId", "vluchtCycli", "cycli", "dockingCycli")
+    VALUES (evenement, vc_count, c_count, dc_count)
+    ON CONFLICT ("EvenementId") DO UPDATE
+    SET "gearchiveerdOp" = now(),
+        "vluchtCycli" = "EvenementArchief"."vluchtCycli" + EXCLUDED."vluchtCycli",
+        "cycli" = "EvenementArchief"."cycli" + EXCLUDED."cycli",
+        "dockingCycli" = "EvenementArchief"."dockingCycli" + EXCLUDED."dockingCycli";
+
+    RETURN QUERY SELECT vc_count, c_count, dc_count;
+END;
+$$;
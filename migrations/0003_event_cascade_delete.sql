@@ -0,0 +1,57 @@
+-- Deletes an event with its whole operational tree in one call and one transaction: docking
+-- cycles on its cycles, the cycles of its flight cycles, the flight cycles in its zones, the
+-- zones, archived cycles of the event (migration 0002) and the event itself. Set-based deletes,
+-- children before parents, so no FK check fails halfway and nothing dangles afterwards.
+-- Verslag rows stay; their VluchtCyclusId is cleared by its ON DELETE SET NULL.
+-- Returns no row when the event does not exist.
+CREATE OR REPLACE FUNCTION "delete_event_cascade"(evenement INTEGER)
+RETURNS TABLE("zones" INTEGER, "vluchtCycli" INTEGER, "cycli" INTEGER, "dockingCycli" INTEGER,
+              "gearchiveerdeCycli" INTEGER)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+    zone_ids INTEGER[];
+    vc_ids INTEGER[];
+    c_ids INTEGER[];
+    z_count INTEGER;
+    vc_count INTEGER;
+    c_count INTEGER;
+    dc_count INTEGER;
+    a_count INTEGER;
+    n INTEGER;
+BEGIN
+    -- Blocks new zones for the event (their FK check) until the delete commits
+    PERFORM 1 FROM "Evenement" WHERE "Id" = evenement FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    zone_ids := ARRAY(SELECT "Id" FROM "Zone" WHERE "EvenementId" = evenement);
+    vc_ids := ARRAY(SELECT "Id" FROM "VluchtCyclus" WHERE "ZoneId" = ANY(zone_ids));
+    c_ids := ARRAY(SELECT "Id" FROM "Cyclus" WHERE "VluchtCyclusId" = ANY(vc_ids));
+
+    DELETE FROM "DockingCyclus" WHERE "CyclusId" = ANY(c_ids);
+    GET DIAGNOSTICS dc_count = ROW_COUNT;
+    DELETE FROM "Cyclus" WHERE "Id" = ANY(c_ids);
+    GET DIAGNOSTICS c_count = ROW_COUNT;
+    DELETE FROM "VluchtCyclus" WHERE "Id" = ANY(vc_ids);
+    GET DIAGNOSTICS vc_count = ROW_COUNT;
+    DELETE FROM "Zone" WHERE "Id" = ANY(zone_ids);
+    GET DIAGNOSTICS z_count = ROW_COUNT;
+
+    DELETE FROM "DockingCyclusArchief" WHERE "EvenementId" = evenement;
+    GET DIAGNOSTICS a_count = ROW_COUNT;
+    DELETE FROM "CyclusArchief" WHERE "EvenementId" = evenement;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    a_count := a_count + n;
+    DELETE FROM "VluchtCyclusArchief" WHERE "EvenementId" = evenement;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    a_count := a_count + n;
+
+    -- EvenementArchief follows through its ON DELETE CASCADE
+    DELETE FROM "Evenement" WHERE "Id" = evenement;
+
+    RETURN QUERY SELECT z_count, vc_count, c_count, dc_count, a_count;
+END;
+$$;
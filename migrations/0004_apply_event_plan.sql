@@ -0,0 +1,53 @@
+-- Writes a drone -> zone/startplaats plan (PlanningHelper) in one transaction: the drones go
+-- IN_USE, the startplaatsen are taken and the VluchtCyclus rows are created together, so a
+-- second plan cannot hand out the same drones and pads again. An event is planned once; a
+-- second call fails while the event has flight cycles.
+-- toewijzingen: [{"DroneId": 1, "ZoneId": 2, "PlaatsId": 3}, ...]
+CREATE OR REPLACE FUNCTION "apply_event_plan"(evenement INTEGER, toewijzingen JSONB)
+RETURNS SETOF "VluchtCyclus"
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    claimed INTEGER;
+    aantal INTEGER := jsonb_array_length(toewijzingen);
+BEGIN
+    -- Serializes concurrent plans of the same event
+    PERFORM 1 FROM "Evenement" WHERE "Id" = evenement FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Evenement % not found', evenement;
+    END IF;
+    IF EXISTS (SELECT 1 FROM "VluchtCyclus" vc JOIN "Zone" z ON z."Id" = vc."ZoneId"
+               WHERE z."EvenementId" = evenement) THEN
+        RAISE EXCEPTION 'Evenement % is already planned', evenement;
+    END IF;
+    IF EXISTS (SELECT 1 FROM jsonb_array_elements(toewijzingen) a
+               WHERE NOT EXISTS (SELECT 1 FROM "Zone" z
+                                 WHERE z."Id" = (a->>'ZoneId')::INTEGER AND z."EvenementId" = evenement)) THEN
+        RAISE EXCEPTION 'Plan contains zones outside evenement %', evenement;
+    END IF;
+
+    UPDATE "Drone" SET "status" = 'IN_USE'
+    WHERE "Id" IN (SELECT (a->>'DroneId')::INTEGER FROM jsonb_array_elements(toewijzingen) a)
+      AND "status" = 'AVAILABLE' AND "magOpstijgen";
+    GET DIAGNOSTICS claimed = ROW_COUNT;
+    IF claimed <> aantal THEN
+        RAISE EXCEPTION 'Drone no longer available';
+    END IF;
+
+    -- A pad whose reservation expired is free again, as in reserve_resources
+    UPDATE "Startplaats"
+    SET "isbeschikbaar" = FALSE, "gereserveerdTot" = NULL, "reserveringToken" = NULL
+    WHERE "Id" IN (SELECT (a->>'PlaatsId')::INTEGER FROM jsonb_array_elements(toewijzingen) a)
+      AND ("isbeschikbaar" OR "gereserveerdTot" < now());
+    GET DIAGNOSTICS claimed = ROW_COUNT;
+    IF claimed <> aantal THEN
+        RAISE EXCEPTION 'Startplaats no longer available';
+    END IF;
+
+    RETURN QUERY
+    INSERT INTO "VluchtCyclus" ("DroneId", "ZoneId", "PlaatsId")
+    SELECT (a->>'DroneId')::INTEGER, (a->>'ZoneId')::INTEGER, (a->>'PlaatsId')::INTEGER
+    FROM jsonb_array_elements(toewijzingen) a
+    RETURNING *;
+END;
+$$;
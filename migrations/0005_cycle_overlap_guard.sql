@@ -0,0 +1,110 @@
+-- Overlapping cycles of one drone or docking station are rejected by the database, so writers
+-- in other processes and serverless instances exclude each other too. The in-process CycleIndex
+-- is only a read cache (availability, conflict report) from here on.
+--
+-- A cycle's drone and dock come through VluchtCyclus.DroneId and DockingCyclus.DroneId/DockingId,
+-- which no single-table exclusion constraint can see. Instead, AFTER triggers on the three tables
+-- take a transaction-scoped advisory lock per drone/dock of the written cycle, then look for an
+-- overlapping cycle of the same drone/dock. The lock makes concurrent writers for the same
+-- resource run the check one after the other, each seeing the other's committed rows.
+
+-- A zero-length cycle would otherwise wrap to a 24h range. Existing rows are not validated.
+ALTER TABLE "Cyclus" ADD CONSTRAINT "cyclus_niet_leeg" CHECK ("startuur" <> "tijdstip") NOT VALID;
+
+-- [start, end) in seconds since midnight; a tijdstip before startuur runs past midnight
+CREATE OR REPLACE FUNCTION "cyclus_bereik"(startuur TIME, tijdstip TIME)
+RETURNS INT4RANGE
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT int4range(extract(epoch FROM startuur)::INTEGER,
+                     extract(epoch FROM tijdstip)::INTEGER + CASE WHEN tijdstip < startuur THEN 86400 ELSE 0 END);
+$$;
+
+-- TIME ranges repeat daily: a range past midnight also meets the early-morning ranges.
+-- Empty ranges (legacy zero-length cycles) overlap nothing
+CREATE OR REPLACE FUNCTION "cyclus_overlapt"(a INT4RANGE, b INT4RANGE)
+RETURNS BOOLEAN
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT NOT isempty(a) AND NOT isempty(b)
+       AND (a && b
+            OR a && int4range(lower(b) + 86400, upper(b) + 86400)
+            OR a && int4range(lower(b) - 86400, upper(b) - 86400));
+$$;
+
+-- Every (cycle, drone/dock) pair, as CycleIndex.resources_for builds them
+CREATE OR REPLACE VIEW "CyclusBron" AS
+    SELECT c."Id" AS "CyclusId", 'drone' AS "soort", vc."DroneId" AS "bronId", c."startuur", c."tijdstip"
+    FROM "Cyclus" c JOIN "VluchtCyclus" vc ON vc."Id" = c."VluchtCyclusId"
+    WHERE vc."DroneId" IS NOT NULL
+    UNION ALL
+    SELECT c."Id", 'drone', dc."DroneId", c."startuur", c."tijdstip"
+    FROM "Cyclus" c JOIN "DockingCyclus" dc ON dc."CyclusId" = c."Id"
+    WHERE dc."DroneId" IS NOT NULL
+    UNION ALL
+    SELECT c."Id", 'docking', dc."DockingId", c."startuur", c."tijdstip"
+    FROM "Cyclus" c JOIN "DockingCyclus" dc ON dc."CyclusId" = c."Id"
+    WHERE dc."DockingId" IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION "check_cyclus_overlap"(cyclus INTEGER)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    bron RECORD;
+    ander INTEGER;
+BEGIN
+    -- Locks in a fixed order, so two writers touching the same resources cannot deadlock
+    FOR bron IN
+        SELECT DISTINCT "soort", "bronId", "cyclus_bereik"("startuur", "tijdstip") AS bereik
+        FROM "CyclusBron" WHERE "CyclusId" = cyclus
+        ORDER BY "soort", "bronId"
+    LOOP
+        PERFORM pg_advisory_xact_lock(hashtext('cyclus_' || bron."soort"), bron."bronId");
+    END LOOP;
+
+    -- Separate statement, so it sees rows committed by writers that held the lock before us
+    FOR bron IN
+        SELECT DISTINCT "soort", "bronId", "cyclus_bereik"("startuur", "tijdstip") AS bereik
+        FROM "CyclusBron" WHERE "CyclusId" = cyclus
+    LOOP
+        SELECT o."CyclusId" INTO ander FROM "CyclusBron" o
+        WHERE o."soort" = bron."soort" AND o."bronId" = bron."bronId" AND o."CyclusId" <> cyclus
+          AND "cyclus_overlapt"(bron.bereik, "cyclus_bereik"(o."startuur", o."tijdstip"))
+        LIMIT 1;
+        IF FOUND THEN
+            RAISE EXCEPTION 'Cyclus % overlaps Cyclus % of % %.', cyclus, ander, bron."soort", bron."bronId"
+                USING ERRCODE = 'exclusion_violation';
+        END IF;
+    END LOOP;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION "cyclus_overlap_trigger"()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    cyclus INTEGER;
+BEGIN
+    IF TG_TABLE_NAME = 'Cyclus' THEN
+        PERFORM "check_cyclus_overlap"(NEW."Id");
+    ELSIF TG_TABLE_NAME = 'DockingCyclus' THEN
+        IF NEW."CyclusId" IS NOT NULL THEN
+            PERFORM "check_cyclus_overlap"(NEW."CyclusId");
+        END IF;
+    ELSE -- VluchtCyclus changed drone: all of its cycles move with it
+        FOR cyclus IN SELECT "Id" FROM "Cyclus" WHERE "VluchtCyclusId" = NEW."Id" LOOP
+            PERFORM "check_cyclus_overlap"(cyclus);
+        END LOOP;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER "cyclus_overlap" AFTER INSERT OR UPDATE OF "startuur", "tijdstip", "VluchtCyclusId" ON "Cyclus"
+    FOR EACH ROW EXECUTE FUNCTION "cyclus_overlap_trigger"();
+CREATE TRIGGER "dockingcyclus_overlap" AFTER INSERT OR UPDATE OF "DroneId", "DockingId", "CyclusId" ON "DockingCyclus"
+    FOR EACH ROW EXECUTE FUNCTION "cyclus_overlap_trigger"();
+CREATE TRIGGER "vluchtcyclus_overlap" AFTER UPDATE OF "DroneId" ON "VluchtCyclus"
+    FOR EACH ROW WHEN (NEW."DroneId" IS DISTINCT FROM OLD."DroneId") EXECUTE FUNCTION "cyclus_overlap_trigger"();
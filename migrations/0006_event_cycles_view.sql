@@ -0,0 +1,22 @@
+-- The cycles that play a part in an event, for ForecastHelper: the flight cycles in its zones,
+-- and the docking cycles of the drones flying them. Docking cycles have no event link of their
+-- own; one that sits on another event's flight cycle is left out. A docking cycle of a drone that
+-- flies in several events appears once per event. Filter on "EvenementId" and "soort" and page on
+-- "Id" (Cyclus.Id for flights, DockingCyclus.Id for docking), so the join happens server-side
+-- instead of in IN lists on the URL.
+CREATE OR REPLACE VIEW "EvenementCyclus" AS
+    SELECT z."EvenementId", 'vlucht' AS "soort", c."Id", c."Id" AS "CyclusId", vc."DroneId",
+           c."startuur", c."tijdstip", d."batterij"
+    FROM "Cyclus" c
+    JOIN "VluchtCyclus" vc ON vc."Id" = c."VluchtCyclusId"
+    JOIN "Zone" z ON z."Id" = vc."ZoneId"
+    JOIN "Drone" d ON d."Id" = vc."DroneId"
+    UNION ALL
+    SELECT ed."EvenementId", 'docking', dc."Id", c."Id", dc."DroneId", c."startuur", c."tijdstip", d."batterij"
+    FROM "DockingCyclus" dc
+    JOIN "Cyclus" c ON c."Id" = dc."CyclusId"
+    JOIN "Drone" d ON d."Id" = dc."DroneId"
+    JOIN (SELECT DISTINCT z."EvenementId", vc."DroneId"
+          FROM "VluchtCyclus" vc JOIN "Zone" z ON z."Id" = vc."ZoneId") ed ON ed."DroneId" = dc."DroneId"
+    WHERE NOT EXISTS (SELECT 1 FROM "VluchtCyclus" vc JOIN "Zone" z ON z."Id" = vc."ZoneId"
+                      WHERE vc."Id" = c."VluchtCyclusId" AND z."EvenementId" <> ed."EvenementId");
@@ -0,0 +1,31 @@
+-- schedule_charging (db.sql) only claimed docks with isbeschikbaar set, so a dock whose
+-- reservation expired stayed out of the charging schedule even though get_available_dockings
+-- offers it. Claim it on the same condition as reserve_resources and clear the old reservation.
+CREATE OR REPLACE FUNCTION "schedule_charging"(assignments JSONB)
+RETURNS SETOF "DockingCyclus"
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    claimed INTEGER;
+BEGIN
+    UPDATE "Docking" SET "isbeschikbaar" = FALSE, "gereserveerdTot" = NULL, "reserveringToken" = NULL
+    WHERE "Id" IN (SELECT (a->>'DockingId')::INTEGER FROM jsonb_array_elements(assignments) a)
+      AND ("isbeschikbaar" OR "gereserveerdTot" < now());
+    GET DIAGNOSTICS claimed = ROW_COUNT;
+    IF claimed <> jsonb_array_length(assignments) THEN
+        RAISE EXCEPTION 'Docking station no longer available';
+    END IF;
+
+    RETURN QUERY
+    WITH input AS (
+        SELECT a, nextval(pg_get_serial_sequence('"Cyclus"', 'Id'))::INTEGER AS cyclus_id
+        FROM jsonb_array_elements(assignments) a
+    ), new_cycli AS (
+        INSERT INTO "Cyclus" ("Id", "startuur", "tijdstip")
+        SELECT cyclus_id, (a->>'startuur')::TIME, (a->>'tijdstip')::TIME FROM input
+    )
+    INSERT INTO "DockingCyclus" ("DroneId", "DockingId", "CyclusId")
+    SELECT (a->>'DroneId')::INTEGER, (a->>'DockingId')::INTEGER, cyclus_id FROM input
+    RETURNING *;
+END;
+$$;
@@ -0,0 +1,96 @@
+-- Delta sync in commit-safe order. A journal seq is taken at insert time, so a long transaction
+-- can commit a lower seq after a reader has already moved past it, and no wall-clock delay is
+-- long enough to rule that out. Each entry now records the id of the transaction that wrote it,
+-- and readers only see entries of transactions older than every transaction still running
+-- (pg_snapshot_xmin): that set never grows below the cursor, because any later writer gets a
+-- higher xid. The cursor is (xid, seq), so one large transaction can still be paged.
+
+-- Filled in by the journal_change trigger's INSERT, in the writing transaction. Existing entries
+-- get this migration's xid and keep their seq order.
+ALTER TABLE "Wijziging" ADD COLUMN "xid" XID8 NOT NULL DEFAULT pg_current_xact_id();
+CREATE INDEX "idx_wijziging_xid_seq" ON "Wijziging" ("xid", "seq");
+CREATE INDEX "idx_wijziging_tabel_xid_seq" ON "Wijziging" ("tabel", "xid", "seq");
+
+-- Retention now drops a prefix in (xid, seq) order; this is the last dropped position
+ALTER TABLE "WijzigingHorizon" ADD COLUMN "gesnoeidXid" XID8 NOT NULL DEFAULT '0';
+
+-- Entries after cursor (na_xid, na_seq), oldest first, of finished transactions only.
+-- A transaction that stays open anywhere in the cluster holds the feed back until it ends.
+CREATE OR REPLACE FUNCTION "get_changes"(na_xid TEXT, na_seq BIGINT, tabellen TEXT[], aantal INTEGER)
+RETURNS TABLE("xid" TEXT, "seq" BIGINT, "tabel" TEXT, "rijId" INTEGER, "operatie" TEXT,
+              "kolommen" TEXT[], "gegevens" JSONB, "tijdstip" TIMESTAMPTZ)
+LANGUAGE sql STABLE
+AS $$
+    SELECT w."xid"::TEXT, w."seq", w."tabel", w."rijId", w."operatie", w."kolommen", w."gegevens", w."tijdstip"
+    FROM "Wijziging" w
+    WHERE (w."xid", w."seq") > (na_xid::XID8, na_seq)
+      AND w."xid" < pg_snapshot_xmin(pg_current_snapshot())
+      AND (tabellen IS NULL OR w."tabel" = ANY(tabellen))
+    ORDER BY w."xid", w."seq"
+    LIMIT aantal;
+$$;
+
+-- As in db.sql, with the feed order: per row the entry that survives compaction is the last one
+-- in (xid, seq) order, so a client that already read it has read every merged entry; the merged
+-- values still follow seq, the order the writes happened in (they held the row lock). Retention
+-- drops everything up to the newest expired entry in (xid, seq) order and records that position.
+CREATE OR REPLACE FUNCTION "compact_changes"(ouder_dan INTERVAL, bewaren INTERVAL)
+RETURNS TABLE("samengevoegd" BIGINT, "verwijderd" BIGINT)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    grens TIMESTAMPTZ := now() - ouder_dan;
+    samen BIGINT;
+    weg BIGINT;
+    horizon_xid XID8;
+    horizon BIGINT;
+BEGIN
+    WITH groepen AS (
+        SELECT "tabel", "rijId",
+               (array_agg("seq" ORDER BY "xid" DESC, "seq" DESC))[1] AS laatste,
+               bool_or("operatie" = 'INSERT') AS ingevoegd,
+               (array_agg("operatie" ORDER BY "seq" DESC))[1] AS laatste_operatie,
+               count(*) AS aantal
+        FROM "Wijziging"
+        WHERE "tijdstip" < grens
+        GROUP BY "tabel", "rijId"
+        HAVING count(*) > 1
+    ), samengevoegd AS (
+        SELECT g.laatste,
+               CASE WHEN g.laatste_operatie = 'DELETE' THEN 'DELETE'
+                    WHEN g.ingevoegd THEN 'INSERT' ELSE 'UPDATE' END AS operatie,
+               (SELECT jsonb_object_agg(e.key, e.value ORDER BY w."seq")
+                FROM "Wijziging" w, jsonb_each(COALESCE(w."gegevens", '{}'::jsonb)) e
+                WHERE w."tabel" = g."tabel" AND w."rijId" = g."rijId" AND w."tijdstip" < grens) AS gegevens
+        FROM groepen g
+    ), bijgewerkt AS (
+        UPDATE "Wijziging" w
+        SET "operatie" = s.operatie,
+            "gegevens" = CASE WHEN s.operatie = 'DELETE' THEN NULL ELSE s.gegevens END,
+            "kolommen" = CASE WHEN s.operatie = 'DELETE' THEN '{}'
+                              ELSE ARRAY(SELECT jsonb_object_keys(COALESCE(s.gegevens, '{}'::jsonb))) END
+        FROM samengevoegd s
+        WHERE w."seq" = s.laatste
+        RETURNING w."tabel", w."rijId", w."seq"
+    )
+    DELETE FROM "Wijziging" w
+    USING bijgewerkt b
+    WHERE w."tabel" = b."tabel" AND w."rijId" = b."rijId" AND w."seq" <> b."seq" AND w."tijdstip" < grens;
+    GET DIAGNOSTICS samen = ROW_COUNT;
+
+    SELECT "xid", "seq" INTO horizon_xid, horizon FROM "Wijziging"
+    WHERE "tijdstip" < now() - bewaren
+    ORDER BY "xid" DESC, "seq" DESC
+    LIMIT 1;
+    IF horizon IS NULL THEN
+        weg := 0;
+    ELSE
+        DELETE FROM "Wijziging" WHERE ("xid", "seq") <= (horizon_xid, horizon);
+        GET DIAGNOSTICS weg = ROW_COUNT;
+        UPDATE "WijzigingHorizon" SET "gesnoeidXid" = horizon_xid, "gesnoeidTot" = horizon
+        WHERE "Id" = 1 AND ("gesnoeidXid", "gesnoeidTot") < (horizon_xid, horizon);
+    END IF;
+
+    RETURN QUERY SELECT samen, weg;
+END;
+$$;
@@ -0,0 +1,26 @@
+-- search_verslagen returned ts_headline output as is: raw inhoud with <mark> tags around the hits,
+-- so markup in a report reached the client unescaped. The hits are now delimited with the
+-- private-use characters U+E000/U+E001 (removed from inhoud first), and SearchHelper escapes the
+-- snippet and turns them into <mark>, exactly like the in-process backend.
+CREATE OR REPLACE FUNCTION "search_verslagen"(zoekterm TEXT, aantal INTEGER DEFAULT 20,
+                                              na_rank REAL DEFAULT NULL, na_id INTEGER DEFAULT NULL)
+RETURNS TABLE("Id" INTEGER, "onderwerp" VARCHAR, "isverzonden" BOOLEAN, "isgeaccepteerd" BOOLEAN,
+              "rank" REAL, "snippet" TEXT)
+LANGUAGE sql STABLE
+AS $$
+    WITH q AS (SELECT websearch_to_tsquery('dutch'::regconfig, zoekterm) AS query),
+    hits AS (
+        SELECT v."Id", v."onderwerp", v."inhoud", v."isverzonden", v."isgeaccepteerd",
+               ts_rank_cd("verslag_zoekvector"(v."onderwerp", v."inhoud"), q.query) AS rank, q.query
+        FROM "Verslag" v, q
+        WHERE "verslag_zoekvector"(v."onderwerp", v."inhoud") @@ q.query
+    )
+    SELECT h."Id", h."onderwerp", h."isverzonden", h."isgeaccepteerd", h.rank,
+           ts_headline('dutch'::regconfig, translate(h."inhoud", chr(57344) || chr(57345), ''), h.query,
+                       'StartSel="' || chr(57344) || '", StopSel="' || chr(57345) || '", '
+                       || 'MaxFragments=2, MaxWords=20, MinWords=8')
+    FROM hits h
+    WHERE na_rank IS NULL OR h.rank < na_rank OR (h.rank = na_rank AND h."Id" > na_id)
+    ORDER BY h.rank DESC, h."Id"
+    LIMIT aantal;
+$$;
@@ -0,0 +1,118 @@
+-- A chunked Verslag body lives in "VerslagBlok"; "Verslag"."inhoud" only keeps a 4 KiB preview, so
+-- search_verslagen never matched text past it. The chunks are zlib-compressed and can split a
+-- character or word, so the database cannot index them itself: the writer (VerslagContentHelper)
+-- sends each chunk's text, cut on whitespace, in "tekst", and an insert trigger turns it into a
+-- tsvector and drops the text again. Once the version is switched over, the chunk vectors of the
+-- current version are combined per Verslag into "VerslagZoekvector", which search_verslagen uses
+-- instead of the preview. Chunked bodies uploaded before this migration are indexed on their
+-- next upload; until then their preview is searched as before.
+ALTER TABLE "VerslagBlok"
+    ADD COLUMN IF NOT EXISTS "tekst" TEXT,
+    ADD COLUMN IF NOT EXISTS "zoekvector" TSVECTOR;
+
+CREATE OR REPLACE FUNCTION "verslagblok_zoekvector"()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW."tekst" IS NOT NULL THEN
+        NEW."zoekvector" := to_tsvector('dutch'::regconfig, NEW."tekst");
+        NEW."tekst" := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER "verslagblok_zoekvector" BEFORE INSERT ON "VerslagBlok"
+    FOR EACH ROW EXECUTE FUNCTION "verslagblok_zoekvector"();
+
+CREATE AGGREGATE "tsvector_agg"(TSVECTOR) (SFUNC = tsvector_concat, STYPE = TSVECTOR, INITCOND = '');
+
+-- Same weights as verslag_zoekvector: onderwerp A, body B
+CREATE TABLE IF NOT EXISTS "VerslagZoekvector" (
+    "VerslagId" INTEGER PRIMARY KEY REFERENCES "Verslag"("Id") ON DELETE CASCADE,
+    "zoekvector" TSVECTOR NOT NULL
+);
+CREATE INDEX IF NOT EXISTS "idx_verslagzoekvector" ON "VerslagZoekvector" USING GIN ("zoekvector");
+
+CREATE OR REPLACE FUNCTION "verslag_zoekvector_bijwerken"()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    vector TSVECTOR;
+BEGIN
+    IF NEW."inhoudVersie" IS NULL THEN
+        -- Inline body again (verslag_inhoud_meta dropped the chunks)
+        DELETE FROM "VerslagZoekvector" WHERE "VerslagId" = NEW."Id";
+        RETURN NULL;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM "VerslagBlok" b WHERE b."VerslagId" = NEW."Id" AND b."versie" = NEW."inhoudVersie"
+                   AND b."zoekvector" IS NOT NULL) THEN
+        RETURN NULL; -- Uploaded before chunk text was indexed
+    END IF;
+
+    BEGIN
+        SELECT setweight(to_tsvector('dutch'::regconfig, coalesce(NEW."onderwerp", '')), 'A')
+               || setweight(tsvector_agg(b."zoekvector" ORDER BY b."volgnummer"), 'B')
+        INTO vector
+        FROM "VerslagBlok" b
+        WHERE b."VerslagId" = NEW."Id" AND b."versie" = NEW."inhoudVersie" AND b."zoekvector" IS NOT NULL;
+    EXCEPTION WHEN program_limit_exceeded THEN
+        -- Over the 1 MB tsvector limit with positions: keep the lexemes, lose the ranking detail
+        SELECT setweight(to_tsvector('dutch'::regconfig, coalesce(NEW."onderwerp", '')), 'A')
+               || tsvector_agg(strip(b."zoekvector"))
+        INTO vector
+        FROM "VerslagBlok" b
+        WHERE b."VerslagId" = NEW."Id" AND b."versie" = NEW."inhoudVersie" AND b."zoekvector" IS NOT NULL;
+    END;
+
+    INSERT INTO "VerslagZoekvector" ("VerslagId", "zoekvector") VALUES (NEW."Id", vector)
+    ON CONFLICT ("VerslagId") DO UPDATE SET "zoekvector" = EXCLUDED."zoekvector";
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER "verslag_zoekvector_bijwerken" AFTER UPDATE OF "onderwerp", "inhoudVersie" ON "Verslag"
+    FOR EACH ROW WHEN (NEW."inhoudVersie" IS NOT NULL OR OLD."inhoudVersie" IS NOT NULL)
+    EXECUTE FUNCTION "verslag_zoekvector_bijwerken"();
+
+-- As in migration 0009, with chunked bodies matched and ranked on their full text. The snippet
+-- still comes from the preview in "inhoud".
+CREATE OR REPLACE FUNCTION "search_verslagen"(zoekterm TEXT, aantal INTEGER DEFAULT 20,
+                                              na_rank REAL DEFAULT NULL, na_id INTEGER DEFAULT NULL)
+RETURNS TABLE("Id" INTEGER, "onderwerp" VARCHAR, "isverzonden" BOOLEAN, "isgeaccepteerd" BOOLEAN,
+              "rank" REAL, "snippet" TEXT)
+LANGUAGE sql STABLE
+AS $$
+    WITH q AS (SELECT websearch_to_tsquery('dutch'::regconfig, zoekterm) AS query),
+    hits AS (
+        SELECT v."Id", v."onderwerp", v."inhoud", v."isverzonden", v."isgeaccepteerd",
+               ts_rank_cd("verslag_zoekvector"(v."onderwerp", v."inhoud"), q.query) AS rank, q.query
+        FROM "Verslag" v, q
+        WHERE "verslag_zoekvector"(v."onderwerp", v."inhoud") @@ q.query
+          AND NOT EXISTS (SELECT 1 FROM "VerslagZoekvector" z WHERE z."VerslagId" = v."Id")
+        UNION ALL
+        SELECT v."Id", v."onderwerp", v."inhoud", v."isverzonden", v."isgeaccepteerd",
+               ts_rank_cd(z."zoekvector", q.query), q.query
+        FROM "VerslagZoekvector" z JOIN "Verslag" v ON v."Id" = z."VerslagId", q
+        WHERE z."zoekvector" @@ q.query
+    )
+    SELECT h."Id", h."onderwerp", h."isverzonden", h."isgeaccepteerd", h.rank,
+           ts_headline('dutch'::regconfig, translate(h."inhoud", chr(57344) || chr(57345), ''), h.query,
+                       'StartSel="' || chr(57344) || '", StopSel="' || chr(57345) || '", '
+                       || 'MaxFragments=2, MaxWords=20, MinWords=8')
+    FROM hits h
+    WHERE na_rank IS NULL OR h.rank < na_rank OR (h.rank = na_rank AND h."Id" > na_id)
+    ORDER BY h.rank DESC, h."Id"
+    LIMIT aantal;
+$$;
+
+-- Computed column for exports: TRUE when "inhoud" is only the preview of a longer chunked body,
+-- which GET /api/verslagen/<id>/content returns in full
+CREATE OR REPLACE FUNCTION "inhoudAfgekapt"("Verslag")
+RETURNS BOOLEAN
+LANGUAGE sql STABLE
+AS $$
+    SELECT $1."inhoudVersie" IS NOT NULL AND $1."inhoudLengte" > octet_length($1."inhoud");
+$$;
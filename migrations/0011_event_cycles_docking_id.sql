@@ -0,0 +1,19 @@
+-- EvenementCyclus (migration 0006) also serves the event-scoped DockingCyclus export, which needs
+-- the dock. Appended as the last column, so CREATE OR REPLACE keeps the existing ones.
+CREATE OR REPLACE VIEW "EvenementCyclus" AS
+    SELECT z."EvenementId", 'vlucht' AS "soort", c."Id", c."Id" AS "CyclusId", vc."DroneId",
+           c."startuur", c."tijdstip", d."batterij", NULL::INTEGER AS "DockingId"
+    FROM "Cyclus" c
+    JOIN "VluchtCyclus" vc ON vc."Id" = c."VluchtCyclusId"
+    JOIN "Zone" z ON z."Id" = vc."ZoneId"
+    JOIN "Drone" d ON d."Id" = vc."DroneId"
+    UNION ALL
+    SELECT ed."EvenementId", 'docking', dc."Id", c."Id", dc."DroneId", c."startuur", c."tijdstip", d."batterij",
+           dc."DockingId"
+    FROM "DockingCyclus" dc
+    JOIN "Cyclus" c ON c."Id" = dc."CyclusId"
+    JOIN "Drone" d ON d."Id" = dc."DroneId"
+    JOIN (SELECT DISTINCT z."EvenementId", vc."DroneId"
+          FROM "VluchtCyclus" vc JOIN "Zone" z ON z."Id" = vc."ZoneId") ed ON ed."DroneId" = dc."DroneId"
+    WHERE NOT EXISTS (SELECT 1 FROM "VluchtCyclus" vc JOIN "Zone" z ON z."Id" = vc."ZoneId"
+                      WHERE vc."Id" = c."VluchtCyclusId" AND z."EvenementId" <> ed."EvenementId");
@@ -0,0 +1,43 @@
+-- event_kpis (db.sql) counted a cycle as completed only once it had ended on the event's last
+-- day, so completion stayed at 0% for the whole event. Cycles are times of day and run on every
+-- day of the event: planned_cycles now counts those runs (cycles x event_days) and
+-- completed_cycles the runs that have ended by now, per day from StartDatum. A cycle whose
+-- tijdstip equals its startuur is empty (as in cyclus_bereik), not 24 hours long.
+DROP FUNCTION IF EXISTS "event_kpis"(INTEGER);
+CREATE FUNCTION "event_kpis"(evenement INTEGER)
+RETURNS TABLE(zones BIGINT, active_drones BIGINT, flight_cycles BIGINT, event_days INTEGER,
+              planned_cycles BIGINT, completed_cycles BIGINT, average_cycle_minutes NUMERIC, reports BIGINT,
+              reports_sent BIGINT, reports_accepted BIGINT)
+LANGUAGE sql STABLE
+AS $$
+    WITH ev AS (
+        SELECT *, "EindDatum" - "StartDatum" + 1 AS dagen FROM "Evenement" WHERE "Id" = evenement
+    ), vc AS (
+        SELECT vc.* FROM "VluchtCyclus" vc JOIN "Zone" z ON z."Id" = vc."ZoneId"
+        WHERE z."EvenementId" = evenement
+    ), cy AS (
+        SELECT c.*, CASE WHEN c."tijdstip" >= c."startuur" THEN c."tijdstip" - c."startuur"
+                         ELSE c."tijdstip" - c."startuur" + INTERVAL '24 hours' END AS duur
+        FROM "Cyclus" c WHERE c."VluchtCyclusId" IN (SELECT "Id" FROM vc)
+    ), runs AS (
+        -- Days on which the run of this cycle has ended: the first day's run ends at
+        -- StartDatum + startuur + duur, each later day's one day after the previous
+        SELECT GREATEST(0, LEAST(ev.dagen,
+                   (LOCALTIMESTAMP - cy."startuur"::INTERVAL - cy.duur)::DATE - ev."StartDatum" + 1)) AS afgerond
+        FROM cy, ev
+    ), vs AS (
+        SELECT * FROM "Verslag" WHERE "Id" IN (SELECT "VerslagId" FROM vc)
+    )
+    SELECT
+        (SELECT count(*) FROM "Zone" WHERE "EvenementId" = evenement),
+        (SELECT count(DISTINCT "DroneId") FROM vc),
+        (SELECT count(*) FROM vc),
+        ev.dagen,
+        (SELECT count(*) FROM cy) * ev.dagen,
+        (SELECT COALESCE(sum(afgerond), 0)::BIGINT FROM runs),
+        (SELECT round(extract(epoch FROM avg(duur)) / 60, 1) FROM cy),
+        (SELECT count(*) FROM vs),
+        (SELECT count(*) FROM vs WHERE "isverzonden"),
+        (SELECT count(*) FROM vs WHERE "isgeaccepteerd")
+    FROM ev;
+$$;
@@ -0,0 +1,112 @@
+-- Readers of the cycle tables that archive_event (migration 0002) left behind: once an event was
+-- archived its KPIs dropped to 0, drone timelines, exports and snapshots lost its cycles, and a
+-- restore could hand out Ids again that the archive tables still hold.
+
+-- As in migration 0012, with the cycles of the event in the archive tables too. Archived rows are
+-- found by their own "EvenementId", so they still count when their zone is deleted later.
+DROP FUNCTION IF EXISTS "event_kpis"(INTEGER);
+CREATE FUNCTION "event_kpis"(evenement INTEGER)
+RETURNS TABLE(zones BIGINT, active_drones BIGINT, flight_cycles BIGINT, event_days INTEGER,
+              planned_cycles BIGINT, completed_cycles BIGINT, average_cycle_minutes NUMERIC, reports BIGINT,
+              reports_sent BIGINT, reports_accepted BIGINT)
+LANGUAGE sql STABLE
+AS $$
+    WITH ev AS (
+        SELECT *, "EindDatum" - "StartDatum" + 1 AS dagen FROM "Evenement" WHERE "Id" = evenement
+    ), vc AS (
+        SELECT vc."Id", vc."DroneId", vc."VerslagId" FROM "VluchtCyclus" vc JOIN "Zone" z ON z."Id" = vc."ZoneId"
+        WHERE z."EvenementId" = evenement
+        UNION ALL
+        SELECT "Id", "DroneId", "VerslagId" FROM "VluchtCyclusArchief" WHERE "EvenementId" = evenement
+    ), c AS (
+        SELECT "startuur", "tijdstip" FROM "Cyclus" WHERE "VluchtCyclusId" IN (SELECT "Id" FROM vc)
+        UNION ALL
+        SELECT "startuur", "tijdstip" FROM "CyclusArchief" WHERE "EvenementId" = evenement
+    ), cy AS (
+        SELECT c.*, CASE WHEN c."tijdstip" >= c."startuur" THEN c."tijdstip" - c."startuur"
+                         ELSE c."tijdstip" - c."startuur" + INTERVAL '24 hours' END AS duur
+        FROM c
+    ), runs AS (
+        SELECT GREATEST(0, LEAST(ev.dagen,
+                   (LOCALTIMESTAMP - cy."startuur"::INTERVAL - cy.duur)::DATE - ev."StartDatum" + 1)) AS afgerond
+        FROM cy, ev
+    ), vs AS (
+        SELECT * FROM "Verslag" WHERE "Id" IN (SELECT "VerslagId" FROM vc)
+    )
+    SELECT
+        (SELECT count(*) FROM "Zone" WHERE "EvenementId" = evenement),
+        (SELECT count(DISTINCT "DroneId") FROM vc),
+        (SELECT count(*) FROM vc),
+        ev.dagen,
+        (SELECT count(*) FROM cy) * ev.dagen,
+        (SELECT COALESCE(sum(afgerond), 0)::BIGINT FROM runs),
+        (SELECT round(extract(epoch FROM avg(duur)) / 60, 1) FROM cy),
+        (SELECT count(*) FROM vs),
+        (SELECT count(*) FROM vs WHERE "isverzonden"),
+        (SELECT count(*) FROM vs WHERE "isgeaccepteerd")
+    FROM ev;
+$$;
+
+-- As in db.sql, past the archived Ids too: archived rows keep their original Id, and a live row
+-- that gets one of them again collides in the *Historie views and when it is archived itself.
+CREATE OR REPLACE FUNCTION "restore_sequences"()
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    tabel TEXT;
+BEGIN
+    FOREACH tabel IN ARRAY ARRAY['Evenement', 'Zone', 'Startplaats', 'Verslag', 'Drone', 'Docking'] LOOP
+        EXECUTE format('SELECT setval(pg_get_serial_sequence(%L, ''Id''), COALESCE(max("Id"), 0) + 1, false) FROM %I',
+                       format('%I', tabel), tabel);
+    END LOOP;
+    FOREACH tabel IN ARRAY ARRAY['Cyclus', 'VluchtCyclus', 'DockingCyclus'] LOOP
+        EXECUTE format('SELECT setval(pg_get_serial_sequence(%L, ''Id''), '
+                       || 'GREATEST((SELECT max("Id") FROM %I), (SELECT max("Id") FROM %I), 0) + 1, false)',
+                       format('%I', tabel), tabel, tabel || 'Archief');
+    END LOOP;
+END;
+$$;
+
+-- A drone's cycles, live and archived, for TimelineHelper: one row per flight cycle's Cyclus, and
+-- one per (Cyclus, drone) with the drone's docking cycles on it. Filter on "DroneId" (and
+-- "gearchiveerd") and page on ("startuur", "Id").
+CREATE OR REPLACE VIEW "VluchtCyclusTijdlijn" AS
+    SELECT c."Id", c."startuur", c."tijdstip", c."VluchtCyclusId", vc."DroneId", vc."ZoneId", vc."PlaatsId",
+           vc."VerslagId", FALSE AS "gearchiveerd"
+    FROM "Cyclus" c JOIN "VluchtCyclus" vc ON vc."Id" = c."VluchtCyclusId"
+    UNION ALL
+    SELECT c."Id", c."startuur", c."tijdstip", c."VluchtCyclusId", vc."DroneId", vc."ZoneId", vc."PlaatsId",
+           vc."VerslagId", TRUE
+    FROM "CyclusArchief" c JOIN "VluchtCyclusArchief" vc ON vc."Id" = c."VluchtCyclusId";
+
+CREATE OR REPLACE VIEW "DockingCyclusTijdlijn" AS
+    SELECT c."Id", c."startuur", c."tijdstip", dc."DroneId",
+           json_agg(json_build_object('Id', dc."Id", 'DockingId', dc."DockingId") ORDER BY dc."Id") AS "DockingCyclus",
+           FALSE AS "gearchiveerd"
+    FROM "DockingCyclus" dc JOIN "Cyclus" c ON c."Id" = dc."CyclusId"
+    GROUP BY c."Id", dc."DroneId"
+    UNION ALL
+    SELECT c."Id", c."startuur", c."tijdstip", dc."DroneId",
+           json_agg(json_build_object('Id', dc."Id", 'DockingId', dc."DockingId") ORDER BY dc."Id"),
+           TRUE
+    FROM "DockingCyclusArchief" dc JOIN "CyclusArchief" c ON c."Id" = dc."CyclusId"
+    GROUP BY c."Id", dc."DroneId";
+
+-- The drones and reports of archived events, for the event-scoped export with include_archived:
+-- their link through VluchtCyclus is gone, the archived flight cycles still name them. A row
+-- appears once per archived event it belongs to.
+CREATE OR REPLACE VIEW "EvenementArchiefDrone" AS
+    SELECT DISTINCT a."EvenementId", d."Id", d."status", d."batterij", d."magOpstijgen"
+    FROM "VluchtCyclusArchief" a JOIN "Drone" d ON d."Id" = a."DroneId";
+
+CREATE OR REPLACE VIEW "EvenementArchiefVerslag" AS
+    SELECT DISTINCT a."EvenementId", v."Id", v."onderwerp", v."inhoud", v."isverzonden", v."isgeaccepteerd",
+           v."VluchtCyclusId", v."inhoudLengte", v."inhoudDigest", "inhoudAfgekapt"(v) AS "inhoudAfgekapt"
+    FROM "VluchtCyclusArchief" a JOIN "Verslag" v ON v."Id" = a."VerslagId";
+
+CREATE INDEX IF NOT EXISTS "idx_vluchtcyclusarchief_drone" ON "VluchtCyclusArchief" ("DroneId");
+CREATE INDEX IF NOT EXISTS "idx_vluchtcyclusarchief_verslag" ON "VluchtCyclusArchief" ("VerslagId");
+CREATE INDEX IF NOT EXISTS "idx_cyclusarchief_vluchtcyclus" ON "CyclusArchief" ("VluchtCyclusId");
+CREATE INDEX IF NOT EXISTS "idx_dockingcyclusarchief_drone" ON "DockingCyclusArchief" ("DroneId");
+CREATE INDEX IF NOT EXISTS "idx_dockingcyclusarchief_cyclus" ON "DockingCyclusArchief" ("CyclusId");